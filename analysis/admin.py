@@ -1,23 +1,152 @@
+import math
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models.functions import Substr
+from django.utils.functional import cached_property
+
 from .models import FileMeta, ReportMeta, ReportLog
 
+# этапы, которые показываются отдельными колонками в списке отчётов
+STAGE_COLUMNS = ('load', 'coerce', 'stats', 'render.draw', 'render.encode')
+# по скольким последним отчётам считаются перцентили
+TIMING_SAMPLE = 1000
+# сколько символов ошибки / сообщения показывать в списке (полный текст — на странице объекта)
+TEXT_PREVIEW = 120
+# с какого размера таблицы вместо COUNT(*) берётся оценка планировщика PostgreSQL
+ESTIMATED_COUNT_MIN = 100_000
+
+
+def _percentile(sorted_values, q):
+    # ближайший ранг: без numpy, чтобы админка не тянула тяжёлые библиотеки
+    if not sorted_values:
+        return None
+    idx = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[idx]
+
+
+def timing_aggregates(rows):
+    # rows: (kind, timings) -> [(kind, stage, count, p50, p95)], в т.ч. по всем типам сразу ('*')
+    samples = {}
+    for kind, timings in rows:
+        stages = (timings or {}).get('stages') or {}
+        for stage, seconds in stages.items():
+            for key in ((kind or '-', stage), ('*', stage)):
+                samples.setdefault(key, []).append(seconds)
+    table = []
+    for (kind, stage), values in sorted(samples.items()):
+        values.sort()
+        table.append((kind, stage, len(values), _percentile(values, 0.5), _percentile(values, 0.95)))
+    return table
+
+
+class EstimatedCountPaginator(Paginator):
+    # COUNT(*) по таблице с миллионами строк — полный проход; для списка без фильтров
+    # хватает оценки из pg_class.reltuples (обновляется autovacuum/ANALYZE)
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s',
+                               [self.object_list.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_MIN:
+                return int(row[0])
+        return super().count
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    # список с фиксированным числом запросов: FK подтягиваются JOIN-ом, большие поля не читаются,
+    # общее число строк — оценкой, без второго COUNT(*) при фильтрах
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    # поля, которые в списке не нужны (читаются только на странице объекта)
+    list_defer = ()
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if self.list_defer and request.resolver_match and request.resolver_match.url_name.endswith('_changelist'):
+            qs = qs.defer(*self.list_defer)
+        return qs
+
+
+def _preview(value):
+    # из БД читается на символ больше — так видно, что текст обрезан
+    if value and len(value) > TEXT_PREVIEW:
+        return value[:TEXT_PREVIEW] + '…'
+    return value
+
+
+def _stage_column(stage):
+    def column(obj):
+        seconds = ((obj.timings or {}).get('stages') or {}).get(stage)
+        return None if seconds is None else round(seconds, 3)
+    column.short_description = stage
+    return column
+
 
 @admin.register(FileMeta)
-class FileMetaAdmin(admin.ModelAdmin):
+class FileMetaAdmin(ScalableAdmin):
     list_display = ('id', 'owner', 'original_name', 'size_bytes', 'uploaded_at')
-    search_fields = ('original_name', 'owner__username', 'owner__email')
+    list_select_related = ('owner',)
+    list_defer = ('profile',)
+    search_fields = ('original_name', 'owner__email')
     list_filter = ('uploaded_at',)
+    raw_id_fields = ('owner',)
 
 
 @admin.register(ReportMeta)
-class ReportMetaAdmin(admin.ModelAdmin):
-    list_display = ('id', 'owner', 'file', 'created_at', 'duration_seconds', 'error')
-    search_fields = ('owner__username', 'owner__email', 'summary')
-    list_filter = ('created_at',)
+class ReportMetaAdmin(ScalableAdmin):
+    list_display = ('id', 'owner', 'file', 'kind', 'status', 'cost', 'created_at', 'duration_seconds',
+                    *[_stage_column(stage) for stage in STAGE_COLUMNS], 'peak_memory_mb', 'error_preview')
+    # FileMeta.__str__ показывает владельца файла
+    list_select_related = ('owner', 'file__owner')
+    list_defer = ('params', 'result', 'summary', 'error', 'file__profile')
+    search_fields = ('owner__email', 'summary')
+    list_filter = ('created_at', 'kind', 'status')
+    raw_id_fields = ('owner', 'file')
+    change_list_template = 'admin/analysis/reportmeta/change_list.html'
+
+    def get_queryset(self, request):
+        # начало ошибки режется в БД: трейсбек целиком в список не читается
+        return super().get_queryset(request).annotate(error_head=Substr('error', 1, TEXT_PREVIEW + 1))
+
+    @admin.display(description='error')
+    def error_preview(self, obj):
+        return _preview(obj.error_head)
+
+    @admin.display(description='peak MB')
+    def peak_memory_mb(self, obj):
+        return (obj.timings or {}).get('peak_memory_mb')
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        context_data = getattr(response, 'context_data', None)
+        cl = context_data.get('cl') if context_data else None
+        if cl is not None:
+            # p50/p95 по этапам и типам анализа для отфильтрованного списка (последние TIMING_SAMPLE)
+            rows = (cl.queryset.exclude(timings=None).order_by('-created_at')
+                    .values_list('kind', 'timings')[:TIMING_SAMPLE])
+            response.context_data['timing_aggregates'] = timing_aggregates(rows)
+        return response
 
 
 @admin.register(ReportLog)
-class ReportLogAdmin(admin.ModelAdmin):
-    list_display = ('id', 'report', 'owner', 'created_at', 'message')
-    search_fields = ('message', 'owner__username', 'owner__email')
+class ReportLogAdmin(ScalableAdmin):
+    list_display = ('id', 'report', 'owner', 'created_at', 'message_preview')
+    # ReportMeta.__str__ показывает владельца отчёта
+    list_select_related = ('report__owner', 'owner')
+    list_defer = ('message', *[f'report__{name}' for name in ('params', 'result', 'summary', 'error', 'timings')])
+    search_fields = ('message', 'owner__email')
     list_filter = ('created_at',)
+    raw_id_fields = ('report', 'owner')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(message_head=Substr('message', 1, TEXT_PREVIEW + 1))
+
+    @admin.display(description='message')
+    def message_preview(self, obj):
+        return _preview(obj.message_head)
@@ -0,0 +1,202 @@
+import asyncio
+import math
+import os
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .models import FileMeta, ReportMeta
+from .workspace import BUSY_STATUSES
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Контроль допуска тяжёлых анализов. У каждой задачи есть стоимость в условных единицах
+# (объём читаемых данных, число графиков). Ограничения:
+# - при постановке в очередь: задач в очереди и в работе у пользователя и суммарная стоимость
+#   очереди, сверх них запрос сразу получает 429 с Retry-After;
+# - при запуске: выполняемых задач у пользователя и суммарная стоимость выполняемых.
+# Состояние семафоров — сами строки ReportMeta (queued/running и cost); проверка и захват идут
+# под межпроцессной блокировкой: advisory lock PostgreSQL или flock файла для остальных БД.
+# Задача, чей процесс умер (OOM, SIGKILL, деплой), осталась бы running навсегда и держала слоты —
+# без отметки heartbeat_at дольше ANALYSIS_JOB_TIMEOUT она перед каждой проверкой освобождается
+# (release_stale_jobs); живая задача отмечается регулярно, сколько бы ни выполнялась (jobs.heartbeat).
+
+LOCK_KEY = 0x616E616C   # ключ advisory lock
+LOCK_FILE = 'admission.lock'
+PLOT_COST = 0.25        # каждый график в describe
+MATRIX_PAIRS_PER_UNIT = 100
+CLAIM_SCAN = 50         # сколько первых задач очереди просматривает воркер в поисках подходящей
+RETRY_SAMPLE = 50
+RETRY_AFTER_MAX = 300
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _sqlite_write_lock() -> None:
+    # SQLite: блокировка записи берётся до первого чтения. Иначе переход от чтения к записи
+    # в той же транзакции сразу падает с «database is locked», если другой процесс в это время пишет
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {ReportMeta._meta.db_table} SET id = id WHERE 0 = 1')
+
+
+@contextmanager
+def admission_lock():
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # снимается вместе с транзакцией; работает для процессов на разных машинах
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_KEY])
+            yield
+        elif fcntl is not None:
+            # локальная замена: процессы одной машины
+            path = default_storage.path(LOCK_FILE)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a') as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                if connection.vendor == 'sqlite':
+                    _sqlite_write_lock()
+                yield
+        else:
+            yield
+
+
+def estimate_cost(file_meta: Optional[FileMeta], kind: str, params: dict) -> int:
+    # 1 — лёгкий анализ; растёт с объёмом читаемых колонок, числом графиков и пар колонок.
+    # Не больше общего бюджета, иначе задача никогда не получит слот
+    columns = params.get('columns') or []
+    size_mb = (getattr(file_meta, 'size_bytes', None) or 0) / (1024 * 1024)
+    total = len(((getattr(file_meta, 'profile', None) or {}).get('columns')) or columns) or 1
+    # анализ читает только свои колонки
+    data_mb = size_mb * min(1.0, len(columns) / total) if columns else size_mb
+    cost = 1 + data_mb / settings.ANALYSIS_COST_MB
+    if kind == 'describe' and params.get('include_plots'):
+        cost += PLOT_COST * len(columns)
+    elif kind == 'correlation_matrix':
+        cost *= 1 + len(columns) * (len(columns) - 1) / 2 / MATRIX_PAIRS_PER_UNIT
+    return max(1, min(round(cost), settings.ANALYSIS_MAX_RUNNING_COST))
+
+
+def retry_after(pending_cost: int) -> int:
+    # оценка: средняя длительность недавних задач на число «очередей» бюджета впереди
+    avg = (ReportMeta.objects.filter(status=ReportMeta.STATUS_DONE, duration_seconds__isnull=False)
+           .order_by('-id')[:RETRY_SAMPLE].aggregate(avg=Avg('duration_seconds'))['avg'])
+    rounds = max(1.0, pending_cost / settings.ANALYSIS_MAX_RUNNING_COST)
+    return max(1, min(math.ceil((avg or 1.0) * rounds), RETRY_AFTER_MAX))
+
+
+def stale_jobs():
+    # задачи, запущенные до появления отметок, судим по started_at
+    deadline = timezone.now() - timedelta(seconds=settings.ANALYSIS_JOB_TIMEOUT)
+    return ReportMeta.objects.filter(
+        Q(heartbeat_at__lt=deadline) | Q(heartbeat_at__isnull=True, started_at__lt=deadline),
+        status=ReportMeta.STATUS_RUNNING,
+    )
+
+
+def release_stale_jobs() -> int:
+    # с воркерами зависшая задача возвращается в очередь; без воркера её некому перезапустить — ошибка
+    if settings.ANALYSIS_JOBS_INLINE:
+        return stale_jobs().update(
+            status=ReportMeta.STATUS_FAILED, finished_at=timezone.now(),
+            result={'error': 'Анализ прерван: процесс, выполнявший его, завершился. Запустите анализ заново.'},
+        )
+    return stale_jobs().update(status=ReportMeta.STATUS_QUEUED, started_at=None, heartbeat_at=None)
+
+
+def check_admission(owner, cost: int) -> None:
+    # вызывать под admission_lock вместе с созданием задачи
+    release_stale_jobs()
+    busy = ReportMeta.objects.filter(status__in=BUSY_STATUSES)
+    user_pending = busy.filter(owner=owner).count()
+    if user_pending >= settings.ANALYSIS_USER_MAX_PENDING:
+        raise AdmissionRejected(
+            f'Слишком много ваших анализов в очереди ({user_pending}). Дождитесь их завершения.',
+            retry_after(busy.filter(owner=owner).aggregate(c=Sum('cost'))['c'] or 0),
+        )
+    pending_cost = busy.aggregate(c=Sum('cost'))['c'] or 0
+    if pending_cost + cost > settings.ANALYSIS_MAX_QUEUED_COST:
+        raise AdmissionRejected('Сервер перегружен, анализ не поставлен в очередь.', retry_after(pending_cost))
+
+
+def _running_state():
+    rows = (ReportMeta.objects.filter(status=ReportMeta.STATUS_RUNNING)
+            .values('owner_id').annotate(n=Count('id'), cost=Sum('cost')))
+    per_user = {row['owner_id']: row['n'] for row in rows}
+    return sum(row['cost'] for row in rows), per_user
+
+
+def _fits(report: ReportMeta, running_cost: int, per_user: dict) -> bool:
+    if per_user.get(report.owner_id, 0) >= settings.ANALYSIS_USER_MAX_RUNNING:
+        return False
+    return running_cost + report.cost <= settings.ANALYSIS_MAX_RUNNING_COST
+
+
+def _start(report: ReportMeta) -> bool:
+    # только из очереди: задачу мог уже забрать другой процесс
+    started_at = timezone.now()
+    if not ReportMeta.objects.filter(id=report.id, status=ReportMeta.STATUS_QUEUED).update(
+            status=ReportMeta.STATUS_RUNNING, started_at=started_at, heartbeat_at=started_at):
+        return False
+    report.status = ReportMeta.STATUS_RUNNING
+    report.started_at = started_at
+    report.heartbeat_at = started_at
+    return True
+
+
+def claim_next() -> Optional[ReportMeta]:
+    # первая по времени задача, которой хватает слотов пользователя и общего бюджета
+    with admission_lock():
+        release_stale_jobs()
+        running_cost, per_user = _running_state()
+        queued = (ReportMeta.objects.select_for_update(skip_locked=True)
+                  .filter(status=ReportMeta.STATUS_QUEUED).order_by('created_at', 'id')[:CLAIM_SCAN])
+        for report in queued:
+            if _fits(report, running_cost, per_user) and _start(report):
+                return report
+    return None
+
+
+def try_start(report: ReportMeta) -> Optional[bool]:
+    # True — слот получен, False — слота пока нет, None — задача уже не в очереди
+    with admission_lock():
+        release_stale_jobs()
+        running_cost, per_user = _running_state()
+        if not _fits(report, running_cost, per_user):
+            return False
+        return True if _start(report) else None
+
+
+def wait_for_slot(report: ReportMeta, timeout: float, poll: float = 0.25) -> Optional[bool]:
+    # режим без воркера: задача ждёт своего слота в процессе запроса, но не дольше timeout
+    deadline = time.monotonic() + timeout
+    while True:
+        started = try_start(report)
+        if started is not False or time.monotonic() >= deadline:
+            return started
+        time.sleep(poll)
+
+
+async def await_slot(report: ReportMeta, timeout: float, poll: float = 0.25) -> Optional[bool]:
+    # то же для асинхронных представлений: ожидание в цикле событий, а не в процессе пула —
+    # иначе ждущие задачи занимают процессы, нужные выполняемым
+    deadline = time.monotonic() + timeout
+    while True:
+        started = await sync_to_async(try_start)(report)
+        if started is not False or time.monotonic() >= deadline:
+            return started
+        await asyncio.sleep(poll)
@@ -0,0 +1,279 @@
+from django.conf import settings
+import pandas as pd
+
+from .artifacts import save_artifact
+from .chart_cache import CacheCounter, chart_key, get_chart, put_chart
+from .chart_data import column_chart_data, scatter_data
+from .charts import render, render_many
+from .correlation import correlation_matrix
+from .datasets import load_dataset, read_dataset_meta
+from .downsample import density_grid, lttb
+from .profiling import non_numeric_columns, profile_columns
+from .render_profiles import RENDER_PROFILES, chart_format, profile_name
+from .stats import coerce_numeric, describe_table
+from .streaming import describe_streaming, streaming_histograms
+from .timing import span
+
+# Обработчики анализов для очереди задач: (file_meta, params, result) -> (summary, bytes, filename).
+# Всё, что нужно для отображения, обработчик складывает в result (уходит в ReportMeta.result);
+# графики — не base64, а имена файлов в хранилище артефактов (см. artifacts.py).
+
+
+def _load(file_meta, params, columns):
+    # читаются только колонки анализа; неизвестная колонка — ValueError с понятным текстом
+    rel_path = getattr(file_meta, 'storage_path', None) or params['rel_path']
+    with span('load'):
+        return load_dataset(rel_path, file_meta, columns=columns, filters=params.get('filters'))
+
+
+def _content_hash(file_meta, meta=None):
+    if meta is None and file_meta is not None and file_meta.dataset_path:
+        meta = read_dataset_meta(file_meta.dataset_path)
+    return (meta or {}).get('content_hash')
+
+
+def _profile(file_meta):
+    # профиль колонок из загрузки; у старых загрузок его нет
+    return getattr(file_meta, 'profile', None)
+
+
+def _chart_options(params, options, profile):
+    # отфильтрованные строки и другой профиль отрисовки — другой график: оба входят в ключ кэша
+    options = dict(options, render=RENDER_PROFILES[profile])
+    if params.get('filters'):
+        options['filters'] = params['filters']
+    return options
+
+
+def _check_columns(selected, columns):
+    for c in selected:
+        if c not in columns:
+            raise ValueError(f'Колонка {c} не найдена в файле.')
+
+
+def column_chart_job(file_meta, params, result):
+    selected_cols = params['columns']
+    plot_t = params.get('plot_type', 'hist')
+
+    if params.get('output') == 'json':
+        # данные для графика в браузере — matplotlib не нужен
+        df_local = _load(file_meta, params, selected_cols)
+        with span('coerce'):
+            numeric = coerce_numeric(df_local, selected_cols, non_numeric_columns(_profile(file_meta)))
+        with span('chart_data'):
+            result['chart_data'] = column_chart_data(
+                numeric, selected_cols, plot_t, settings.ANALYSIS_CHART_JSON_POINTS)
+        return f"Chart data for {len(selected_cols)} columns", None, None
+
+    # готовый график из кэша — без чтения данных и без matplotlib
+    counter = CacheCounter()
+    max_points = settings.ANALYSIS_LINE_MAX_POINTS
+    render_profile = profile_name(params.get('render_profile'))
+    key = chart_key(_content_hash(file_meta), 'column_chart', selected_cols,
+                    _chart_options(params, {'plot_type': plot_t, 'max_points': max_points}, render_profile))
+    image = get_chart(key, counter)
+    if image is None:
+        df_local = _load(file_meta, params, selected_cols)
+
+        series = []
+        with span('coerce'):
+            numeric = coerce_numeric(df_local, selected_cols, non_numeric_columns(_profile(file_meta)))
+            for col in selected_cols:
+                values = numeric[col].dropna()
+                x = values.index.to_numpy() if not values.empty else None
+                y = values.to_numpy() if not values.empty else None
+                if plot_t == 'line' and y is not None:
+                    # линия прореживается до ширины картинки (LTTB)
+                    x, y = lttb(x, y, max_points)
+                series.append({'title': col, 'x': x, 'y': y})
+        image = render('column_chart', {'plot_type': plot_t, 'series': series}, render_profile)
+        put_chart(key, image)
+    fmt = chart_format(render_profile)
+    result['plot'] = save_artifact(image, fmt)
+    result['chart_cache'] = counter.as_dict()
+    return f"Chart for {len(selected_cols)} columns", image, f'chart.{fmt}'
+
+
+def describe_job(file_meta, params, result):
+    selected_cols = params['columns']
+    include_plots_flag = params.get('include_plots', False)
+
+    # большие файлы считаем потоково по частям кэша, не поднимая их целиком в память
+    meta = read_dataset_meta(file_meta.dataset_path) if file_meta and file_meta.dataset_path else None
+    # (потоковый путь фильтров строк не поддерживает)
+    streaming = (meta is not None and meta['rows'] > settings.ANALYSIS_DESCRIBE_STREAMING_ROWS
+                 and not params.get('filters'))
+
+    # гистограммы: сначала кэш, остальные — сырые значения или (потоково) счётчики по корзинам
+    counter = CacheCounter()
+    content_hash = _content_hash(file_meta, meta)
+    # много гистограмм без явного выбора — миниатюры: время рендера и размер страницы предсказуемы
+    render_profile = profile_name(params.get('render_profile'), len(selected_cols))
+    hist_options = _chart_options(params, {'bins': 30}, render_profile)
+    hist_keys = {col: chart_key(content_hash, 'histogram', [col], hist_options) for col in selected_cols}
+    cached = {}
+    if include_plots_flag:
+        for col in selected_cols:
+            image = get_chart(hist_keys[col], counter)
+            if image is not None:
+                cached[col] = image
+    to_render = [col for col in selected_cols if col not in cached]
+
+    hist_data = {}
+    if streaming:
+        _check_columns(selected_cols, meta['columns'])
+        with span('stats'):
+            df_out, acc = describe_streaming(
+                file_meta.dataset_path, meta, selected_cols,
+                sketch_size=settings.ANALYSIS_SKETCH_SIZE,
+                workers=settings.ANALYSIS_STREAMING_WORKERS,
+                profile=_profile(file_meta),
+            )
+        if include_plots_flag and to_render:
+            idx = [selected_cols.index(col) for col in to_render]
+            with span('histograms'):
+                hists = streaming_histograms(file_meta.dataset_path, meta, to_render, acc.min[idx], acc.max[idx])
+            for col, (counts, edges) in hists.items():
+                hist_data[col] = {'edges': edges, 'counts': counts}
+    else:
+        df_local = _load(file_meta, params, selected_cols)
+        # все числовые колонки приводятся и считаются одним батчем; тип, пропуски и уникальные — из профиля
+        profile = _profile(file_meta)
+        with span('coerce'):
+            numeric = coerce_numeric(df_local, selected_cols, non_numeric_columns(profile))
+        with span('stats'):
+            df_out = describe_table(df_local, selected_cols, numeric=numeric,
+                                    profile=profile_columns(profile, selected_cols))
+        if include_plots_flag:
+            for col in to_render:
+                s = numeric[col].dropna()
+                if not s.empty:
+                    hist_data[col] = {'values': s.to_numpy(), 'bins': 30}
+
+    # гистограммы по колонкам рендерятся параллельно в пуле; упавший график просто пропускаем
+    tasks = [('histogram', dict(hist, title=f'{col} — histogram')) for col, hist in hist_data.items()]
+    for col, image in zip(hist_data, render_many(tasks, skip_errors=True, profile=render_profile)):
+        if image is not None:
+            put_chart(hist_keys[col], image)
+            cached[col] = image
+    fmt = chart_format(render_profile)
+    plots = {col: save_artifact(cached[col], fmt) for col in selected_cols if col in cached}
+
+    # HTML результат
+    table_html = df_out.to_html(classes='table table-sm table-bordered', na_rep='', escape=False)
+    result['html'] = f'<div class="table-responsive" style="max-height:420px; overflow:auto;">{table_html}</div>'
+    result['plots'] = plots
+    if include_plots_flag:
+        result['chart_cache'] = counter.as_dict()
+
+    # CSV для скачивания
+    csv_text = df_out.to_csv()
+    result['csv'] = csv_text
+    csv_bytes = ('\ufeff' + csv_text).encode('utf-8')
+
+    summary_text = f"Describe: {len(selected_cols)} columns"
+    return summary_text, csv_bytes, 'describe.csv'
+
+
+def correlation_job(file_meta, params, result):
+    xcol, ycol = params['columns']
+    df_local = _load(file_meta, params, [xcol, ycol])
+    with span('coerce'):
+        df_clean = coerce_numeric(df_local, [xcol, ycol], non_numeric_columns(_profile(file_meta))).dropna()
+    if df_clean.shape[0] < 2:
+        raise ValueError("Недостаточно данных для корреляции.")
+
+    with span('stats'):
+        corr = df_clean[xcol].corr(df_clean[ycol], method='pearson')
+    summary_text = f"Correlation (Pearson) between {xcol} and {ycol}: r={corr:.3f}, n={df_clean.shape[0]}"
+    title = f'Диаграмма рассеяния ({xcol} vs {ycol}), r={corr:.3f}'
+
+    if params.get('output') == 'json':
+        with span('chart_data'):
+            result['chart_data'] = scatter_data(
+                df_clean[xcol].to_numpy(), df_clean[ycol].to_numpy(), xcol, ycol, title,
+                settings.ANALYSIS_CHART_JSON_POINTS, settings.ANALYSIS_CHART_JSON_DENSITY_BINS,
+            )
+        return summary_text, None, None
+
+    counter = CacheCounter()
+    max_points = settings.ANALYSIS_SCATTER_MAX_POINTS
+    density_bins = settings.ANALYSIS_SCATTER_DENSITY_BINS
+    render_profile = profile_name(params.get('render_profile'))
+    key = chart_key(_content_hash(file_meta), 'scatter', [xcol, ycol],
+                    _chart_options(params, {'max_points': max_points, 'density_bins': density_bins}, render_profile))
+    image = get_chart(key, counter)
+    if image is None:
+        payload = {
+            'xlabel': xcol,
+            'ylabel': ycol,
+            'title': title,
+        }
+        x, y = df_clean[xcol].to_numpy(), df_clean[ycol].to_numpy()
+        if len(x) > max_points:
+            # слишком много точек — рисуем плотность на сетке
+            payload['density'] = density_grid(x, y, density_bins)
+        else:
+            payload.update(x=x, y=y)
+        image = render('scatter', payload, render_profile)
+        put_chart(key, image)
+    result['plot_img'] = save_artifact(image, chart_format(render_profile))
+    result['chart_cache'] = counter.as_dict()
+    return summary_text, None, None  # нет CSV
+
+
+METHOD_LABELS = {'pearson': 'Pearson', 'spearman': 'Spearman', 'kendall': 'Kendall'}
+
+
+def correlation_matrix_job(file_meta, params, result):
+    selected_cols = params['columns']
+    method = params.get('method', 'pearson')
+    df_local = _load(file_meta, params, selected_cols)
+
+    # все колонки приводятся к числам один раз, пары считаются по строкам, где заполнены обе
+    with span('coerce'):
+        numeric = coerce_numeric(df_local, selected_cols, non_numeric_columns(_profile(file_meta)))
+    with span('stats'):
+        r, n = correlation_matrix(numeric, method)
+
+    table_html = r.round(3).to_html(classes='table table-sm table-bordered', na_rep='')
+    n_html = n.to_html(classes='table table-sm table-bordered')
+    result['html'] = (
+        f'<div class="table-responsive" style="max-height:420px; overflow:auto;">{table_html}</div>'
+        f'<h6 class="mt-3">Число пар наблюдений (n)</h6>'
+        f'<div class="table-responsive" style="max-height:420px; overflow:auto;">{n_html}</div>'
+    )
+
+    counter = CacheCounter()
+    render_profile = profile_name(params.get('render_profile'))
+    key = chart_key(_content_hash(file_meta), 'heatmap', selected_cols,
+                    _chart_options(params, {'method': method}, render_profile))
+    image = get_chart(key, counter)
+    if image is None:
+        image = render('heatmap', {
+            'matrix': r.to_numpy(),
+            'labels': list(selected_cols),
+            'title': f'Матрица корреляций ({METHOD_LABELS[method]})',
+        }, render_profile)
+        put_chart(key, image)
+    result['heatmap'] = save_artifact(image, chart_format(render_profile))
+    result['chart_cache'] = counter.as_dict()
+
+    # CSV: по строке на пару колонок
+    index = pd.MultiIndex.from_product([r.index, r.columns], names=['column_x', 'column_y'])
+    pairs = pd.DataFrame({'r': r.to_numpy().ravel(), 'n': n.to_numpy().ravel()}, index=index)
+    csv_text = pairs.to_csv()
+    result['csv'] = csv_text
+    result['csv_name'] = 'correlation_matrix.csv'
+    csv_bytes = ('\ufeff' + csv_text).encode('utf-8')
+
+    summary_text = f"Correlation matrix ({METHOD_LABELS[method]}): {len(selected_cols)} columns"
+    return summary_text, csv_bytes, 'correlation_matrix.csv'
+
+
+ANALYSES = {
+    'column_chart': column_chart_job,
+    'describe': describe_job,
+    'correlation': correlation_job,
+    'correlation_matrix': correlation_matrix_job,
+}
@@ -0,0 +1,56 @@
+import hashlib
+import os
+import re
+import uuid
+from typing import Optional
+
+from django.core.files.storage import default_storage
+
+# Готовые графики отчётов (MEDIA_ROOT/charts): имя файла — sha256 содержимого и формат (<sha>.webp),
+# поэтому одинаковые картинки хранятся один раз, а имя годится как сильный ETag.
+
+ARTIFACTS_DIR = 'charts'
+ARTIFACT_NAME_RE = re.compile(r'^[0-9a-f]{64}\.(png|webp|svg)$')
+CONTENT_TYPES = {'png': 'image/png', 'webp': 'image/webp', 'svg': 'image/svg+xml'}
+
+
+def artifact_format(name: str) -> str:
+    return name.rsplit('.', 1)[1]
+
+
+def artifact_path(name: str) -> str:
+    return default_storage.path(os.path.join(ARTIFACTS_DIR, name[:2], name))
+
+
+def save_artifact(data: bytes, fmt: str = 'png') -> str:
+    name = f'{hashlib.sha256(data).hexdigest()}.{fmt}'
+    path = artifact_path(name)
+    try:
+        # такой график уже есть: обновляем mtime — уборка не трогает файлы моложе grace и не удалит его,
+        # пока отчёт, который на него сошлётся, ещё не сохранён
+        os.utime(path)
+        return name
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+    return name
+
+
+def find_artifact(name: str) -> Optional[str]:
+    if not ARTIFACT_NAME_RE.match(name or ''):
+        return None
+    path = artifact_path(name)
+    return path if os.path.isfile(path) else None
+
+
+def report_artifacts(result: Optional[dict]) -> set:
+    # имена файлов всех графиков, на которые ссылается результат отчёта
+    result = result or {}
+    names = {result.get('plot'), result.get('plot_img'), result.get('heatmap')}
+    names.update((result.get('plots') or {}).values())
+    names.discard(None)
+    return names
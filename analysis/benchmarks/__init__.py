@@ -0,0 +1,2 @@
+# Бенчмарки движков анализа: генератор синтетических CSV и набор замеров.
+# Запуск: python manage.py analysis_benchmark (см. management/commands/analysis_benchmark.py)
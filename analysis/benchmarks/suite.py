@@ -0,0 +1,385 @@
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+
+from analysis.charts import render, render_many
+from analysis.correlation import correlation_matrix
+from analysis.models import ReportMeta
+from analysis.profiling import non_numeric_columns, profile_columns
+from analysis.render_profiles import RENDER_PROFILES
+from analysis.datasets import dataset_path_for, delete_dataset, ingest_csv, load_dataset, read_dataset_meta
+from analysis.stats import coerce_numeric, describe_table
+from analysis.streaming import describe_streaming
+from .synthetic import make_shape, write_csv
+
+# Набор замеров: каждый бенчмарк — setup(ctx) -> функция без аргументов, время меряется только у неё.
+# ctx — подготовленный набор одной формы: путь к CSV, колоночный кэш, DataFrame, числовые колонки.
+# Сквозные замеры (e2e_*) создают пользователей и отчёты — только во временной тестовой БД.
+
+BENCHMARKS: Dict[str, Callable] = {}
+
+CHART_COLUMNS = 3       # сколько колонок на графике по колонкам
+KENDALL_COLUMNS = 10    # Кендалл по широкой таблице — только первые колонки, иначе замер идёт минутами
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark('csv_load')
+def _csv_load(ctx):
+    target = dataset_path_for(ctx.rel_path) + '.bench'
+
+    def run():
+        delete_dataset(target)
+        ingest_csv(ctx.full_path, target, chunk_rows=settings.ANALYSIS_INGEST_CHUNK_ROWS)
+    return run
+
+
+@benchmark('dataset_load')
+def _dataset_load(ctx):
+    return lambda: load_dataset(ctx.rel_path, ctx.file_meta)
+
+
+@benchmark('dataset_load_projected')
+def _dataset_load_projected(ctx):
+    # два столбца, как у корреляции: читаются только их массивы
+    columns = ctx.numeric_columns[:2]
+    return lambda: load_dataset(ctx.rel_path, ctx.file_meta, columns=columns)
+
+
+@benchmark('csv_read')
+def _csv_read(ctx):
+    # без колоночного кэша: весь CSV с выводом типов
+    return lambda: load_dataset(ctx.rel_path)
+
+
+@benchmark('csv_read_projected')
+def _csv_read_projected(ctx):
+    # без колоночного кэша: usecols и типы из профиля
+    columns = ctx.numeric_columns[:2]
+    file_meta = SimpleNamespace(dataset_path=None, profile=ctx.file_meta.profile)
+    return lambda: load_dataset(ctx.rel_path, file_meta, columns=columns)
+
+
+@benchmark('describe')
+def _describe(ctx):
+    columns = list(ctx.df.columns)
+
+    def run():
+        numeric = coerce_numeric(ctx.df, columns)
+        describe_table(ctx.df, columns, numeric=numeric)
+    return run
+
+
+@benchmark('describe_profiled')
+def _describe_profiled(ctx):
+    # то же, но с профилем загрузки: колонки без чисел не разбираются, тип/пропуски/уникальные готовы
+    columns = list(ctx.df.columns)
+    profile = ctx.file_meta.profile
+
+    def run():
+        numeric = coerce_numeric(ctx.df, columns, non_numeric_columns(profile))
+        describe_table(ctx.df, columns, numeric=numeric, profile=profile_columns(profile, columns))
+    return run
+
+
+@benchmark('describe_streaming')
+def _describe_streaming(ctx):
+    meta = read_dataset_meta(ctx.file_meta.dataset_path)
+    columns = list(ctx.df.columns)
+    return lambda: describe_streaming(ctx.file_meta.dataset_path, meta, columns,
+                                      sketch_size=settings.ANALYSIS_SKETCH_SIZE)
+
+
+def _chart_series(ctx):
+    series = []
+    for col in ctx.numeric_columns[:CHART_COLUMNS]:
+        values = pd.to_numeric(ctx.df[col], errors='coerce').dropna()
+        series.append({'title': col, 'x': values.index.to_numpy(), 'y': values.to_numpy()})
+    return series
+
+
+def _chart_benchmark(plot_type):
+    def setup(ctx):
+        series = _chart_series(ctx)
+        return lambda: render('column_chart', {'plot_type': plot_type, 'series': series})
+    return setup
+
+
+for _plot_type in ('hist', 'line', 'box'):
+    benchmark(f'chart_{_plot_type}')(_chart_benchmark(_plot_type))
+
+
+def _histograms_benchmark(profile):
+    # describe с графиками: гистограммы всех числовых колонок одним render_many в профиле отрисовки
+    def setup(ctx):
+        tasks = [('histogram', {'title': col, 'values': pd.to_numeric(ctx.df[col], errors='coerce').dropna().to_numpy(),
+                                'bins': 30})
+                 for col in ctx.numeric_columns]
+        return lambda: render_many(tasks, skip_errors=True, profile=profile)
+    return setup
+
+
+for _profile in RENDER_PROFILES:
+    benchmark(f'histograms_{_profile}')(_histograms_benchmark(_profile))
+
+
+@benchmark('correlation_pair')
+def _correlation_pair(ctx):
+    xcol, ycol = ctx.numeric_columns[:2]
+
+    def run():
+        clean = pd.DataFrame({
+            xcol: pd.to_numeric(ctx.df[xcol], errors='coerce'),
+            ycol: pd.to_numeric(ctx.df[ycol], errors='coerce'),
+        }).dropna()
+        corr = clean[xcol].corr(clean[ycol])
+        render('scatter', {'x': clean[xcol].to_numpy(), 'y': clean[ycol].to_numpy(),
+                           'xlabel': xcol, 'ylabel': ycol, 'title': f'r={corr:.3f}'})
+    return run
+
+
+def _matrix_benchmark(method):
+    def setup(ctx):
+        columns = ctx.numeric_columns[:KENDALL_COLUMNS] if method == 'kendall' else ctx.numeric_columns
+        numeric = coerce_numeric(ctx.df, columns)
+        return lambda: correlation_matrix(numeric, method)
+    return setup
+
+
+for _method in ('pearson', 'spearman', 'kendall'):
+    benchmark(f'correlation_matrix_{_method}')(_matrix_benchmark(_method))
+
+
+def _e2e_benchmark(url, post_data):
+    # полный путь через тестовый клиент: загрузка CSV, постановка задачи (выполняется сразу), страница отчёта.
+    # Без общей транзакции с откатом: задача выполняется в другом потоке со своим соединением и незакоммиченных
+    # строк не видит — пользователь (с одноразовым адресом) и всё, что он создал, удаляются после замера
+    def setup(ctx):
+        def run():
+            user = get_user_model().objects.create_user(email=f'benchmark-{uuid.uuid4().hex}@example.invalid')
+            try:
+                client = Client()
+                client.force_login(user)
+                with open(ctx.full_path, 'rb') as fh:
+                    upload = io.BytesIO(fh.read())
+                upload.name = 'weather.csv'
+                response = client.post('/postfile/', {'file': upload, 'next_partial': 'column_chart.html'})
+                if response.status_code != 200:
+                    raise RuntimeError(f'/postfile/: HTTP {response.status_code}')
+                response = client.post(url, post_data(ctx), follow=True)
+                if response.status_code != 200:
+                    raise RuntimeError(f'{url}: HTTP {response.status_code}')
+                # страница отчёта отдаётся и для упавшей задачи — замер засчитывается только готовому отчёту
+                report = ReportMeta.objects.filter(owner=user).order_by('-id').first()
+                if report is None or report.status != ReportMeta.STATUS_DONE:
+                    status = report.status if report else 'no report'
+                    error = (report.result or {}).get('error', '') if report else ''
+                    raise RuntimeError(f'{url}: {status} {error}'.strip())
+            finally:
+                user.delete()
+        return run
+    return setup
+
+
+benchmark('e2e_describe')(_e2e_benchmark(
+    '/analysis/describe/run/', lambda ctx: {'columns': ctx.numeric_columns[:CHART_COLUMNS], 'include_plots': '1'}))
+benchmark('e2e_chart')(_e2e_benchmark(
+    '/analysis/run/', lambda ctx: {'analysis_type': 'column_chart', 'columns': ctx.numeric_columns[:CHART_COLUMNS]}))
+benchmark('e2e_correlation')(_e2e_benchmark(
+    '/analysis/correlation/run/', lambda ctx: {'columns': ctx.numeric_columns[:2]}))
+
+
+# Замеры запуска: каждый повтор — свежий процесс Python, где ещё ничего не импортировано и не прогрето.
+# (prepare, code): prepare выполняется до замера, время меряется только у code. В результат попадает и то,
+# какие тяжёлые модули оказались загружены: urls и первая лёгкая страница не должны тянуть pandas/matplotlib.
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib')
+
+_PROBE_SCRIPT = '''
+import json, sys, time
+import django
+{prepare}
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def _first_request_code() -> str:
+    # хост — из ALLOWED_HOSTS, иначе ответ 400 без обработки запроса
+    host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+    module, name = settings.WSGI_APPLICATION.rsplit('.', 1)
+    return '\n'.join([
+        f'application = getattr(import_module({module!r}), {name!r})',
+        f"environ = {{'PATH_INFO': '/about/', 'HTTP_HOST': {host!r}}}",
+        'setup_testing_defaults(environ)',
+        'statuses = []',
+        "b''.join(application(environ, lambda status, headers: statuses.append(status)))",
+        "statuses[0].startswith('200') or sys.exit(f'/about/: {statuses[0]}')",
+    ])
+
+
+_FIRST_CHART = "_render_task(('histogram', {'title': 'probe', 'values': list(range(1000))}, 'full'))"
+
+STARTUP_PROBES = {
+    'startup_setup': ('', 'django.setup()'),
+    'startup_urls': ('django.setup()\nfrom importlib import import_module\nfrom django.conf import settings',
+                     'import_module(settings.ROOT_URLCONF)'),
+    # холодный старт веб-процесса: модуль WSGI (django.setup, хук прогрева) и первая лёгкая страница
+    'startup_first_request': ('from importlib import import_module\nfrom wsgiref.util import setup_testing_defaults',
+                              _first_request_code),
+    'startup_analysis_imports': ('django.setup()', 'import analysis.analyses'),
+    'startup_warm_up': ('django.setup()\nfrom analysis.warmup import warm_up', 'warm_up()'),
+    # первый график в процессе без прогрева (импорты, шрифты, рендер) и после warm_up
+    'startup_first_chart': ('django.setup()', f'from analysis.charts import _render_task\n{_FIRST_CHART}'),
+    'startup_first_chart_warm': ('django.setup()\nfrom analysis.warmup import warm_up\nwarm_up()\n'
+                                 'from analysis.charts import _render_task', _FIRST_CHART),
+}
+
+
+def _run_probe(name: str) -> dict:
+    prepare, code = STARTUP_PROBES[name]
+    # code — строка или функция, собирающая её из текущих настроек
+    script = _PROBE_SCRIPT.format(prepare=prepare, code=code() if callable(code) else code, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f'{name}: {proc.stderr.strip().splitlines()[-1:]}')
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _measure_startup(name: str, repeat: int) -> dict:
+    # без прогревочного прогона: холодный запуск и есть предмет замера
+    runs = [_run_probe(name) for _ in range(repeat)]
+    times = [run['seconds'] for run in runs]
+    return {'min': min(times), 'median': statistics.median(times), 'repeat': repeat, 'modules': runs[-1]['modules']}
+
+
+def _prepare(shape: str, scale: float, nan_ratio: float, seed: int) -> SimpleNamespace:
+    df_source = make_shape(shape, scale=scale, nan_ratio=nan_ratio, seed=seed)
+    rel_path = os.path.join('benchmarks', f'{shape}.csv')
+    full_path = default_storage.path(rel_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    write_csv(df_source, full_path)
+    dataset_path = dataset_path_for(rel_path)
+    meta, _ = ingest_csv(full_path, dataset_path, chunk_rows=settings.ANALYSIS_INGEST_CHUNK_ROWS)
+    file_meta = SimpleNamespace(dataset_path=dataset_path, profile=meta['profile'])
+    df = load_dataset(rel_path, file_meta)
+    numeric_columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    return SimpleNamespace(shape=shape, rel_path=rel_path, full_path=full_path, file_meta=file_meta,
+                           df=df, numeric_columns=numeric_columns, rows=len(df), columns=df.shape[1])
+
+
+def _measure(func: Callable, repeat: int) -> dict:
+    func()  # прогрев: импорты, шрифты, кэши файловой системы
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+
+@contextmanager
+def _test_database():
+    # та же тестовая БД, что у manage.py test: test_<NAME> (SQLite — в памяти), удаляется после прогона
+    old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+def run_benchmarks(shapes: List[str], scale: float = 1.0, repeat: int = 3, nan_ratio: float = 0.05,
+                   seed: int = 0, only: Optional[List[str]] = None, log=None) -> dict:
+    def selected(names):
+        return [name for name in names if not only or any(name.startswith(prefix) for prefix in only)]
+
+    names = selected(BENCHMARKS)
+    results = {}
+    # замеры запуска не зависят от формы данных — по одному разу; процессы замеров видят обычные настройки
+    for name in selected(STARTUP_PROBES):
+        results[name] = _measure_startup(name, repeat)
+        if log:
+            log(f'{name:45s} {results[name]["median"]:9.4f} s  {",".join(results[name]["modules"]) or "-"}')
+    media_root = tempfile.mkdtemp(prefix='analysis-bench-')
+    # отдельный MEDIA_ROOT, рендер и разбор в текущем процессе (процессы пулов его не видят),
+    # задачи — сразу в запросе, кэш графиков отключён
+    overrides = override_settings(MEDIA_ROOT=media_root, ANALYSIS_RENDER_WORKERS=0, ANALYSIS_COMPUTE_WORKERS=0,
+                                  ANALYSIS_JOBS_INLINE=True, ANALYSIS_CHART_CACHE_MB=0,
+                                  ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+    writes_db = any(name.startswith('e2e_') for name in names)
+    try:
+        with overrides, _test_database() if writes_db else nullcontext():
+            for shape in shapes if names else ():
+                ctx = _prepare(shape, scale, nan_ratio, seed)
+                for name in names:
+                    key = f'{name}[{shape}]'
+                    results[key] = _measure(BENCHMARKS[name](ctx), repeat)
+                    results[key].update(rows=ctx.rows, columns=ctx.columns)
+                    if log:
+                        log(f'{key:45s} {results[key]["median"]:9.4f} s')
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+    return {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'shapes': shapes,
+            'scale': scale,
+            'nan_ratio': nan_ratio,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta: float = 0.005) -> List[str]:
+    # регрессия: медиана выросла больше чем на threshold (доля) и больше чем на min_delta секунд
+    regressions = []
+    for key, now in current['results'].items():
+        before = baseline.get('results', {}).get(key)
+        if before is None:
+            continue
+        delta = now['median'] - before['median']
+        if delta > min_delta and now['median'] > before['median'] * (1 + threshold):
+            regressions.append(f'{key}: {before["median"]:.4f} s -> {now["median"]:.4f} s '
+                               f'(+{delta / before["median"] * 100:.0f}%)')
+    return regressions
+
+
+def save_results(results: dict, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(results, fh, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+# Воспроизводимые синтетические наборы «как погодные файлы»: кириллические заголовки,
+# смесь числовых, категориальных колонок и дат, заданная доля пропусков.
+
+NUMERIC_NAMES = ('Температура', 'Влажность', 'Давление', 'Скорость ветра', 'Осадки', 'Облачность',
+                 'Видимость', 'Точка росы')
+CATEGORICAL_NAMES = ('Направление ветра', 'Погода', 'Станция')
+CATEGORIES = {
+    'Направление ветра': ('С', 'СВ', 'В', 'ЮВ', 'Ю', 'ЮЗ', 'З', 'СЗ', 'Штиль'),
+    'Погода': ('Ясно', 'Облачно', 'Дождь', 'Снег', 'Туман', 'Гроза'),
+    'Станция': ('Москва', 'Казань', 'Новосибирск', 'Владивосток', 'Сочи'),
+}
+
+# готовые формы: число строк и состав колонок
+SHAPES = {
+    'tall': {'rows': 200_000, 'numeric': 6, 'categorical': 2, 'dates': 1},
+    'wide': {'rows': 5_000, 'numeric': 120, 'categorical': 20, 'dates': 2},
+    'mixed': {'rows': 50_000, 'numeric': 10, 'categorical': 3, 'dates': 1},
+}
+
+
+def _column_name(names, i):
+    # после базовых имён — «Температура 2», «Температура 3»…
+    base = names[i % len(names)]
+    return base if i < len(names) else f'{base} {i // len(names) + 1}'
+
+
+def make_dataset(rows: int, numeric: int = 6, categorical: int = 2, dates: int = 1,
+                 nan_ratio: float = 0.05, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(dates):
+        start = np.datetime64('2015-01-01T00:00') + np.timedelta64(i * 365, 'D')
+        data['Дата' if i == 0 else f'Дата {i + 1}'] = start + np.arange(rows) * np.timedelta64(1, 'h')
+    for i in range(numeric):
+        name = _column_name(NUMERIC_NAMES, i)
+        # сезонный ход + шум; каждая третья колонка целочисленная
+        trend = 10 * np.sin(np.arange(rows) * 2 * np.pi / (24 * 365) + i)
+        values = trend + rng.normal(0, 3 + i % 5, rows)
+        data[name] = np.round(values) if i % 3 == 2 else np.round(values, 2)
+    for i in range(categorical):
+        name = _column_name(CATEGORICAL_NAMES, i)
+        data[name] = rng.choice(CATEGORIES[CATEGORICAL_NAMES[i % len(CATEGORICAL_NAMES)]], rows)
+    df = pd.DataFrame(data)
+    if nan_ratio:
+        for name in df.columns:
+            mask = rng.random(rows) < nan_ratio
+            if not name.startswith('Дата'):
+                df[name] = df[name].mask(mask)
+    return df
+
+
+def make_shape(shape: str, scale: float = 1.0, nan_ratio: float = 0.05, seed: int = 0) -> pd.DataFrame:
+    spec = dict(SHAPES[shape])
+    spec['rows'] = max(10, int(spec['rows'] * scale))
+    return make_dataset(nan_ratio=nan_ratio, seed=seed, **spec)
+
+
+def write_csv(df: pd.DataFrame, path: str) -> int:
+    df.to_csv(path, index=False, encoding='utf-8')
+    return len(df)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .timing import span
+
+# Кэш готовых графиков на диске (MEDIA_ROOT/chart_cache), ключ — хеш содержимого набора данных,
+# колонки, тип графика и параметры отрисовки (в том числе профиль: формат, DPI, бюджет).
+# Размер ограничен, вытесняются давно не читанные (LRU по mtime). Каталог целиком обходится не на
+# каждую запись: процесс ведёт оценку размера (обход при первой записи плюс свои записи) и вытесняет,
+# когда она превышает лимит. Записи других процессов оценка не видит — их учитывает следующий обход,
+# в том числе в manage.py analysis_sweep.
+
+CACHE_DIR = 'chart_cache'
+# меняется при изменении оформления графиков, чтобы не отдавать картинки старого вида
+CHART_STYLE_VERSION = 2
+CHART_SUFFIX = '.chart'     # формат картинки задан ключом
+
+_estimated_bytes = None     # размер кэша по последнему обходу и записям этого процесса
+
+
+class CacheCounter:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def chart_key(content_hash: Optional[str], kind: str, columns, options: Optional[dict] = None) -> Optional[str]:
+    if not content_hash:
+        return None
+    raw = json.dumps(
+        [CHART_STYLE_VERSION, content_hash, kind, list(columns), options or {}],
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _cache_root() -> str:
+    return default_storage.path(CACHE_DIR)
+
+
+def _key_path(key: str) -> str:
+    return os.path.join(_cache_root(), key[:2], key + CHART_SUFFIX)
+
+
+def get_chart(key: Optional[str], counter: Optional[CacheCounter] = None) -> Optional[bytes]:
+    data = None
+    if key:
+        path = _key_path(key)
+        try:
+            with span('chart_cache'), open(path, 'rb') as fh:
+                data = fh.read()
+            # отметка использования для LRU
+            os.utime(path)
+        except OSError:
+            data = None
+    if counter is not None:
+        if data is None:
+            counter.misses += 1
+        else:
+            counter.hits += 1
+    return data
+
+
+def put_chart(key: Optional[str], data: Optional[bytes]) -> None:
+    if not key or data is None:
+        return
+    with span('chart_cache'):
+        path = _key_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+        global _estimated_bytes
+        max_bytes = settings.ANALYSIS_CHART_CACHE_MB * 1024 * 1024
+        if _estimated_bytes is not None:
+            _estimated_bytes += len(data)
+        if _estimated_bytes is None or _estimated_bytes > max_bytes:
+            evict(max_bytes)
+
+
+def evict(max_bytes: int) -> int:
+    # удаляем самые давно использованные файлы, пока кэш не станет меньше 90% лимита
+    global _estimated_bytes
+    entries = []
+    total = 0
+    root = _cache_root()
+    if not os.path.isdir(root):
+        _estimated_bytes = 0
+        return 0
+    for bucket in os.scandir(root):
+        if not bucket.is_dir():
+            continue
+        for entry in os.scandir(bucket.path):
+            if not entry.name.endswith(CHART_SUFFIX):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+    if total <= max_bytes:
+        _estimated_bytes = total
+        return 0
+    removed = 0
+    target = int(max_bytes * 0.9)
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    _estimated_bytes = total
+    return removed
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from .downsample import density_grid, lttb
+
+# Данные для графиков, которые рисует браузер: вместо PNG — компактный JSON с уже агрегированными
+# корзинами гистограмм, пятью числами для boxplot и прореженными точками.
+
+HIST_BINS = 30
+
+
+def _floats(values) -> list:
+    return [float(v) for v in values]
+
+
+def _box_summary(values: np.ndarray) -> dict:
+    # те же усы, что у matplotlib boxplot: крайние значения в пределах 1.5 IQR от квартилей
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        'min': float(values.min()),
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'max': float(values.max()),
+        'whislo': float(inside.min()),
+        'whishi': float(inside.max()),
+        'outliers': int(len(values) - len(inside)),
+    }
+
+
+def column_chart_data(df: pd.DataFrame, columns, plot_type: str, max_points: int) -> dict:
+    series = []
+    for col in columns:
+        values = pd.to_numeric(df[col], errors='coerce').dropna()
+        item = {'title': col, 'n': int(len(values))}
+        if values.empty:
+            series.append(item)
+            continue
+        y = values.to_numpy(dtype=np.float64)
+        if plot_type == 'line':
+            x, y = lttb(values.index.to_numpy(dtype=np.float64), y, max_points)
+            item['line'] = {'x': _floats(x), 'y': _floats(y)}
+        elif plot_type == 'box':
+            item['box'] = _box_summary(y)
+        else:
+            counts, edges = np.histogram(y, bins=HIST_BINS)
+            item['hist'] = {'edges': _floats(edges), 'counts': counts.tolist()}
+        series.append(item)
+    return {'plot_type': plot_type, 'series': series}
+
+
+def scatter_data(x: np.ndarray, y: np.ndarray, xlabel: str, ylabel: str, title: str,
+                 max_points: int, density_bins: int) -> dict:
+    data = {'xlabel': xlabel, 'ylabel': ylabel, 'title': title, 'n': int(len(x))}
+    if len(x) > max_points:
+        # много точек — только непустые клетки сетки плотности: [i, j, count]
+        grid = density_grid(x, y, density_bins)
+        ii, jj = np.nonzero(grid['counts'])
+        data['density'] = {
+            'xedges': _floats(grid['xedges']),
+            'yedges': _floats(grid['yedges']),
+            'cells': [[int(i), int(j), int(c)] for i, j, c in zip(ii, jj, grid['counts'][ii, jj])],
+        }
+    else:
+        data['points'] = {'x': _floats(x), 'y': _floats(y)}
+    return data
@@ -0,0 +1,238 @@
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+import numpy as np
+
+from .render_profiles import DPI_STEP, RENDER_PROFILES
+from .timing import add_stage
+
+# Сервис отрисовки графиков: только объектный API Figure/FigureCanvasAgg, без глобального pyplot.
+# Задачи — простые словари с массивами, результат — байты картинки в формате профиля отрисовки
+# (render_profiles.py); рендер идёт в тёплом пуле процессов.
+
+COLOR = '#2b8cbe'
+
+# время кодирования картинки внутри текущей задачи рендера (отдельно от рисования)
+_encode_seconds: ContextVar[float] = ContextVar('encode_seconds', default=0.0)
+
+
+def _new_figure(figsize) -> Figure:
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _save(fig: Figure, profile: dict, dpi: int) -> bytes:
+    # без bbox_inches='tight': он рисует фигуру лишний раз ради обрезки полей, поля и так убирает tight_layout
+    buf = io.BytesIO()
+    fmt = profile['format']
+    if fmt == 'svg':
+        # без даты и со стабильными id: одинаковый график — одинаковые байты (имя артефакта — их sha256)
+        with matplotlib.rc_context({'svg.hashsalt': 'analysis'}):
+            fig.savefig(buf, format='svg', dpi=dpi, metadata={'Date': None})
+    elif fmt == 'webp':
+        fig.savefig(buf, format='webp', dpi=dpi, pil_kwargs={'quality': profile['quality']})
+    else:
+        fig.savefig(buf, format='png', dpi=dpi, pil_kwargs={'compress_level': profile['compress_level']})
+    return buf.getvalue()
+
+
+def _rasterize_data(fig: Figure) -> None:
+    # SVG сверх бюджета: точки, столбцы и сетки идут картинкой, подписи и оси остаются векторными
+    for ax in fig.axes:
+        for artist in (*ax.collections, *ax.patches, *ax.lines, *ax.images):
+            artist.set_rasterized(True)
+
+
+def _encode(fig: Figure, profile: dict) -> bytes:
+    # бюджет байтов: DPI снижается шагами, пока картинка не уложится; на min_dpi отдаём как есть
+    start = time.perf_counter()
+    dpi = profile['dpi']
+    data = _save(fig, profile, dpi)
+    if profile['format'] == 'svg' and len(data) > profile['max_bytes']:
+        _rasterize_data(fig)
+        data = _save(fig, profile, dpi)
+    while len(data) > profile['max_bytes'] and dpi > profile['min_dpi']:
+        dpi = max(profile['min_dpi'], int(dpi * DPI_STEP))
+        data = _save(fig, profile, dpi)
+    _encode_seconds.set(_encode_seconds.get() + time.perf_counter() - start)
+    return data
+
+
+def render_column_chart(payload: dict) -> Figure:
+    # payload: plot_type, series = [{'title', 'x', 'y'} | {'title', 'y': None}]
+    series = payload['series']
+    plot_t = payload.get('plot_type', 'hist')
+    n = len(series)
+    fig = _new_figure((6, 3*n))
+    axes = fig.subplots(nrows=n, ncols=1, squeeze=False)[:, 0]
+    for ax, item in zip(axes, series):
+        values = item.get('y')
+        if values is None or not len(values):
+            ax.text(0.5, 0.5, 'Нет числовых данных', ha='center')
+            continue
+        if plot_t == 'hist':
+            ax.hist(values, bins=30, color=COLOR, edgecolor='black')
+        elif plot_t == 'line':
+            ax.plot(item['x'], values, color=COLOR)
+        elif plot_t == 'box':
+            ax.boxplot(values)
+        else:
+            ax.hist(values, bins=30)
+        ax.set_title(item['title'])
+    fig.tight_layout()
+    return fig
+
+
+def render_histogram(payload: dict) -> Figure:
+    # payload: title, values (сырые значения) или edges + counts (уже посчитанные корзины)
+    fig = _new_figure((6, 3))
+    ax = fig.subplots()
+    if payload.get('counts') is not None:
+        edges = payload['edges']
+        ax.hist(edges[:-1], bins=edges, weights=payload['counts'], color=COLOR, edgecolor='black')
+    else:
+        ax.hist(payload['values'], bins=payload.get('bins', 30), color=COLOR, edgecolor='black')
+    ax.set_title(payload['title'])
+    fig.tight_layout()
+    return fig
+
+
+def render_scatter(payload: dict) -> Figure:
+    # payload: x, y, xlabel, ylabel, title; для больших выборок вместо x/y — density (сетка счётчиков)
+    fig = _new_figure((6, 4))
+    ax = fig.subplots()
+    density = payload.get('density')
+    if density is not None:
+        counts = np.ma.masked_equal(density['counts'].T, 0)
+        mesh = ax.pcolormesh(density['xedges'], density['yedges'], counts, cmap='Blues', norm=LogNorm())
+        fig.colorbar(mesh, ax=ax, label='Число точек')
+    else:
+        ax.scatter(payload['x'], payload['y'], alpha=0.7, color=COLOR)
+    ax.set_xlabel(payload['xlabel'])
+    ax.set_ylabel(payload['ylabel'])
+    ax.set_title(payload['title'])
+    fig.tight_layout()
+    return fig
+
+
+def render_heatmap(payload: dict) -> Figure:
+    # payload: matrix (k x k), labels, title; значения подписываются, пока клетки читаемы
+    matrix = np.asarray(payload['matrix'], dtype=float)
+    labels = payload['labels']
+    k = len(labels)
+    side = min(max(4, 0.6 * k + 2), 14)
+    fig = _new_figure((side + 1, side))
+    ax = fig.subplots()
+    im = ax.imshow(np.ma.masked_invalid(matrix), cmap='RdBu_r', vmin=-1, vmax=1)
+    ax.set_xticks(range(k), labels, rotation=90)
+    ax.set_yticks(range(k), labels)
+    if k <= 15:
+        for i in range(k):
+            for j in range(k):
+                if np.isfinite(matrix[i, j]):
+                    ax.text(j, i, f'{matrix[i, j]:.2f}', ha='center', va='center', fontsize=8,
+                            color='white' if abs(matrix[i, j]) > 0.6 else 'black')
+    fig.colorbar(im, ax=ax)
+    ax.set_title(payload['title'])
+    fig.tight_layout()
+    return fig
+
+
+# рисование: payload -> Figure; кодирование в байты — _encode по профилю
+RENDERERS = {
+    'column_chart': render_column_chart,
+    'histogram': render_histogram,
+    'scatter': render_scatter,
+    'heatmap': render_heatmap,
+}
+
+
+def _render_task(task: Tuple[str, dict, str]) -> Tuple[bytes, float, float]:
+    # (картинка, время рисования, время кодирования) — замер идёт в процессе пула
+    kind, payload, profile = task
+    token = _encode_seconds.set(0.0)
+    start = time.perf_counter()
+    try:
+        data = _encode(RENDERERS[kind](payload), RENDER_PROFILES[profile])
+        encode = _encode_seconds.get()
+    finally:
+        _encode_seconds.reset(token)
+    return data, time.perf_counter() - start - encode, encode
+
+
+def _render_task_safe(task: Tuple[str, dict, str]) -> Tuple[Optional[bytes], float, float]:
+    try:
+        return _render_task(task)
+    except Exception:
+        return None, 0.0, 0.0
+
+
+def _warm_worker() -> None:
+    # прогрев процесса: шрифты и бэкенд грузятся один раз, а не на первом графике
+    from matplotlib import font_manager
+    font_manager.fontManager.findfont('DejaVu Sans')
+
+
+_pool = None
+
+
+def get_render_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    workers = settings.ANALYSIS_RENDER_WORKERS
+    if not workers:
+        return None
+    if _pool is None:
+        # spawn: безопасно запускать из многопоточного веб-процесса
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_warm_worker,
+        )
+    return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+def render(kind: str, payload: dict, profile: Optional[str] = None) -> bytes:
+    return render_many([(kind, payload)], skip_errors=False, profile=profile)[0]
+
+
+def render_many(tasks: List[Tuple[str, dict]], skip_errors: bool = False,
+                profile: Optional[str] = None) -> List[Optional[bytes]]:
+    # несколько графиков рендерятся параллельно; при skip_errors упавший график даёт None.
+    # profile — имя из RENDER_PROFILES, одно на все графики запроса
+    func = _render_task_safe if skip_errors else _render_task
+    profile = profile or settings.ANALYSIS_RENDER_PROFILE
+    tasks = [(kind, payload, profile) for kind, payload in tasks]
+    pool = get_render_pool()
+    if pool is None or not tasks:
+        results = [func(task) for task in tasks]
+    else:
+        try:
+            results = list(pool.map(func, tasks))
+        except BrokenProcessPool as exc:
+            # процесс пула умер — пул пересоздаётся при следующем вызове. Не рендерим на месте:
+            # график, уронивший процесс пула, уронил бы и этот
+            _reset_pool()
+            raise RuntimeError('Процесс отрисовки графиков аварийно завершился (возможно, не хватило памяти). '
+                               'Графики не построены.') from exc
+    if results:
+        add_stage('render.draw', sum(r[1] for r in results))
+        add_stage('render.encode', sum(r[2] for r in results))
+    return [r[0] for r in results]
@@ -0,0 +1,15 @@
+from django.utils.functional import SimpleLazyObject
+
+from .workspace import recent_uploads
+
+
+def workspace(request):
+    # недавние загрузки пользователя для переключателя наборов данных в формах;
+    # запрос к БД — только если шаблон их показывает
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {
+        'workspace_uploads': SimpleLazyObject(lambda: recent_uploads(user)),
+        'current_upload_id': request.session.get('uploaded_file_meta_id'),
+    }
@@ -0,0 +1,157 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+# Матрица корреляций по многим колонкам сразу, попарно по строкам, где заполнены обе колонки.
+# Пирсон — матричными произведениями за один проход, Спирмен — Пирсон по рангам,
+# Кендалл (tau-b) — алгоритмом Найта за O(n log n) на пару.
+
+METHODS = ('pearson', 'spearman', 'kendall')
+
+
+def _pearson_matrix(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # x: (n, k) float64 с NaN; суммы по парно-полным строкам через произведения матриц
+    mask = ~np.isnan(x)
+    m = mask.astype(np.float64)
+    # центрирование по средним колонок уменьшает потерю точности в разностях сумм
+    count = m.sum(axis=0)
+    mean = np.divide(np.where(mask, x, 0.0).sum(axis=0), count, out=np.zeros(x.shape[1]), where=count > 0)
+    xc = np.where(mask, x - mean, 0.0)
+    n = m.T @ m
+    sx = xc.T @ m             # sx[i, j] — сумма x_i по строкам, где есть и i, и j
+    sxx = (xc * xc).T @ m
+    sxy = xc.T @ xc
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sx.T / n
+        var_x = sxx - sx * sx / n
+        # постоянная на строках пары колонка: дисперсия — только ошибка округления
+        var_x[var_x <= sxx * 1e-12] = 0.0
+        r = cov / np.sqrt(var_x * var_x.T)
+    r[(n < 2) | (var_x == 0) | (var_x.T == 0)] = np.nan
+    np.clip(r, -1.0, 1.0, out=r)
+    return r, n.astype(np.int64)
+
+
+def _ranks(x: np.ndarray) -> np.ndarray:
+    # средние ранги для связок, NaN остаются NaN
+    return pd.DataFrame(x).rank(method='average').to_numpy(dtype=np.float64)
+
+
+def _ranks_1d(values: np.ndarray) -> np.ndarray:
+    # средние ранги без NaN: позиция в сортировке, для связок — среднее по группе
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    starts = np.concatenate(([True], sorted_values[1:] != sorted_values[:-1]))
+    group = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    last = np.append(first[1:], len(values)) - 1
+    ranks = np.empty(len(values))
+    ranks[order] = (first + last)[group] / 2 + 1
+    return ranks
+
+
+def _pearson_1d(a: np.ndarray, b: np.ndarray) -> float:
+    a = a - a.mean()
+    b = b - b.mean()
+    denom = np.sqrt((a @ a) * (b @ b))
+    return float(np.clip((a @ b) / denom, -1.0, 1.0)) if denom > 0 else np.nan
+
+
+def _spearman_matrix(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    mask = ~np.isnan(x)
+    r, n = _pearson_matrix(_ranks(x))
+    if mask.all():
+        return r, n
+    # с пропусками ранги зависят от набора строк пары — такие пары переранжируем отдельно
+    k = x.shape[1]
+    for i in range(k):
+        for j in range(i + 1, k):
+            both = mask[:, i] & mask[:, j]
+            if (both == mask[:, i]).all() and (both == mask[:, j]).all():
+                continue
+            if both.sum() < 2:
+                continue
+            r[i, j] = r[j, i] = _pearson_1d(_ranks_1d(x[both, i]), _ranks_1d(x[both, j]))
+    return r, n
+
+
+def _count_inversions(a: np.ndarray) -> int:
+    # восходящая сортировка слиянием уровнями: на уровне w блоки длины 2w состоят из двух
+    # отсортированных половин; стабильная сортировка (timsort) сливает их за линейное время.
+    # Для элемента правой половины число инверсий с левой = его позиция до слияния минус после.
+    n = len(a)
+    a = np.asarray(a, dtype=np.int64)
+    pos = np.arange(n, dtype=np.int64)
+    total = 0
+    w = 1
+    while w < n:
+        block = pos // (2 * w)
+        right = (pos // w) % 2
+        key = (block * (n + 1) + a) * 2 + right
+        order = np.argsort(key, kind='stable')
+        merged_pos = np.empty(n, dtype=np.int64)
+        merged_pos[order] = pos
+        total += int((pos - merged_pos)[right == 1].sum())
+        a = a[order]
+        w *= 2
+    return total
+
+
+def _tie_pairs(sorted_values: np.ndarray) -> int:
+    if len(sorted_values) == 0:
+        return 0
+    change = np.flatnonzero(np.diff(sorted_values)) + 1
+    sizes = np.diff(np.concatenate(([0], change, [len(sorted_values)])))
+    return int((sizes * (sizes - 1) // 2).sum())
+
+
+def kendall_tau(x: np.ndarray, y: np.ndarray) -> float:
+    # Knight, 1966: сортировка по (x, y), дискордантные пары — инверсии в y
+    n = len(x)
+    if n < 2:
+        return np.nan
+    order = np.lexsort((y, x))
+    x, y = x[order], y[order]
+    y_rank = np.unique(y, return_inverse=True)[1]
+
+    n0 = n * (n - 1) // 2
+    ties_x = _tie_pairs(x)
+    ties_y = _tie_pairs(np.sort(y))
+    # совместные связки: одинаковые и x, и y (после сортировки стоят подряд)
+    same = np.concatenate(([False], (np.diff(x) == 0) & (np.diff(y) == 0)))
+    group = np.cumsum(~same)
+    sizes = np.bincount(group)
+    ties_xy = int((sizes * (sizes - 1) // 2).sum())
+
+    discordant = _count_inversions(y_rank)
+    denom = np.sqrt(float(n0 - ties_x) * float(n0 - ties_y))
+    if denom == 0:
+        return np.nan
+    return (n0 - ties_x - ties_y + ties_xy - 2 * discordant) / denom
+
+
+def _kendall_matrix(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    mask = ~np.isnan(x)
+    k = x.shape[1]
+    m = mask.astype(np.float64)
+    n = (m.T @ m).astype(np.int64)
+    r = np.eye(k)
+    for i in range(k):
+        if n[i, i] < 2 or np.nanmin(x[:, i]) == np.nanmax(x[:, i]):
+            r[i, i] = np.nan
+        for j in range(i + 1, k):
+            both = mask[:, i] & mask[:, j]
+            r[i, j] = r[j, i] = kendall_tau(x[both, i], x[both, j])
+    return r, n
+
+
+def correlation_matrix(numeric: pd.DataFrame, method: str = 'pearson') -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # numeric — результат coerce_numeric; возвращает матрицу коэффициентов и число пар строк
+    if method not in METHODS:
+        raise ValueError(f'Неизвестный метод корреляции: {method}')
+    x = numeric.to_numpy(dtype=np.float64)
+    func = {'pearson': _pearson_matrix, 'spearman': _spearman_matrix, 'kendall': _kendall_matrix}[method]
+    r, n = func(x)
+    columns = numeric.columns
+    return pd.DataFrame(r, index=columns, columns=columns), pd.DataFrame(n, index=columns, columns=columns)
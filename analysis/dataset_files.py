@@ -0,0 +1,37 @@
+import json
+import os
+import shutil
+from typing import Optional
+
+from django.core.files.storage import default_storage
+
+# Файлы колоночного кэша без numpy/pandas: пути, meta.json, удаление. Нужны представлениям,
+# сессии загрузки и уборке, которые не должны тянуть численный стек при импорте (см. datasets.py).
+DATASET_SUFFIX = '.dataset'
+DATASET_VERSION = 1
+META_NAME = 'meta.json'
+
+
+class IngestError(ValueError):
+    pass
+
+
+def dataset_path_for(rel_path: str) -> str:
+    return rel_path + DATASET_SUFFIX
+
+
+def read_dataset_meta(dataset_path: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(default_storage.path(dataset_path), META_NAME), encoding='utf-8') as fh:
+            meta = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != DATASET_VERSION:
+        return None
+    return meta
+
+
+def delete_dataset(dataset_path: Optional[str]) -> None:
+    if not dataset_path:
+        return
+    shutil.rmtree(default_storage.path(dataset_path), ignore_errors=True)
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .dataset_files import (  # noqa: F401 — лёгкая часть кэша, импортируется и отсюда
+    DATASET_VERSION, META_NAME, IngestError, dataset_path_for, delete_dataset, read_dataset_meta,
+)
+from .models import FileMeta
+from .profile_builder import ProfileBuilder
+from .row_filters import FilterError, filter_columns, row_mask
+
+# Колоночный кэш загрузки: <csv>.dataset/meta.json + c<i>/p<j>.npy на каждую колонку.
+# CSV парсится один раз в open_file, дальше все анализы читают готовые массивы —
+# только нужные им колонки (и только подходящие под фильтры строки).
+
+
+def _column_dir(root: str, idx: int) -> str:
+    return os.path.join(root, f'c{idx}')
+
+
+def _save_column_part(col_dir: str, part: int, series: pd.Series) -> None:
+    os.makedirs(col_dir, exist_ok=True)
+    base = os.path.join(col_dir, f'p{part}')
+    if series.dtype == object:
+        # строки храним как unicode-массив + маску пропусков, без pickle
+        mask = series.isna().to_numpy()
+        values = np.where(mask, '', series.to_numpy(dtype=object)).astype(str)
+        np.save(base + '.npy', values, allow_pickle=False)
+        np.save(base + '.mask.npy', mask, allow_pickle=False)
+    else:
+        np.save(base + '.npy', series.to_numpy(), allow_pickle=False)
+
+
+def _load_column_part(col_dir: str, part: int) -> np.ndarray:
+    base = os.path.join(col_dir, f'p{part}')
+    values = np.load(base + '.npy', allow_pickle=False)
+    mask_path = base + '.mask.npy'
+    if os.path.exists(mask_path):
+        mask = np.load(mask_path, allow_pickle=False)
+        values = values.astype(object)
+        values[mask] = np.nan
+    return values
+
+
+def file_sha256(full_path: str, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(full_path, 'rb') as fh:
+        for block in iter(lambda: fh.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _merge_dtype(current: Optional[str], new: str) -> str:
+    # общий тип колонки по всем частям: как read_csv, int+float -> float, всё прочее смешанное -> object
+    if current is None or current == new:
+        return new
+    numeric = {'int64', 'float64'}
+    if current in numeric and new in numeric:
+        return 'float64'
+    return 'object'
+
+
+class DatasetWriter:
+    # пишет колоночный кэш по частям: каждый чанк сохраняется и сразу отпускается
+
+    def __init__(self, dataset_path: str):
+        self.dataset_path = dataset_path
+        self.root = default_storage.path(dataset_path)
+        self.columns = None
+        self.dtypes = []
+        self.rows = 0
+        self.parts = 0
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root)
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        if self.columns is None:
+            self.columns = [str(c) for c in chunk.columns]
+            self.dtypes = [None] * len(self.columns)
+        elif [str(c) for c in chunk.columns] != self.columns:
+            raise IngestError('Набор колонок меняется внутри файла.')
+        for idx, col in enumerate(chunk.columns):
+            series = chunk[col]
+            self.dtypes[idx] = _merge_dtype(self.dtypes[idx], str(series.dtype))
+            _save_column_part(_column_dir(self.root, idx), self.parts, series)
+        self.rows += len(chunk)
+        self.parts += 1
+
+    def close(self, content_hash: Optional[str] = None, profile: Optional[dict] = None) -> dict:
+        meta = {
+            'version': DATASET_VERSION,
+            'columns': self.columns or [],
+            'dtypes': self.dtypes,
+            'rows': self.rows,
+            'parts': self.parts,
+            'content_hash': content_hash,
+            'profile': profile,
+        }
+        # meta.json пишется последним: его наличие означает, что кэш собран целиком
+        with open(os.path.join(self.root, META_NAME), 'w', encoding='utf-8') as fh:
+            json.dump(meta, fh, ensure_ascii=False)
+        return meta
+
+    def abort(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def ingest_csv(full_path: str, dataset_path: str, chunk_rows: int,
+               max_rows: Optional[int] = None, preview_size: int = 10,
+               content_hash: Optional[str] = None) -> Tuple[dict, list]:
+    # потоковый разбор CSV: память ограничена размером чанка, а не размером файла;
+    # по тем же чанкам строится профиль колонок (profiling.py)
+    writer = DatasetWriter(dataset_path)
+    profiler = ProfileBuilder()
+    preview_rows = []
+    try:
+        for chunk in pd.read_csv(full_path, chunksize=chunk_rows):
+            if max_rows and writer.rows + len(chunk) > max_rows:
+                raise IngestError(f"Файл слишком большой. Максимум {max_rows} строк.")
+            if not writer.parts:
+                preview_rows = chunk.head(preview_size).values.tolist()
+            writer.append(chunk)
+            profiler.update(chunk)
+        if writer.columns is None:
+            raise IngestError('Файл не содержит данных.')
+        # хеш содержимого — ключ для кэша графиков по этому набору данных
+        # (при загрузке он уже посчитан во время записи файла на диск)
+        meta = writer.close(content_hash=content_hash or file_sha256(full_path),
+                            profile=profiler.result(writer.dtypes))
+    except Exception:
+        writer.abort()
+        raise
+    return meta, preview_rows
+
+
+def read_dataset_part(dataset_path: str, meta: dict, part: int, columns: Optional[list] = None) -> pd.DataFrame:
+    # одна часть (чанк) кэша — для потоковой обработки без загрузки всего файла
+    root = default_storage.path(dataset_path)
+    names = meta['columns'] if columns is None else columns
+    data = {}
+    for col in names:
+        idx = meta['columns'].index(col)
+        data[col] = _load_column_part(_column_dir(root, idx), part)
+    return pd.DataFrame(data, columns=names)
+
+
+def iter_dataset_parts(dataset_path: str, meta: dict, columns: Optional[list] = None):
+    for part in range(meta['parts']):
+        yield read_dataset_part(dataset_path, meta, part, columns)
+
+
+def _select_columns(requested: Optional[list], available: list) -> list:
+    if requested is None:
+        return list(available)
+    names = list(dict.fromkeys(requested))
+    for col in names:
+        if col not in available:
+            raise ValueError(f'Колонка {col} не найдена в файле.')
+    return names
+
+
+def _read_columnar(dataset_path: str, meta: dict, columns: Optional[list] = None,
+                   filters: Optional[list] = None, profile: Optional[dict] = None) -> pd.DataFrame:
+    root = default_storage.path(dataset_path)
+    names = _select_columns(columns, meta['columns'])
+    masks = None
+    if filters:
+        # маска строк считается по частям только из колонок фильтров
+        probe_columns = _select_columns(filter_columns(filters), meta['columns'])
+        masks = [row_mask(part, filters, profile)
+                 for part in iter_dataset_parts(dataset_path, meta, probe_columns)]
+    data = {}
+    for col in names:
+        idx = meta['columns'].index(col)
+        col_dir = _column_dir(root, idx)
+        parts = [_load_column_part(col_dir, p) for p in range(meta['parts'])]
+        if masks is not None:
+            parts = [values[mask] for values, mask in zip(parts, masks)]
+        values = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        data[col] = pd.Series(values, dtype=meta['dtypes'][idx])
+    df = pd.DataFrame(data, columns=names)
+    if masks is not None:
+        # номера строк исходного файла: по ним строится ось X у линейного графика
+        df.index = np.flatnonzero(np.concatenate(masks))
+    return df
+
+
+def _csv_dtypes(profile: Optional[dict], columns: list) -> dict:
+    # типы из профиля загрузки: read_csv не выводит их заново по каждой колонке
+    known = (profile or {}).get('columns', {})
+    return {col: known[col]['dtype'] for col in columns
+            if col in known and known[col].get('dtype') in ('int64', 'float64', 'object')}
+
+
+def _read_csv(full_path: str, columns: Optional[list] = None,
+              filters: Optional[list] = None, profile: Optional[dict] = None) -> pd.DataFrame:
+    header = list(pd.read_csv(full_path, nrows=0).columns)
+    names = _select_columns(columns, header)
+    usecols = list(dict.fromkeys(names + _select_columns(filter_columns(filters), header)))
+
+    def read(dtype):
+        if not filters:
+            return pd.read_csv(full_path, usecols=usecols, dtype=dtype)[names]
+        chunks = [chunk[row_mask(chunk, filters, profile)][names]
+                  for chunk in pd.read_csv(full_path, usecols=usecols, dtype=dtype,
+                                           chunksize=settings.ANALYSIS_INGEST_CHUNK_ROWS)]
+        return pd.concat(chunks) if chunks else pd.DataFrame(columns=names)
+
+    try:
+        return read(_csv_dtypes(profile, usecols) or None)
+    except FilterError:
+        raise
+    except (TypeError, ValueError):
+        # профиль не совпал с файлом — пусть read_csv выводит типы сам
+        return read(None)
+
+
+def load_dataset(rel_path: str, file_meta: Optional[FileMeta] = None,
+                 columns: Optional[list] = None, filters: Optional[list] = None) -> pd.DataFrame:
+    # общий загрузчик для всех анализов: колоночный кэш, если он есть, иначе исходный CSV.
+    # columns — какие колонки читать (None — все), filters — условия на строки (см. row_filters.py)
+    profile = getattr(file_meta, 'profile', None)
+    dataset_path = getattr(file_meta, 'dataset_path', None)
+    if dataset_path:
+        meta = read_dataset_meta(dataset_path)
+        if meta is not None:
+            # ошибки запроса (нет колонки, плохой фильтр) — сразу пользователю, без перечитывания CSV
+            _select_columns(columns, meta['columns'])
+            _select_columns(filter_columns(filters), meta['columns'])
+            try:
+                return _read_columnar(dataset_path, meta, columns, filters, profile or meta.get('profile'))
+            except FilterError:
+                raise
+            except (OSError, ValueError):
+                pass
+    return _read_csv(default_storage.path(rel_path), columns, filters, profile)
@@ -0,0 +1,44 @@
+from typing import Tuple
+
+import numpy as np
+
+# Прореживание данных перед отрисовкой: стоимость графика должна зависеть от ширины картинки,
+# а не от числа строк. Линии — Largest-Triangle-Three-Buckets, облака точек — 2D-гистограмма плотности.
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Steinarsson, 2013: первая и последняя точки сохраняются, из каждой корзины берётся точка,
+    # образующая наибольший треугольник с предыдущей выбранной и средним следующей корзины
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    every = (n - 2) / (n_out - 2)
+    edges = np.empty(n_out, dtype=np.int64)
+    edges[:-1] = np.floor(np.arange(n_out - 1) * every).astype(np.int64) + 1
+    edges[-1] = n
+    # средние всех корзин разом; корзина n_out-2 — это последняя точка
+    sizes = np.diff(edges)
+    avg_x = np.add.reduceat(x, edges[:-1]) / sizes
+    avg_y = np.add.reduceat(y, edges[:-1]) / sizes
+
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        area = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+
+def density_grid(x: np.ndarray, y: np.ndarray, bins: int) -> dict:
+    # вместо миллионов точек — сетка bins x bins со счётчиками
+    counts, xedges, yedges = np.histogram2d(x, y, bins=bins)
+    return {'counts': counts, 'xedges': xedges, 'yedges': yedges}
@@ -0,0 +1,63 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+# Пул процессов для тяжёлой работы асинхронных представлений: разбор CSV при загрузке и анализы
+# в режиме без воркера. Цикл событий ASGI-процесса только ждёт результат и продолжает отдавать
+# лёгкие страницы. Размер пула — ANALYSIS_COMPUTE_WORKERS; 0 — считать в потоке текущего процесса.
+# Функции и аргументы передаются в процесс через pickle: только функции верхнего уровня и простые данные.
+# Если процесс пула умер (OOM, сбой в расширении), задача завершается BrokenProcessPool и в веб-процессе
+# не повторяется: то, что убило процесс пула, уронило бы и сервер.
+
+
+def _setup_worker() -> None:
+    # процесс запускается через spawn: настраиваем Django и заранее грузим pandas/numpy и шрифты.
+    # Графики рисуются прямо в процессе пула: вложенный пул рендера не даёт ему завершиться —
+    # переменная окружения задаётся до чтения настроек
+    os.environ['ANALYSIS_RENDER_WORKERS'] = '0'
+    import django
+    django.setup()
+    from analysis.warmup import warm_up
+    warm_up()
+
+
+_pool = None
+
+
+def get_compute_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    workers = settings.ANALYSIS_COMPUTE_WORKERS
+    if not workers:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_setup_worker,
+        )
+    return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+async def run_in_pool(func, *args, **kwargs):
+    pool = get_compute_pool()
+    if pool is not None:
+        try:
+            return await asyncio.wrap_future(pool.submit(func, *args, **kwargs))
+        except BrokenProcessPool:
+            # пул пересоздаётся при следующем вызове, эта задача завершается ошибкой
+            _reset_pool()
+            raise
+    return await sync_to_async(func, thread_sensitive=False)(*args, **kwargs)
@@ -0,0 +1,162 @@
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, connections, transaction
+from django.utils import timezone
+
+from .admission import claim_next, wait_for_slot
+from .models import FileMeta, ReportMeta
+from .utils import create_report, safe_run_analysis, ReportLogBuffer
+
+# Очередь анализов на самой таблице ReportMeta: без внешнего брокера,
+# воркеры (manage.py analysis_worker) забирают задачи через SELECT ... FOR UPDATE SKIP LOCKED —
+# только те, которым хватает слотов пользователя и общего бюджета (admission.py).
+
+
+def enqueue_analysis(owner, file_meta: Optional[FileMeta], kind: str, params: dict,
+                     timings: Optional[dict] = None, inline: Optional[bool] = None, cost: int = 1) -> ReportMeta:
+    # inline=None — по настройке ANALYSIS_JOBS_INLINE; асинхронные представления передают False
+    # и сами выполняют задачу в пуле процессов (run_job_by_id)
+    # отчёт сразу создаётся с параметрами задачи, обе строки лога — одним INSERT
+    with transaction.atomic():
+        report = create_report(owner, file_meta, kind=kind, params=params, status=ReportMeta.STATUS_QUEUED,
+                               timings=timings, cost=cost)
+        log = ReportLogBuffer(report, owner)
+        log.add(f"report created for {kind}")
+        log.add("analysis queued")
+        log.flush()
+    if settings.ANALYSIS_JOBS_INLINE if inline is None else inline:
+        # режим без воркера (разработка): выполняем сразу в запросе
+        run_job(report)
+    return report
+
+
+def claim_next_job() -> Optional[ReportMeta]:
+    return claim_next()
+
+
+@contextmanager
+def heartbeat(report: ReportMeta):
+    # пока задача выполняется, отдельный поток раз в ANALYSIS_JOB_HEARTBEAT секунд отмечает, что её
+    # процесс жив: долгая задача не считается зависшей (admission.stale_jobs)
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.ANALYSIS_JOB_HEARTBEAT):
+                try:
+                    alive = ReportMeta.objects.filter(
+                        id=report.id, status=ReportMeta.STATUS_RUNNING, started_at=report.started_at,
+                    ).update(heartbeat_at=timezone.now())
+                except DatabaseError:
+                    # БД недоступна — повторим через интервал, до таймаута их несколько
+                    continue
+                if not alive:
+                    # задачу уже освободили
+                    return
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'heartbeat-{report.id}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(report: ReportMeta) -> ReportMeta:
+    from .analyses import ANALYSES
+
+    params = report.params or {}
+    log = ReportLogBuffer(report, report.owner)
+    started = True if report.status == ReportMeta.STATUS_RUNNING else wait_for_slot(report, settings.ANALYSIS_SLOT_WAIT)
+    if started is None:
+        # задачу, пока она ждала слота, забрал воркер
+        return report
+    if not started:
+        return give_up_job(report)
+
+    result = {}
+    try:
+        func = ANALYSES[report.kind]
+        with heartbeat(report):
+            safe_run_analysis(report, report.owner, func, report.file, params, result, log=log)
+        report.status = ReportMeta.STATUS_DONE
+        cache = result.get('chart_cache')
+        if cache:
+            log.add(f"chart cache: {cache['hits']} hits, {cache['misses']} misses")
+    except Exception as exc:
+        # traceback уже записан в report.error внутри safe_run_analysis
+        if not report.error:
+            report.error = traceback.format_exc()
+        result = {'error': str(exc)}
+        report.status = ReportMeta.STATUS_FAILED
+
+    report.result = result
+    report.finished_at = timezone.now()
+    # итог задачи и весь её лог — одна транзакция; только если задача всё ещё наша — иначе её уже
+    # вернули в очередь или завершили ошибкой, и итог этого запуска не должен их перезаписать
+    if not log.flush(report_fields=['status', 'result', 'finished_at', 'error', 'summary', 'duration_seconds',
+                                    'timings'],
+                     expect={'status': ReportMeta.STATUS_RUNNING, 'started_at': report.started_at}):
+        report.refresh_from_db()
+        log.add("job was released while running, result discarded")
+        log.flush()
+    return report
+
+
+def _fail_job(report: ReportMeta, error: str, message: str, expect: dict) -> ReportMeta:
+    log = ReportLogBuffer(report, report.owner)
+    report.status = ReportMeta.STATUS_FAILED
+    report.result = {'error': error}
+    report.finished_at = timezone.now()
+    log.add(message)
+    if not log.flush(report_fields=['status', 'result', 'finished_at'], expect=expect):
+        # задача уже в другом состоянии (её забрал воркер или освободил контроль допуска)
+        report.refresh_from_db()
+    return report
+
+
+def give_up_job(report: ReportMeta) -> ReportMeta:
+    # выполнение в запросе: слот так и не освободился
+    return _fail_job(report, 'Сервер перегружен, анализ не дождался очереди. Повторите позже.',
+                     "no free slot, giving up", {'status': ReportMeta.STATUS_QUEUED})
+
+
+def crash_job(report: ReportMeta) -> ReportMeta:
+    # выполнение в пуле процессов: процесс умер посреди задачи (см. executor.run_in_pool)
+    return _fail_job(report, 'Анализ прерван: процесс, выполнявший его, аварийно завершился '
+                             '(возможно, не хватило памяти). Попробуйте выбрать меньше колонок.',
+                     "compute process crashed",
+                     {'status': ReportMeta.STATUS_RUNNING, 'started_at': report.started_at})
+
+
+def run_job_by_id(report_id: int) -> str:
+    # для пула процессов (executor.py): отчёт перечитывается в процессе, где выполняется задача
+    close_old_connections()
+    report = ReportMeta.objects.select_related('owner', 'file').get(id=report_id)
+    return run_job(report).status
+
+
+def worker_loop(poll_interval: float = 1.0, once: bool = False) -> int:
+    import django
+    django.setup()
+    # после fork соединения родителя использовать нельзя
+    connections.close_all()
+
+    done = 0
+    while True:
+        report = claim_next_job()
+        if report is None:
+            if once:
+                return done
+            time.sleep(poll_interval)
+            continue
+        run_job(report)
+        done += 1
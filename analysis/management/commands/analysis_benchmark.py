@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis.benchmarks.suite import BENCHMARKS, STARTUP_PROBES, compare, load_results, run_benchmarks, save_results
+from analysis.benchmarks.synthetic import SHAPES
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарки анализа на синтетических CSV; сравнение с базовым прогоном и проверка регрессий'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), default=['tall', 'wide', 'mixed'],
+                            help='формы наборов данных')
+        parser.add_argument('--scale', type=float, default=0.1,
+                            help='множитель числа строк (1.0 — полный размер формы)')
+        parser.add_argument('--repeat', type=int, default=3, help='повторов на замер (берётся медиана)')
+        parser.add_argument('--nan-ratio', type=float, default=0.05, help='доля пропусков')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', nargs='+', metavar='PREFIX',
+                            help=f'только бенчмарки с такими префиксами: {", ".join([*STARTUP_PROBES, *BENCHMARKS])}')
+        parser.add_argument('--output', help='сохранить результаты в JSON')
+        parser.add_argument('--baseline', help='JSON прошлого прогона для сравнения')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='допустимый рост медианы, доля (0.2 = +20%%)')
+
+    def handle(self, *args, **options):
+        results = run_benchmarks(
+            options['shapes'],
+            scale=options['scale'],
+            repeat=max(1, options['repeat']),
+            nan_ratio=options['nan_ratio'],
+            seed=options['seed'],
+            only=options['only'],
+            log=self.stdout.write,
+        )
+        if options['output']:
+            save_results(results, options['output'])
+            self.stdout.write(f'Результаты сохранены: {options["output"]}')
+
+        if options['baseline']:
+            regressions = compare(results, load_results(options['baseline']), options['threshold'])
+            if regressions:
+                raise CommandError('Регрессии производительности:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
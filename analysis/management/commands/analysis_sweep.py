@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from analysis.chart_cache import evict
+from analysis.sweeper import BATCH_SIZE, sweep_artifacts, sweep_uploads
+from analysis.workspace import expire_uploads
+
+
+class Command(BaseCommand):
+    help = ('Уборка хранилища (для cron или периодического запуска): освобождает загрузки рабочего '
+            'пространства, не использовавшиеся дольше TTL, удаляет файлы в tmp/ и charts/, '
+            'на которые не ссылается ни одна загрузка или отчёт, и ужимает кэш графиков до лимита')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=3600,
+                            help='не трогать файлы моложе стольких секунд (загрузка ещё идёт)')
+        parser.add_argument('--batch', type=int, default=BATCH_SIZE,
+                            help='сколько записей каталога сверять с БД за один запрос')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только посчитать, ничего не удалять')
+        parser.add_argument('--no-artifacts', action='store_true',
+                            help='не проверять графики отчётов в charts/')
+        parser.add_argument('--every', type=int, default=0,
+                            help='повторять каждые N секунд (0 — один проход)')
+
+    def handle(self, *args, **options):
+        while True:
+            self._sweep(options)
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+            # между проходами соединение с БД могло устареть
+            close_old_connections()
+
+    def _sweep(self, options):
+        dry_run = options['dry_run']
+        if not dry_run:
+            released, deleted = expire_uploads()
+            self.stdout.write(f'Освобождено загрузок: {released}, удалено файлов наборов: {deleted}')
+            # кэш графиков: процессы вытесняют по своей оценке размера, точный размер — здесь
+            evicted = evict(settings.ANALYSIS_CHART_CACHE_MB * 1024 * 1024)
+            self.stdout.write(f'Вытеснено из кэша графиков: {evicted}')
+
+        self._report('tmp', sweep_uploads(options['grace'], options['batch'], dry_run), dry_run)
+        if not options['no_artifacts']:
+            self._report('charts', sweep_artifacts(options['grace'], options['batch'], dry_run), dry_run)
+
+    def _report(self, label, stats, dry_run):
+        verb = 'к удалению' if dry_run else 'удалено'
+        self.stdout.write(
+            f'{label}: просмотрено {stats.scanned}, {verb} {stats.deleted}, '
+            f'освобождено {stats.reclaimed_bytes} байт ({stats.reclaimed_bytes / 1024 / 1024:.1f} МБ), '
+            f'ошибок {stats.errors}'
+        )
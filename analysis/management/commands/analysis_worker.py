@@ -0,0 +1,52 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from analysis.admission import release_stale_jobs
+from analysis.jobs import worker_loop
+from analysis.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = 'Локальный пул воркеров очереди анализов (задачи хранятся в ReportMeta)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.ANALYSIS_WORKERS,
+                            help='число процессов-воркеров')
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='пауза между опросами пустой очереди, сек')
+        parser.add_argument('--once', action='store_true',
+                            help='обработать очередь и выйти (для cron/периодического запуска)')
+
+    def handle(self, *args, **options):
+        requeued = release_stale_jobs()
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших задач: {requeued}')
+
+        workers = max(1, options['workers'])
+        if workers == 1:
+            done = worker_loop(options['poll'], options['once'])
+            self.stdout.write(f'Обработано задач: {done}')
+            return
+
+        # прогрев до fork: воркеры получают загруженный численный стек и шрифты
+        if settings.ANALYSIS_PRELOAD:
+            warm_up(freeze=True)
+        # не daemon: воркеры сами могут поднимать пулы процессов для расчётов
+        connections.close_all()
+        procs = [
+            multiprocessing.Process(target=worker_loop, args=(options['poll'], options['once']), daemon=False)
+            for _ in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        try:
+            for p in procs:
+                p.join()
+        except KeyboardInterrupt:
+            for p in procs:
+                p.terminate()
+            for p in procs:
+                p.join()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filemeta',
+            name='dataset_path',
+            field=models.CharField(blank=True, max_length=1024, null=True),
+        ),
+    ]
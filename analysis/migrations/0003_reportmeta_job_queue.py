@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0002_filemeta_dataset_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportmeta',
+            name='kind',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='reportmeta',
+            name='params',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        # существующие отчёты уже выполнены синхронно — помечаем их как завершённые, а не ставим в очередь
+        migrations.AddField(
+            model_name='reportmeta',
+            name='status',
+            field=models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='done', max_length=16),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='reportmeta',
+            name='status',
+            field=models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='queued', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='reportmeta',
+            name='result',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reportmeta',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reportmeta',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reportmeta',
+            index=models.Index(fields=['status', 'created_at'], name='analysis_report_queue_idx'),
+        ),
+    ]
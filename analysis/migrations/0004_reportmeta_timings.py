@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0003_reportmeta_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportmeta',
+            name='timings',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
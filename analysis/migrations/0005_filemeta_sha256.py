@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7
+
+import os
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH = 500
+
+
+def _files_exist(file_meta) -> bool:
+    if not file_meta.dataset_path or not default_storage.exists(file_meta.storage_path):
+        return False
+    return os.path.isdir(default_storage.path(file_meta.dataset_path))
+
+
+def release_missing_uploads(apps, schema_editor):
+    # до этой миграции CSV и колоночный кэш удалялись после каждого анализа: загрузки без файлов
+    # сразу помечаются освобождёнными, иначе они считались бы ссылками на несуществующие файлы
+    FileMeta = apps.get_model('analysis', 'FileMeta')
+    gone = [
+        file_meta.id
+        for file_meta in FileMeta.objects.only('id', 'storage_path', 'dataset_path').iterator()
+        if not _files_exist(file_meta)
+    ]
+    now = timezone.now()
+    for start in range(0, len(gone), BATCH):
+        FileMeta.objects.filter(id__in=gone[start:start + BATCH]).update(released_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0004_reportmeta_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filemeta',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='filemeta',
+            name='released_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='filemeta',
+            index=models.Index(fields=['owner', 'sha256'], name='analysis_filemeta_sha_idx'),
+        ),
+        migrations.RunPython(release_missing_uploads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0005_filemeta_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filemeta',
+            name='profile',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
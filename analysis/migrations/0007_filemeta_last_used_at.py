@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0006_filemeta_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filemeta',
+            name='last_used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='filemeta',
+            index=models.Index(fields=['owner', 'last_used_at'], name='analysis_filemeta_recent_idx'),
+        ),
+    ]
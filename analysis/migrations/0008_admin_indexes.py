@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7
+
+from django.db import migrations, models
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    # PostgreSQL: CREATE INDEX CONCURRENTLY — таблицы с миллионами строк лога не блокируются на запись
+    # на время построения. Если построение прервётся, индекс останется INVALID: удалить его и повторить
+    # migrate. Остальные БД (SQLite в разработке) — обычный CREATE INDEX.
+    # Не через django.contrib.postgres.operations: тот модуль требует драйвер PostgreSQL при импорте
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            if schema_editor.connection.vendor == 'postgresql':
+                schema_editor.add_index(model, self.index, concurrently=True)
+            else:
+                schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            if schema_editor.connection.vendor == 'postgresql':
+                schema_editor.remove_index(model, self.index, concurrently=True)
+            else:
+                schema_editor.remove_index(model, self.index)
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY нельзя выполнять внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('analysis', '0007_filemeta_last_used_at'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='filemeta',
+            index=models.Index(fields=['owner', 'uploaded_at'], name='analysis_filemeta_owner_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reportmeta',
+            index=models.Index(fields=['owner', 'created_at'], name='analysis_report_owner_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reportlog',
+            index=models.Index(fields=['report', 'created_at'], name='analysis_reportlog_report_idx'),
+        ),
+    ]
@@ -6,20 +6,72 @@ class FileMeta(models.Model):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     original_name = models.CharField(max_length=512)
     storage_path = models.CharField(max_length=1024)   # информационный путь во временном хранилище
+    dataset_path = models.CharField(max_length=1024, null=True, blank=True)  # колоночный кэш, собранный при загрузке
     size_bytes = models.BigIntegerField(null=True, blank=True)
     uploaded_at = models.DateTimeField(default=timezone.now)
+    # хеш содержимого: повторная загрузка того же файла переиспользует уже разобранный набор данных
+    sha256 = models.CharField(max_length=64, null=True, blank=True)
+    # загрузка держит ссылку на файлы storage_path/dataset_path, пока не освобождена;
+    # файлы удаляются, когда не остаётся ни одной неосвобождённой загрузки с тем же storage_path
+    released_at = models.DateTimeField(null=True, blank=True)
+    # профиль колонок, построенный при загрузке (см. profiling.py): тип, пропуски, уникальные, min/max
+    profile = models.JSONField(null=True, blank=True)
+    # рабочее пространство: загрузка живёт ANALYSIS_WORKSPACE_TTL_HOURS после последнего использования
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'sha256'], name='analysis_filemeta_sha_idx'),
+            models.Index(fields=['owner', 'last_used_at'], name='analysis_filemeta_recent_idx'),
+            models.Index(fields=['owner', 'uploaded_at'], name='analysis_filemeta_owner_idx'),
+        ]
 
     def __str__(self):
         return f"{self.original_name} ({self.owner})"
 
 
 class ReportMeta(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Готово'),
+        (STATUS_FAILED, 'Ошибка'),
+    )
+
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     file = models.ForeignKey(FileMeta, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     summary = models.TextField(null=True, blank=True)       # краткий итог
     error = models.TextField(null=True, blank=True)         # текст ошибки, если была
     duration_seconds = models.FloatField(null=True, blank=True)
+    # очередь анализов: тип, параметры, статус и результат для отображения
+    kind = models.CharField(max_length=32, blank=True, default='')
+    params = models.JSONField(null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # выполняющаяся задача периодически обновляет отметку (jobs.heartbeat); без обновлений дольше
+    # ANALYSIS_JOB_TIMEOUT её процесс считается умершим (admission.stale_jobs)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # время по этапам (загрузка, приведение типов, статистика, рендер...) и пик памяти
+    timings = models.JSONField(null=True, blank=True)
+    # оценка стоимости в условных единицах для контроля допуска (см. admission.py)
+    cost = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='analysis_report_queue_idx'),
+            models.Index(fields=['owner', 'created_at'], name='analysis_report_owner_idx'),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
 
     def __str__(self):
         return f"Report {self.id} by {self.owner}"
@@ -31,5 +83,10 @@ class ReportLog(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     message = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['report', 'created_at'], name='analysis_reportlog_report_idx'),
+        ]
+
     def __str__(self):
         return f"Log {self.id} for report {self.report_id}"
@@ -0,0 +1,183 @@
+import math
+import warnings
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from .profiling import NUMERIC_TYPES, PROFILE_VERSION
+
+# Построение профиля колонок по чанкам разбора CSV (формат профиля — profiling.py).
+
+TYPE_RATIO = 0.9                # доля непустых значений, которая должна разобраться как число / дата
+CATEGORICAL_MAX_UNIQUE = 50
+CATEGORICAL_MAX_RATIO = 0.05    # или уникальных не больше 5% непустых значений
+DATETIME_SAMPLE = 100           # по стольким первым значениям решаем, похожа ли колонка на даты
+
+
+class _UniqueSet:
+    # точное множество значений: уникальные каждого чанка копятся и сливаются,
+    # когда их суммарный размер догоняет уже слитый массив — память O(число уникальных)
+    def __init__(self, dtype: str):
+        self.values = np.empty(0, dtype=dtype)
+        self.pending = []
+        self.pending_size = 0
+
+    def add(self, values: np.ndarray) -> None:
+        values = np.unique(values)
+        if not len(values):
+            return
+        self.pending.append(values)
+        self.pending_size += len(values)
+        if self.pending_size > max(len(self.values), 65536):
+            self._merge()
+
+    def _merge(self) -> None:
+        if self.pending:
+            self.values = np.unique(np.concatenate([self.values, *self.pending]))
+            self.pending = []
+            self.pending_size = 0
+
+    def __len__(self) -> int:
+        self._merge()
+        return len(self.values)
+
+
+def _finite(value) -> Optional[float]:
+    if value is None or not math.isfinite(value):
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() and abs(value) < 2 ** 53 else value
+
+
+class _ColumnStats:
+    def __init__(self):
+        self.nulls = 0
+        self.count = 0
+        self.numeric = 0
+        self.integral = True
+        self.num_min = math.inf
+        self.num_max = -math.inf
+        # числа из числовых частей и строки из строковых — в pandas это разные значения
+        self.numbers = _UniqueSet('float64')
+        self.strings = _UniqueSet('uint64')
+        self.date_format = None   # формат, угаданный по первым строкам; False — не даты
+        self.dates = 0
+        self.date_min = None
+        self.date_max = None
+
+    def update(self, series: pd.Series) -> None:
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        self.count += len(values)
+        if not len(values):
+            return
+        if values.dtype.kind in 'iufb':
+            numbers = values.to_numpy(dtype='float64')
+            self.numbers.add(numbers)
+            self.numeric += len(numbers)
+        else:
+            # строки разбираются по одному разу на уникальное значение, счётчики — по частотам
+            codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+            counts = np.bincount(codes, minlength=len(uniques))
+            self.strings.add(pd.util.hash_array(uniques))
+            parsed = pd.to_numeric(uniques, errors='coerce').astype('float64')
+            ok = ~np.isnan(parsed)
+            numbers = parsed[ok]
+            self.numeric += int(counts[ok].sum())
+            self._update_dates(uniques, counts)
+        if len(numbers):
+            self.num_min = min(self.num_min, float(numbers.min()))
+            self.num_max = max(self.num_max, float(numbers.max()))
+            if self.integral:
+                with np.errstate(invalid='ignore'):
+                    self.integral = bool((np.mod(numbers, 1) == 0).all())
+
+    def _update_dates(self, uniques: np.ndarray, counts: np.ndarray) -> None:
+        if self.date_format is None:
+            sample = pd.Series([v for v in uniques[:DATETIME_SAMPLE] if isinstance(v, str)], dtype=object)
+            fmt = guess_datetime_format(sample.iloc[0]) if len(sample) else None
+            # формат по первому значению должен подходить почти всей выборке; без формата
+            # pandas разбирает каждую строку через dateutil — на текстовых колонках это слишком долго
+            ok = bool(fmt) and self._parse_dates(sample, fmt).notna().mean() >= TYPE_RATIO
+            self.date_format = fmt if ok else False
+        if not self.date_format:
+            return
+        dates = self._parse_dates(pd.Series(uniques, dtype=object), self.date_format)
+        self.dates += int(counts[dates.notna().to_numpy()].sum())
+        dates = dates.dropna()
+        if len(dates):
+            low, high = dates.min(), dates.max()
+            self.date_min = low if self.date_min is None else min(self.date_min, low)
+            self.date_max = high if self.date_max is None else max(self.date_max, high)
+
+    @staticmethod
+    def _parse_dates(values: pd.Series, fmt: str) -> pd.Series:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                dates = pd.to_datetime(values, format=fmt, errors='coerce')
+        except (ValueError, TypeError):
+            return pd.Series(pd.NaT, index=values.index)
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            # разные часовые пояса в одной колонке — не считаем её датами
+            return pd.Series(pd.NaT, index=values.index)
+        return dates
+
+    def result(self, dtype: str) -> dict:
+        unique = len(self.numbers) + len(self.strings)
+        if self.count == 0:
+            kind = 'numeric' if dtype in ('int64', 'float64') else 'text'
+        elif dtype == 'bool':
+            kind = 'categorical'
+        elif self.numeric >= TYPE_RATIO * self.count:
+            kind = 'integer' if self.integral else 'numeric'
+        elif self.date_format and self.dates >= TYPE_RATIO * self.count:
+            kind = 'datetime'
+        elif unique <= CATEGORICAL_MAX_UNIQUE or unique <= CATEGORICAL_MAX_RATIO * self.count:
+            kind = 'categorical'
+        else:
+            kind = 'text'
+
+        column = {
+            'type': kind,
+            'dtype': dtype,
+            'count': self.count,
+            'nulls': self.nulls,
+            'unique': unique,
+            # непустые значения, которые pd.to_numeric превращает в NaN
+            'coerce_failures': self.count - self.numeric,
+            'min': None,
+            'max': None,
+        }
+        if kind in NUMERIC_TYPES:
+            column.update(min=_finite(self.num_min), max=_finite(self.num_max))
+        elif kind == 'datetime':
+            column.update(min=self.date_min.isoformat(), max=self.date_max.isoformat(), format=self.date_format)
+        return column
+
+
+class ProfileBuilder:
+    # обновляется каждым чанком при разборе CSV, итог — JSON для FileMeta.profile
+
+    def __init__(self):
+        self.columns = None
+        self.stats = []
+        self.rows = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if self.columns is None:
+            self.columns = [str(c) for c in chunk.columns]
+            self.stats = [_ColumnStats() for _ in self.columns]
+        self.rows += len(chunk)
+        for stats, col in zip(self.stats, chunk.columns):
+            stats.update(chunk[col])
+
+    def result(self, dtypes: List[str]) -> dict:
+        # dtypes — итоговые типы колонок кэша (после слияния типов частей)
+        return {
+            'version': PROFILE_VERSION,
+            'rows': self.rows,
+            'columns': {col: stats.result(dtype) for col, stats, dtype in zip(self.columns or [], self.stats, dtypes)},
+        }
@@ -0,0 +1,36 @@
+from typing import Iterable, List, Optional, Set
+
+# Профиль колонок строится один раз при загрузке по тем же чанкам, что пишутся в колоночный кэш:
+# логический тип, пропуски, значения, которые не приводятся к числу, число уникальных, min/max.
+# Хранится в FileMeta.profile; анализы по нему не разбирают колонки без чисел,
+# describe берёт готовые тип/пропуски/уникальные, формы показывают только подходящие колонки.
+# Здесь — только чтение готового профиля (без numpy/pandas), построение — profile_builder.py.
+
+PROFILE_VERSION = 1
+NUMERIC_TYPES = ('integer', 'numeric')
+
+
+def profile_columns(profile: Optional[dict], columns: Iterable[str]) -> Optional[List[dict]]:
+    # профили выбранных колонок или None, если профиля нет или он не про эти колонки
+    if not profile or profile.get('version') != PROFILE_VERSION:
+        return None
+    known = profile.get('columns', {})
+    columns = list(columns)
+    if any(col not in known for col in columns):
+        return None
+    return [known[col] for col in columns]
+
+
+def non_numeric_columns(profile: Optional[dict]) -> Set[str]:
+    # колонки, где ни одно значение не приводится к числу: coerce_numeric их не разбирает
+    if not profile or profile.get('version') != PROFILE_VERSION:
+        return set()
+    return {col for col, info in profile['columns'].items() if info['coerce_failures'] == info['count']}
+
+
+def columns_of_type(profile: Optional[dict], columns: List[str], types=NUMERIC_TYPES) -> List[str]:
+    # для выбора колонок в формах; без профиля — все колонки
+    known = profile_columns(profile, columns)
+    if known is None:
+        return list(columns)
+    return [col for col, info in zip(columns, known) if info['type'] in types]
@@ -0,0 +1,31 @@
+from typing import Optional
+
+from django.conf import settings
+
+# Профили отрисовки графиков: формат, DPI, сжатие и бюджет байтов на одну картинку.
+# Выбираются на запрос (render_profile в форме), входят в ключ кэша графиков. Картинка сверх бюджета
+# перекодируется с DPI, сниженным шагами до min_dpi; у SVG при этом растрируются слои с данными.
+# Без matplotlib: модуль нужен представлениям для проверки выбора.
+
+RENDER_PROFILES = {
+    'full': {'format': 'png', 'dpi': 100, 'min_dpi': 60, 'compress_level': 6, 'max_bytes': 300 * 1024},
+    # тот же макет при меньшем DPI: подписи не наезжают друг на друга, картинка в 4 раза меньше по площади
+    'thumbnail': {'format': 'png', 'dpi': 50, 'min_dpi': 36, 'compress_level': 9, 'max_bytes': 40 * 1024},
+    'webp': {'format': 'webp', 'dpi': 100, 'min_dpi': 60, 'quality': 80, 'max_bytes': 150 * 1024},
+    # вектор — для простых графиков; dpi — для растрируемых слоёв, если SVG не уложился в бюджет
+    'svg': {'format': 'svg', 'dpi': 72, 'min_dpi': 36, 'max_bytes': 200 * 1024},
+}
+DPI_STEP = 0.75
+
+
+def profile_name(requested: Optional[str], plots: int = 1) -> str:
+    # выбранный профиль; без выбора — по умолчанию, а для многих гистограмм describe — миниатюры
+    if requested in RENDER_PROFILES:
+        return requested
+    if plots > settings.ANALYSIS_THUMBNAILS_FROM:
+        return 'thumbnail'
+    return settings.ANALYSIS_RENDER_PROFILE
+
+
+def chart_format(name: str) -> str:
+    return RENDER_PROFILES[name]['format']
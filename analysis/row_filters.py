@@ -0,0 +1,87 @@
+import operator
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .profiling import NUMERIC_TYPES
+
+# Фильтры строк для загрузчика наборов данных: [(колонка, оператор, значение), ...], условия через И.
+# Сравнение идёт в типе колонки из профиля загрузки: числа — как числа, даты — по формату,
+# угаданному при загрузке, остальное — как строки. Фильтры хранятся в ReportMeta.params, поэтому — JSON.
+
+COMPARE_OPS = {
+    '==': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+FILTER_OPS = (*COMPARE_OPS, 'in', 'isnull', 'notnull')
+
+
+class FilterError(ValueError):
+    pass
+
+
+def filter_columns(filters: Optional[Iterable]) -> List[str]:
+    return list(dict.fromkeys(f[0] for f in filters or ()))
+
+
+def _kind(series: pd.Series, info: Optional[dict]) -> str:
+    kind = (info or {}).get('type')
+    if kind in NUMERIC_TYPES or (kind is None and series.dtype.kind in 'iuf'):
+        return 'numeric'
+    if kind == 'datetime':
+        return 'datetime'
+    return 'text'
+
+
+def _typed_series(series: pd.Series, kind: str, info: Optional[dict]) -> Tuple[pd.Series, np.ndarray]:
+    # (значения в типе колонки, маска непустых); не разобравшиеся числа и даты считаются пропусками
+    if kind == 'text':
+        return series.fillna('').astype(str), series.notna().to_numpy()
+    if kind == 'numeric':
+        typed = pd.to_numeric(series, errors='coerce')
+    else:
+        typed = pd.to_datetime(series, format=info.get('format'), errors='coerce')
+    return typed, typed.notna().to_numpy()
+
+
+def _typed_value(value, kind: str, col: str):
+    try:
+        if kind == 'numeric':
+            return float(value)
+        if kind == 'datetime':
+            return pd.Timestamp(value)
+    except (TypeError, ValueError):
+        raise FilterError(f'Некорректное значение фильтра для колонки {col}: {value}')
+    return str(value)
+
+
+def row_mask(df: pd.DataFrame, filters: Iterable, profile: Optional[dict] = None) -> np.ndarray:
+    # булева маска строк df, подходящих под все фильтры; df содержит как минимум колонки фильтров
+    known = (profile or {}).get('columns', {})
+    mask = np.ones(len(df), dtype=bool)
+    for item in filters:
+        col, op = item[0], item[1]
+        value = item[2] if len(item) > 2 else None
+        if op not in FILTER_OPS:
+            raise FilterError(f'Неизвестный оператор фильтра: {op}')
+        series = df[col]
+        if op in ('isnull', 'notnull'):
+            nulls = series.isna().to_numpy()
+            mask &= nulls if op == 'isnull' else ~nulls
+            continue
+        kind = _kind(series, known.get(col))
+        # пропуски не проходят ни одно сравнение, в том числе '!=' и 'in'
+        typed, present = _typed_series(series, kind, known.get(col))
+        if op == 'in':
+            values = [_typed_value(v, kind, col) for v in (value or ())]
+            mask &= present & typed.isin(values).to_numpy()
+            continue
+        value = _typed_value(value, kind, col)
+        try:
+            matched = COMPARE_OPS[op](typed, value)
+        except TypeError:
+            # например, дата с часовым поясом против колонки без пояса
+            raise FilterError(f'Некорректное значение фильтра для колонки {col}: {value}')
+        mask &= present & matched.to_numpy(dtype=bool)
+    return mask
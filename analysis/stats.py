@@ -0,0 +1,225 @@
+from typing import Collection, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Подписи строк итоговой таблицы describe (порядок = порядок строк после транспонирования)
+DESCRIBE_LABELS = {
+    'dtype': 'Тип', 'n': 'N', 'missing': 'Пропуски', 'missing_pct': 'Доля пропусков',
+    'unique': 'Уникальных', 'mean': 'Среднее', 'median': 'Медиана', 'std': 'Стд',
+    'var': 'Дисперсия', 'min': 'Мин', '25%': '25%', '50%': '50%', '75%': '75%',
+    'max': 'Макс', 'iqr': 'IQR', 'skew': 'Асимметрия', 'kurtosis': 'Куртозис',
+    'zeros': 'Нулей', 'negatives': 'Отрицательных'
+}
+NUMERIC_STATS = ('mean', 'median', 'std', 'var', 'min', '25%', '50%', '75%', 'max', 'iqr', 'skew', 'kurtosis')
+
+
+def coerce_numeric(df: pd.DataFrame, columns: List[str], skip: Collection[str] = ()) -> pd.DataFrame:
+    # все колонки приводятся к float64 за один проход: числовые — astype, строковые — одним pd.to_numeric;
+    # skip — колонки, где по профилю загрузки чисел нет: сразу NaN, без разбора строк
+    sub = df[columns]
+    out = np.empty((len(sub), len(columns)), dtype='float64', order='F')
+    object_idx = []
+    for i, col in enumerate(columns):
+        series = sub.iloc[:, i]
+        if col in skip:
+            out[:, i] = np.nan
+        elif series.dtype.kind in 'iufb':
+            out[:, i] = series.to_numpy(dtype='float64', na_value=np.nan)
+        elif series.dtype == object:
+            object_idx.append(i)
+        else:
+            out[:, i] = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    if object_idx:
+        flat = sub.iloc[:, object_idx].to_numpy(dtype=object).ravel(order='F')
+        parsed = pd.to_numeric(flat, errors='coerce').astype('float64')
+        out[:, object_idx] = parsed.reshape((len(sub), len(object_idx)), order='F')
+    return pd.DataFrame(out, columns=columns, index=sub.index)
+
+
+def _py_round(values: np.ndarray, ndigits: int) -> np.ndarray:
+    # то же, что встроенный round(): np.round, а почти-половинки досчитываем точно через round()
+    values = np.asarray(values, dtype='float64')
+    result = np.round(values, ndigits)
+    scaled = values * 10.0 ** ndigits
+    frac = np.abs(scaled - np.floor(scaled))
+    near_tie = np.isfinite(values) & (np.abs(frac - 0.5) < 1e-6)
+    for i in np.flatnonzero(near_tie):
+        result[i] = round(float(values[i]), ndigits)
+    return result
+
+
+def _zero_out_fperr(arr: np.ndarray) -> np.ndarray:
+    return np.where(np.abs(arr) < 1e-14, 0.0, arr)
+
+
+def _sorted_quantile(sorted_x: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    # линейная интерполяция как в numpy/pandas, по уже отсортированным колонкам (NaN в конце)
+    k = sorted_x.shape[1]
+    virtual = q * (np.maximum(counts, 1) - 1)
+    lo = np.floor(virtual).astype(np.intp)
+    hi = np.minimum(lo + 1, np.maximum(counts - 1, 0))
+    # на последнем элементе numpy берёт вес 1, а не 0 — от этого зависит знак нуля
+    t = np.where(virtual >= counts - 1, 1.0, virtual - lo)
+    cols = np.arange(k)
+    a = sorted_x[lo, cols]
+    b = sorted_x[hi, cols]
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+def numeric_moments(x: np.ndarray) -> dict:
+    # все моменты и квантили по матрице (строки × колонки) одним батчем
+    mask = ~np.isnan(x)
+    counts = mask.sum(axis=0)
+    k = x.shape[1]
+    stats = {key: np.full(k, np.nan) for key in NUMERIC_STATS}
+    stats.update(count=counts, zeros=(x == 0).sum(axis=0), negatives=(x < 0).sum(axis=0))
+    if not len(x):
+        return stats
+
+    cnt = counts.astype('float64')
+    filled = np.where(mask, x, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = filled.sum(axis=0) / cnt
+        adjusted = np.where(mask, x - mean, 0.0)
+        adjusted2 = adjusted ** 2
+        m2 = adjusted2.sum(axis=0)
+        m3 = (adjusted2 * adjusted).sum(axis=0)
+        m4 = (adjusted2 ** 2).sum(axis=0)
+
+        var = np.where(cnt > 1, m2 / (cnt - 1), np.nan)
+        std = np.sqrt(var)
+
+        # несмещённые оценки асимметрии и эксцесса — те же формулы, что в pandas.nanops
+        m2z, m3z = _zero_out_fperr(m2), _zero_out_fperr(m3)
+        skew = (cnt * (cnt - 1) ** 0.5 / (cnt - 2)) * (m3z / m2z ** 1.5)
+        skew = np.where(m2z == 0, 0.0, skew)
+        skew = np.where(cnt < 3, np.nan, skew)
+
+        adj = 3 * (cnt - 1) ** 2 / ((cnt - 2) * (cnt - 3))
+        numerator = _zero_out_fperr(cnt * (cnt + 1) * (cnt - 1) * m4)
+        denominator = _zero_out_fperr((cnt - 2) * (cnt - 3) * m2 ** 2)
+        kurt = np.where(denominator == 0, 0.0, numerator / denominator - adj)
+        kurt = np.where(cnt < 4, np.nan, kurt)
+
+    # одна сортировка на все колонки (NaN уходят в конец) — из неё min/max/медиана/квартили
+    sorted_x = np.sort(x, axis=0)
+    cols = np.arange(k)
+    last = np.maximum(counts - 1, 0)
+    q25, q50, q75 = (_sorted_quantile(sorted_x, counts, q) for q in (0.25, 0.5, 0.75))
+    # -0.0 и 0.0 при сортировке равны, и знак нуля на месте квантиля зависит от порядка выбора в numpy:
+    # колонки, где встречаются оба нуля (их мало), считаем как pandas — np.percentile по каждому квантилю
+    zero = x == 0
+    signed = np.signbit(x)
+    for j in np.flatnonzero((zero & signed).any(axis=0) & (zero & ~signed).any(axis=0)):
+        values = x[mask[:, j], j]
+        q25[j], q50[j], q75[j] = (np.percentile(values, [q])[0] for q in (25, 50, 75))
+    mid_lo = sorted_x[last // 2, cols]
+    mid_hi = sorted_x[np.minimum(counts // 2, len(x) - 1), cols]
+    # + 0.0: pandas не возвращает медиану -0.0
+    median = np.where(counts % 2 == 1, mid_lo, (mid_lo + mid_hi) / 2) + 0.0
+
+    empty = counts == 0
+    computed = {
+        'mean': mean, 'median': median, 'std': std, 'var': var,
+        'min': np.where(mask, x, np.inf).min(axis=0), '25%': q25, '50%': q50, '75%': q75,
+        'max': np.where(mask, x, -np.inf).max(axis=0), 'iqr': q75 - q25, 'skew': skew, 'kurtosis': kurt,
+    }
+    stats.update({key: np.where(empty, np.nan, v) for key, v in computed.items()})
+    return stats
+
+
+def _join_notes(*notes: np.ndarray) -> np.ndarray:
+    result = notes[0]
+    for note in notes[1:]:
+        sep = np.where((result != '') & (note != ''), '; ', '')
+        result = np.char.add(np.char.add(result, sep), note)
+    return result
+
+
+def build_describe_table(columns: List[str], dtypes: List[str], n: int, missing: np.ndarray,
+                         unique: np.ndarray, stats: Optional[dict]) -> pd.DataFrame:
+    # собирает транспонированную таблицу describe из уже посчитанных векторов
+    k = len(columns)
+    missing = np.asarray(missing, dtype='int64')
+    unique = np.asarray(unique, dtype='int64')
+    metrics = pd.DataFrame(index=pd.Index(columns, name='column'))
+    metrics['dtype'] = dtypes
+    metrics['n'] = np.full(k, n, dtype='int64')
+    metrics['missing'] = missing
+    if n:
+        metrics['missing_pct'] = _py_round(missing / n, 4)
+    else:
+        metrics['missing_pct'] = pd.Series([None] * k, index=metrics.index, dtype=object)
+    metrics['unique'] = unique
+
+    numeric = stats is not None and bool((stats['count'] > 0).any())
+    if numeric:
+        has_numbers = stats['count'] > 0
+        for key in NUMERIC_STATS:
+            metrics[key] = stats[key]
+        for key in ('zeros', 'negatives'):
+            values = np.asarray(stats[key])
+            metrics[key] = values if has_numbers.all() else np.where(has_numbers, values, np.nan)
+
+    metrics = metrics.rename(columns=DESCRIBE_LABELS)
+
+    cv = None
+    if numeric:
+        mean = metrics['Среднее'].to_numpy()
+        std = metrics['Стд'].to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cv = np.where(np.isnan(std) | np.isnan(mean) | (mean == 0), np.nan, std / mean)
+        cv = _py_round(cv, 3)
+        if np.isnan(cv).all():
+            metrics['CV'] = pd.Series([None] * k, index=metrics.index, dtype=object)
+        else:
+            metrics['CV'] = cv
+
+    # Интерпретация
+    empty = np.full(k, '', dtype=object)
+    mp = metrics['Доля пропусков'].to_numpy(dtype='float64', na_value=np.nan)
+    notes = [np.where(mp > 0.2, 'Много пропусков', empty)]
+    if cv is not None:
+        abs_cv = np.abs(cv)
+        notes.append(np.where(abs_cv > 1, 'Высокая дисперсия (CV>1)',
+                              np.where(abs_cv > 0.5, 'Умеренная дисперсия (CV>0.5)', empty)))
+    if numeric:
+        notes.append(np.where(np.abs(metrics['Асимметрия'].to_numpy()) > 1, 'Сильная асимметрия', empty))
+    if n:
+        notes.append(np.where((unique > 0) & (unique / n > 0.5), 'Много уникальных значений', empty))
+    metrics['Интерпретация'] = _join_notes(*[np.asarray(nt, dtype=str) for nt in notes]).astype(object)
+
+    for c in metrics.columns:
+        if pd.api.types.is_float_dtype(metrics[c]):
+            metrics[c] = _py_round(metrics[c].to_numpy(), 3)
+
+    df_out = metrics.T
+    df_out.index.name = None
+    return df_out
+
+
+def describe_table(df: pd.DataFrame, columns: List[str], numeric: Optional[pd.DataFrame] = None,
+                   profile: Optional[List[dict]] = None) -> pd.DataFrame:
+    # profile — профили этих колонок из загрузки: тип, пропуски и уникальные уже посчитаны
+    if numeric is None:
+        numeric = coerce_numeric(df, columns)
+    sub = df[columns]
+    stats = numeric_moments(numeric.to_numpy()) if columns else None
+    if profile is not None:
+        dtypes = [info['dtype'] for info in profile]
+        missing = [info['nulls'] for info in profile]
+        unique = [info['unique'] for info in profile]
+    else:
+        dtypes = [str(t) for t in sub.dtypes]
+        missing = sub.isna().sum().to_numpy()
+        unique = sub.nunique(dropna=True).to_numpy()
+    return build_describe_table(
+        columns=list(columns),
+        dtypes=dtypes,
+        n=len(sub),
+        missing=missing,
+        unique=unique,
+        stats=stats,
+    )
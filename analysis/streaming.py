@@ -0,0 +1,261 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Collection, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .datasets import read_dataset_part
+from .profiling import non_numeric_columns, profile_columns
+from .stats import NUMERIC_STATS, build_describe_table, coerce_numeric
+
+# Потоковый describe: кэш читается по частям, по каждой колонке копятся сливаемые аккумуляторы.
+# Память ограничена размером скетчей и одной части, а не числом строк.
+
+
+class KLLSketch:
+    # скетч квантилей KLL: уровни-компакторы, элемент уровня h весит 2**h.
+    # Пока данных меньше k, сжатий нет и квантили точные (как np.quantile).
+
+    def __init__(self, k: int = 1024, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[len(items) - len(items) % 2:]
+                items = items[:len(items) - len(items) % 2]
+                offset = int(self._rng.integers(2))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[offset::2]])
+                self.levels[h] = keep
+            h += 1
+
+    def update(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: 'KLLSketch') -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+
+    def quantiles(self, qs) -> np.ndarray:
+        if not self.n:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** h) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, weights = items[order], weights[order]
+        # ранг элемента — центр его весового блока; при весах 1 это просто индекс
+        ranks = np.cumsum(weights) - weights + (weights - 1) / 2
+        total = weights.sum()
+        return np.interp(np.asarray(qs) * (total - 1), ranks, items)
+
+
+class DistinctSketch:
+    # KMV: храним k наименьших 64-битных хешей; пока их меньше k — счёт точный
+    MAX_HASH = float(2 ** 64)
+
+    def __init__(self, k: int = 1024):
+        self.k = k
+        self.hashes = np.empty(0, dtype='uint64')
+
+    def update(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        hashed = pd.util.hash_array(values)
+        self.hashes = np.unique(np.concatenate([self.hashes, hashed]))[:self.k]
+
+    def merge(self, other: 'DistinctSketch') -> None:
+        self.hashes = np.unique(np.concatenate([self.hashes, other.hashes]))[:self.k]
+
+    def estimate(self) -> int:
+        if len(self.hashes) < self.k:
+            return len(self.hashes)
+        return int(round((self.k - 1) / (float(self.hashes[-1]) / self.MAX_HASH)))
+
+
+class DescribeAccumulator:
+    # аккумулятор по набору колонок: центральные моменты (Pébay), счётчики, min/max, скетчи
+
+    def __init__(self, columns: List[str], dtypes: List[str], sketch_size: int = 1024, seed: int = 0,
+                 skip: Collection[str] = ()):
+        k = len(columns)
+        self.columns = columns
+        self.dtypes = dtypes
+        self.skip = skip
+        self.rows = 0
+        self.missing = np.zeros(k, dtype='int64')
+        self.count = np.zeros(k, dtype='int64')
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.m3 = np.zeros(k)
+        self.m4 = np.zeros(k)
+        self.min = np.full(k, np.nan)
+        self.max = np.full(k, np.nan)
+        self.zeros = np.zeros(k, dtype='int64')
+        self.negatives = np.zeros(k, dtype='int64')
+        self.quantiles = [KLLSketch(sketch_size, seed=seed + i) for i in range(k)]
+        self.distinct = [DistinctSketch(sketch_size) for _ in range(k)]
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        x = coerce_numeric(chunk, self.columns, self.skip).to_numpy()
+        mask = ~np.isnan(x)
+        nb = mask.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.where(nb > 0, np.where(mask, x, 0.0).sum(axis=0) / nb, 0.0)
+            d = np.where(mask, x - mean_b, 0.0)
+            d2 = d ** 2
+            other = (nb, mean_b, d2.sum(axis=0), (d2 * d).sum(axis=0), (d2 ** 2).sum(axis=0))
+            self.min = np.fmin(self.min, np.where(mask, x, np.inf).min(axis=0, initial=np.inf))
+            self.max = np.fmax(self.max, np.where(mask, x, -np.inf).max(axis=0, initial=-np.inf))
+        self.min[np.isinf(self.min)] = np.nan
+        self.max[np.isinf(self.max)] = np.nan
+        self._merge_moments(*other)
+        self.rows += len(chunk)
+        self.missing += chunk[self.columns].isna().sum().to_numpy()
+        self.zeros += (x == 0).sum(axis=0)
+        self.negatives += (x < 0).sum(axis=0)
+        for i, col in enumerate(self.columns):
+            self.quantiles[i].update(x[mask[:, i], i])
+            raw = chunk[col].dropna().to_numpy()
+            if self.dtypes[i] in ('int64', 'float64'):
+                # одинаковые числа из int- и float-частей должны давать один хеш
+                raw = raw.astype('float64')
+            self.distinct[i].update(raw)
+
+    def _merge_moments(self, nb, mean_b, m2b, m3b, m4b) -> None:
+        # попарное слияние центральных моментов (Pébay, 2008)
+        na = self.count.astype('float64')
+        nb = np.asarray(nb, dtype='float64')
+        n = na + nb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean_b - self.mean
+            mean = np.where(n > 0, self.mean + delta * nb / n, 0.0)
+            m2 = self.m2 + m2b + delta ** 2 * na * nb / n
+            m3 = (self.m3 + m3b + delta ** 3 * na * nb * (na - nb) / n ** 2
+                  + 3 * delta * (na * m2b - nb * self.m2) / n)
+            m4 = (self.m4 + m4b + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / n ** 3
+                  + 6 * delta ** 2 * (na ** 2 * m2b + nb ** 2 * self.m2) / n ** 2
+                  + 4 * delta * (na * m3b - nb * self.m3) / n)
+        empty = n == 0
+        self.mean = mean
+        self.m2 = np.where(empty, 0.0, m2)
+        self.m3 = np.where(empty, 0.0, m3)
+        self.m4 = np.where(empty, 0.0, m4)
+        self.count = n.astype('int64')
+
+    def merge(self, other: 'DescribeAccumulator') -> None:
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self._merge_moments(other.count, other.mean, other.m2, other.m3, other.m4)
+        self.rows += other.rows
+        self.missing += other.missing
+        self.zeros += other.zeros
+        self.negatives += other.negatives
+        for mine, theirs in zip(self.quantiles, other.quantiles):
+            mine.merge(theirs)
+        for mine, theirs in zip(self.distinct, other.distinct):
+            mine.merge(theirs)
+
+    def stats(self) -> dict:
+        # те же величины, что numeric_moments, но из накопленных сумм
+        cnt = self.count.astype('float64')
+        m2, m3, m4 = self.m2, self.m3, self.m4
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = np.where(cnt > 1, m2 / (cnt - 1), np.nan)
+            m2z = np.where(np.abs(m2) < 1e-14, 0.0, m2)
+            m3z = np.where(np.abs(m3) < 1e-14, 0.0, m3)
+            skew = (cnt * (cnt - 1) ** 0.5 / (cnt - 2)) * (m3z / m2z ** 1.5)
+            skew = np.where(cnt < 3, np.nan, np.where(m2z == 0, 0.0, skew))
+            adj = 3 * (cnt - 1) ** 2 / ((cnt - 2) * (cnt - 3))
+            numerator = cnt * (cnt + 1) * (cnt - 1) * m4
+            denominator = (cnt - 2) * (cnt - 3) * m2 ** 2
+            numerator = np.where(np.abs(numerator) < 1e-14, 0.0, numerator)
+            denominator = np.where(np.abs(denominator) < 1e-14, 0.0, denominator)
+            kurt = np.where(denominator == 0, 0.0, numerator / denominator - adj)
+            kurt = np.where(cnt < 4, np.nan, kurt)
+        q = np.array([sk.quantiles([0.25, 0.5, 0.75]) for sk in self.quantiles]).reshape(-1, 3)
+        empty = self.count == 0
+        computed = {
+            'mean': self.mean, 'median': q[:, 1], 'std': np.sqrt(var), 'var': var,
+            'min': self.min, '25%': q[:, 0], '50%': q[:, 1], '75%': q[:, 2],
+            'max': self.max, 'iqr': q[:, 2] - q[:, 0], 'skew': skew, 'kurtosis': kurt,
+        }
+        stats = {key: np.where(empty, np.nan, computed[key]) for key in NUMERIC_STATS}
+        stats.update(count=self.count, zeros=self.zeros, negatives=self.negatives)
+        return stats
+
+
+def _accumulate_part(args) -> DescribeAccumulator:
+    dataset_path, meta, part, columns, dtypes, sketch_size, skip = args
+    acc = DescribeAccumulator(columns, dtypes, sketch_size, seed=part * len(columns), skip=skip)
+    acc.update(read_dataset_part(dataset_path, meta, part, columns))
+    return acc
+
+
+def accumulate_dataset(dataset_path: str, meta: dict, columns: List[str],
+                       sketch_size: int = 1024, workers: int = 0, skip: Collection[str] = ()) -> DescribeAccumulator:
+    dtypes = [meta['dtypes'][meta['columns'].index(c)] for c in columns]
+    tasks = [(dataset_path, meta, part, columns, dtypes, sketch_size, skip) for part in range(meta['parts'])]
+    total = DescribeAccumulator(columns, dtypes, sketch_size, skip=skip)
+    if workers and len(tasks) > 1:
+        # части независимы: считаем их параллельно и сливаем по порядку
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for acc in pool.map(_accumulate_part, tasks):
+                total.merge(acc)
+    else:
+        for task in tasks:
+            total.merge(_accumulate_part(task))
+    return total
+
+
+def describe_streaming(dataset_path: str, meta: dict, columns: List[str], sketch_size: int = 1024,
+                       workers: int = 0, profile: Optional[dict] = None) -> Tuple[pd.DataFrame, DescribeAccumulator]:
+    acc = accumulate_dataset(dataset_path, meta, columns, sketch_size, workers, skip=non_numeric_columns(profile))
+    # точное число уникальных из профиля загрузки; без профиля — оценка скетчем
+    known = profile_columns(profile, columns)
+    unique = [info['unique'] for info in known] if known else [sk.estimate() for sk in acc.distinct]
+    df_out = build_describe_table(
+        columns=list(columns),
+        dtypes=acc.dtypes,
+        n=acc.rows,
+        missing=acc.missing,
+        unique=unique,
+        stats=acc.stats(),
+    )
+    return df_out, acc
+
+
+def streaming_histograms(dataset_path: str, meta: dict, columns: List[str], lows: np.ndarray,
+                         highs: np.ndarray, bins: int = 30) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    # второй проход: гистограммы с границами из min/max первого прохода
+    edges = {col: np.histogram_bin_edges([], bins=bins, range=(lo, hi))
+             for col, lo, hi in zip(columns, lows, highs) if np.isfinite(lo) and np.isfinite(hi)}
+    counts = {col: np.zeros(bins, dtype='int64') for col in edges}
+    if not edges:
+        return {}
+    wanted = list(edges)
+    for part in range(meta['parts']):
+        x = coerce_numeric(read_dataset_part(dataset_path, meta, part, wanted), wanted)
+        for col in wanted:
+            values = x[col].to_numpy()
+            counts[col] += np.histogram(values[~np.isnan(values)], bins=edges[col])[0]
+    return {col: (counts[col], edges[col]) for col in wanted}
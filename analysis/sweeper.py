@@ -0,0 +1,167 @@
+import os
+import shutil
+import time
+from typing import Iterator, List, Tuple
+
+from django.core.files.storage import default_storage
+from django.db.models import Q
+
+from .artifacts import ARTIFACT_NAME_RE, ARTIFACTS_DIR, CONTENT_TYPES
+from .models import FileMeta, ReportMeta
+
+# Уборка файлов, на которые ничего не ссылается: загрузки в tmp/<user_id>/ (CSV и колоночные кэши),
+# оставшиеся от упавших запросов или неудачных удалений, и графики в charts/ без отчётов.
+# Каталоги читаются os.scandir пачками: в памяти только одна пачка записей, БД сверяется запросом на пачку.
+# Файлы моложе grace не трогаем — загрузка могла ещё не успеть создать свою FileMeta.
+
+UPLOADS_DIR = 'tmp'
+BATCH_SIZE = 1000
+# ключи результата отчёта с именами графиков (см. report_artifacts); plots — {колонка: имя}
+CHART_KEYS = ('plot', 'plot_img', 'heatmap')
+
+
+class SweepStats:
+    def __init__(self):
+        self.scanned = 0
+        self.deleted = 0
+        self.reclaimed_bytes = 0
+        self.errors = 0
+
+    def as_dict(self) -> dict:
+        return {'scanned': self.scanned, 'deleted': self.deleted,
+                'reclaimed_bytes': self.reclaimed_bytes, 'errors': self.errors}
+
+
+def _entry_size(entry: os.DirEntry) -> int:
+    if not entry.is_dir(follow_symlinks=False):
+        return entry.stat(follow_symlinks=False).st_size
+    total = 0
+    stack = [entry.path]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for child in it:
+                if child.is_dir(follow_symlinks=False):
+                    stack.append(child.path)
+                else:
+                    total += child.stat(follow_symlinks=False).st_size
+    return total
+
+
+def _iter_batches(root: str, batch_size: int) -> Iterator[Tuple[os.DirEntry, List[os.DirEntry]]]:
+    # (подкаталог root, пачка его записей); итератор scandir держится открытым между пачками
+    if not os.path.isdir(root):
+        return
+    with os.scandir(root) as subdirs:
+        for subdir in subdirs:
+            if not subdir.is_dir(follow_symlinks=False):
+                continue
+            batch = []
+            with os.scandir(subdir.path) as it:
+                for entry in it:
+                    batch.append(entry)
+                    if len(batch) >= batch_size:
+                        yield subdir, batch
+                        batch = []
+            if batch:
+                yield subdir, batch
+
+
+def _remove(entry: os.DirEntry, stats: SweepStats, dry_run: bool) -> None:
+    try:
+        size = _entry_size(entry)
+        if not dry_run:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+    except FileNotFoundError:
+        # удалили параллельно (release_upload, другой sweeper)
+        return
+    except OSError:
+        stats.errors += 1
+        return
+    stats.deleted += 1
+    stats.reclaimed_bytes += size
+
+
+def _old(entry: os.DirEntry, deadline: float) -> bool:
+    try:
+        return entry.stat(follow_symlinks=False).st_mtime < deadline
+    except FileNotFoundError:
+        return False
+
+
+def _remove_empty_dir(subdir: os.DirEntry, deadline: float, dry_run: bool) -> None:
+    # пустой каталог пользователя, давно не менявшийся; непустой rmdir не удалит
+    if not dry_run and _old(subdir, deadline):
+        try:
+            os.rmdir(subdir.path)
+        except OSError:
+            pass
+
+
+def sweep_uploads(grace_seconds: int, batch_size: int = BATCH_SIZE, dry_run: bool = False) -> SweepStats:
+    stats = SweepStats()
+    deadline = time.time() - grace_seconds
+    active = FileMeta.objects.filter(released_at__isnull=True)
+    last_subdir = None
+    for subdir, batch in _iter_batches(default_storage.path(UPLOADS_DIR), batch_size):
+        if last_subdir is not None and last_subdir.path != subdir.path:
+            _remove_empty_dir(last_subdir, deadline, dry_run)
+        last_subdir = subdir
+        stats.scanned += len(batch)
+        # пути в FileMeta — как их вернул default_storage.save: через '/'
+        paths = {f'{UPLOADS_DIR}/{subdir.name}/{entry.name}': entry for entry in batch}
+        referenced = set()
+        for storage_path, dataset_path in active.filter(
+                Q(storage_path__in=paths) | Q(dataset_path__in=paths)).values_list('storage_path', 'dataset_path'):
+            referenced.update((storage_path, dataset_path))
+        for path, entry in paths.items():
+            if path not in referenced and _old(entry, deadline):
+                _remove(entry, stats, dry_run)
+    if last_subdir is not None:
+        _remove_empty_dir(last_subdir, deadline, dry_run)
+    return stats
+
+
+def _digest(name: str) -> bytes:
+    # имя графика — sha256 содержимого, формат им определяется; в множестве — 32 байта вместо строки
+    return bytes.fromhex(name[:64])
+
+
+def referenced_artifacts(prefix: str = '') -> set:
+    # sha256 графиков из результатов отчётов, чьи имена начинаются с prefix. Из JSON читаются только
+    # ключи с графиками, без таблицы и CSV, которые занимают в результате основное место; отчёты
+    # отбираются по префиксу в БД (словарь plots — грубо, по тексту) и уточняются здесь
+    rows = ReportMeta.objects.filter(result__isnull=False)
+    if prefix:
+        match = Q(result__plots__icontains=f'"{prefix}')
+        for key in CHART_KEYS:
+            match |= Q(**{f'result__{key}__startswith': prefix})
+        rows = rows.filter(match)
+    digests = set()
+    for *names, plots in rows.values_list(
+            *(f'result__{key}' for key in CHART_KEYS), 'result__plots').iterator(chunk_size=2000):
+        if isinstance(plots, dict):
+            names.extend(plots.values())
+        digests.update(_digest(name) for name in names
+                       if isinstance(name, str) and name.startswith(prefix) and ARTIFACT_NAME_RE.match(name))
+    return digests
+
+
+def sweep_artifacts(grace_seconds: int, batch_size: int = BATCH_SIZE, dry_run: bool = False) -> SweepStats:
+    # charts/<aa>/<sha256>.<формат>, на которые не ссылается ни один отчёт (отчёт удалён), и брошенные .tmp.
+    # Ссылки собираются по каталогу-префиксу: в памяти — только графики одного из 256 каталогов
+    stats = SweepStats()
+    deadline = time.time() - grace_seconds
+    shard, referenced = None, set()
+    for subdir, batch in _iter_batches(default_storage.path(ARTIFACTS_DIR), batch_size):
+        if subdir.name != shard:
+            shard, referenced = subdir.name, referenced_artifacts(subdir.name)
+        stats.scanned += len(batch)
+        for entry in batch:
+            ext = os.path.splitext(entry.name)[1].lstrip('.')
+            known = ext in CONTENT_TYPES and ARTIFACT_NAME_RE.match(entry.name)
+            if (not known or _digest(entry.name) not in referenced) and _old(entry, deadline):
+                _remove(entry, stats, dry_run)
+    return stats
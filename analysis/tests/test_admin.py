@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from analysis.models import FileMeta, ReportLog, ReportMeta
+
+CHANGELISTS = ('/admin/analysis/filemeta/', '/admin/analysis/reportmeta/', '/admin/analysis/reportlog/',
+               '/admin/analysis/reportmeta/?status__exact=failed')
+
+
+class ChangelistQueryCountTests(TestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser('admin@example.com', password='pw')
+        self.client.force_login(admin)
+
+    def _add_rows(self, n):
+        start = get_user_model().objects.count()
+        for i in range(start, start + n):
+            owner = get_user_model().objects.create_user(f'user{i}@example.com')
+            file_meta = FileMeta.objects.create(owner=owner, original_name='weather.csv', storage_path='tmp/x.csv',
+                                                profile={'columns': {}})
+            report = ReportMeta.objects.create(owner=owner, file=file_meta, kind='describe',
+                                               status=ReportMeta.STATUS_FAILED, error='Traceback ' + 'x' * 500,
+                                               timings={'stages': {'load': 0.1}})
+            ReportLog.objects.create(report=report, owner=owner, message='analysis started')
+
+    def _query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self._add_rows(5)
+        counts = {url: self._query_count(url) for url in CHANGELISTS}
+        self._add_rows(5)
+        for url, count in counts.items():
+            with self.subTest(url=url), self.assertNumQueries(count):
+                self.assertEqual(self.client.get(url).status_code, 200)
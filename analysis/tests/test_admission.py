@@ -0,0 +1,144 @@
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from analysis.admission import AdmissionRejected, await_slot, check_admission, claim_next, try_start
+from analysis.jobs import run_job
+from analysis.models import ReportMeta
+
+LIMITS = dict(
+    ANALYSIS_JOB_TIMEOUT=600,
+    ANALYSIS_USER_MAX_RUNNING=1,
+    ANALYSIS_MAX_RUNNING_COST=8,
+    ANALYSIS_USER_MAX_PENDING=2,
+    ANALYSIS_MAX_QUEUED_COST=10,
+    ANALYSIS_JOBS_INLINE=False,
+)
+
+
+class AdmissionTests(TestCase):
+    def setUp(self):
+        # блокировка допуска для SQLite — файл в MEDIA_ROOT
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name, **LIMITS)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user('admission@example.com')
+
+    def _report(self, status=ReportMeta.STATUS_QUEUED, cost=1, started_ago=None, owner=None, heartbeat_ago=None):
+        now = timezone.now()
+        started_at = now - timedelta(seconds=started_ago) if started_ago is not None else None
+        heartbeat_at = now - timedelta(seconds=heartbeat_ago) if heartbeat_ago is not None else None
+        return ReportMeta.objects.create(owner=owner or self.user, kind='describe', status=status,
+                                         cost=cost, started_at=started_at, heartbeat_at=heartbeat_at)
+
+    def test_user_pending_limit_rejects_with_retry_after(self):
+        self._report()
+        self._report()
+        with self.assertRaises(AdmissionRejected) as ctx:
+            check_admission(self.user, 1)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+    def test_queued_cost_limit_rejects_with_retry_after(self):
+        other = get_user_model().objects.create_user('other@example.com')
+        self._report(cost=8, owner=other)
+        check_admission(self.user, 2)
+        with self.assertRaises(AdmissionRejected) as ctx:
+            check_admission(self.user, 3)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+    def test_user_running_limit(self):
+        self._report(status=ReportMeta.STATUS_RUNNING, started_ago=1)
+        waiting = self._report()
+        self.assertIs(try_start(waiting), False)
+        self.assertIsNone(claim_next())
+
+    def test_dead_job_frees_its_slot(self):
+        # процесс задачи убит: она осталась running дольше ANALYSIS_JOB_TIMEOUT
+        dead = self._report(status=ReportMeta.STATUS_RUNNING, cost=8, started_ago=3600)
+        waiting = self._report()
+        self.assertIs(try_start(waiting), True)
+        dead.refresh_from_db()
+        self.assertEqual(dead.status, ReportMeta.STATUS_QUEUED)
+        self.assertIsNone(dead.started_at)
+
+    def test_long_job_with_heartbeat_keeps_its_slot(self):
+        # задача идёт дольше ANALYSIS_JOB_TIMEOUT, но её процесс жив и отмечается
+        slow = self._report(status=ReportMeta.STATUS_RUNNING, cost=8, started_ago=3600, heartbeat_ago=5)
+        waiting = self._report()
+        self.assertIs(try_start(waiting), False)
+        slow.refresh_from_db()
+        self.assertEqual(slow.status, ReportMeta.STATUS_RUNNING)
+
+    def test_released_job_does_not_overwrite_status(self):
+        job = self._report()
+        self.assertIs(try_start(job), True)
+
+        def released_analysis(file_meta, params, result):
+            # пока анализ шёл, задачу освободили и завершили ошибкой
+            ReportMeta.objects.filter(id=job.id).update(
+                status=ReportMeta.STATUS_FAILED, result={'error': 'прервано'})
+            return 'ok', None, None
+
+        with mock.patch.dict('analysis.analyses.ANALYSES', {'describe': released_analysis}):
+            run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportMeta.STATUS_FAILED)
+        self.assertEqual(job.result, {'error': 'прервано'})
+
+    def test_dead_job_fails_without_worker(self):
+        dead = self._report(status=ReportMeta.STATUS_RUNNING, started_ago=3600)
+        with override_settings(ANALYSIS_JOBS_INLINE=True):
+            check_admission(self.user, 1)
+            claimed = claim_next()
+        self.assertIsNone(claimed)
+        dead.refresh_from_db()
+        self.assertEqual(dead.status, ReportMeta.STATUS_FAILED)
+        self.assertIn('error', dead.result)
+
+    def test_await_slot_gives_up_after_timeout(self):
+        self._report(status=ReportMeta.STATUS_RUNNING, started_ago=1)
+        waiting = self._report()
+        self.assertIs(async_to_sync(await_slot)(waiting, timeout=0.05, poll=0.01), False)
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.status, ReportMeta.STATUS_QUEUED)
+
+    def test_await_slot_starts_job(self):
+        waiting = self._report()
+        self.assertIs(async_to_sync(await_slot)(waiting, timeout=0.05), True)
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.status, ReportMeta.STATUS_RUNNING)
+
+
+class HeartbeatTests(TransactionTestCase):
+    # поток отметок пишет через своё соединение — без обёртывающей тест транзакции
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name, **LIMITS)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user('heartbeat@example.com')
+
+    def test_running_job_sends_heartbeats(self):
+        job = ReportMeta.objects.create(owner=self.user, kind='describe')
+        self.assertIs(try_start(job), True)
+        started_at = job.started_at
+
+        def slow_analysis(file_meta, params, result):
+            time.sleep(0.2)
+            return 'ok', None, None
+
+        with override_settings(ANALYSIS_JOB_HEARTBEAT=0.02), \
+                mock.patch.dict('analysis.analyses.ANALYSES', {'describe': slow_analysis}):
+            run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportMeta.STATUS_DONE)
+        self.assertGreater(job.heartbeat_at, started_at)
@@ -0,0 +1,61 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from analysis import chart_cache
+from analysis.chart_cache import CacheCounter, chart_key, evict, get_chart, put_chart
+
+CHART = b'x' * 100 * 1024
+SMALL_CHART = b'x' * 10 * 1024
+
+
+class ChartCacheTests(SimpleTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name, ANALYSIS_CHART_CACHE_MB=1)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        chart_cache._estimated_bytes = None
+        self.addCleanup(setattr, chart_cache, '_estimated_bytes', None)
+
+    def _size(self):
+        root = chart_cache._cache_root()
+        return sum(entry.stat().st_size for bucket in os.scandir(root) for entry in os.scandir(bucket.path))
+
+    def test_roundtrip_and_counter(self):
+        key = chart_key('sha', 'histogram', ['a'], {'bins': 30})
+        counter = CacheCounter()
+        self.assertIsNone(get_chart(key, counter))
+        put_chart(key, CHART)
+        self.assertEqual(get_chart(key, counter), CHART)
+        self.assertEqual(counter.as_dict(), {'hits': 1, 'misses': 1})
+        self.assertIsNone(chart_key(None, 'histogram', ['a']))
+        self.assertNotEqual(key, chart_key('sha', 'histogram', ['a'], {'bins': 31}))
+
+    def test_writes_scan_only_when_estimate_exceeds_limit(self):
+        with mock.patch.object(chart_cache, 'evict', wraps=evict) as scans:
+            for i in range(300):
+                put_chart(chart_key('sha', 'histogram', [str(i)]), SMALL_CHART)
+        # в 1 МБ — 102 графика, вытеснение оставляет 90%: обход при первой записи и затем примерно
+        # на каждую десятую, а не на каждую запись
+        self.assertLess(scans.call_count, 30)
+        self.assertLessEqual(self._size(), 1024 * 1024)
+        self.assertIsNotNone(get_chart(chart_key('sha', 'histogram', ['299'])))
+        self.assertIsNone(get_chart(chart_key('sha', 'histogram', ['0'])))
+
+    def test_evict_removes_least_recently_used(self):
+        keys = [chart_key('sha', 'histogram', [str(i)]) for i in range(9)]
+        for i, key in enumerate(keys):
+            put_chart(key, CHART)
+            os.utime(chart_cache._key_path(key), (1000 + i, 1000 + i))
+        # чтение обновляет mtime: первый график становится самым свежим
+        get_chart(keys[0])
+        removed = evict(500 * 1024)
+        self.assertEqual(removed, 5)
+        self.assertIsNotNone(get_chart(keys[0]))
+        self.assertIsNone(get_chart(keys[1]))
+        self.assertIsNotNone(get_chart(keys[8]))
+        self.assertEqual(chart_cache._estimated_bytes, self._size())
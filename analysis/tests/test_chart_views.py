@@ -0,0 +1,106 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from analysis.artifacts import save_artifact
+from analysis.models import ReportMeta
+from analysis.views import _parse_range
+
+DATA = bytes(range(256)) * 4
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_forms(self):
+        self.assertEqual(_parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(_parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(_parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(_parse_range('bytes=-500', 100), (0, 99))
+        self.assertEqual(_parse_range('bytes=50-500', 100), (50, 99))
+        # начало за концом файла — разбирается, ответ 416 решает представление
+        self.assertEqual(_parse_range('bytes=200-', 100), (200, 99))
+
+    def test_unsupported_or_invalid(self):
+        for header in (None, '', 'items=0-1', 'bytes=0-1,5-6', 'bytes=5', 'bytes=a-b', 'bytes=9-3'):
+            with self.subTest(header=header):
+                self.assertIsNone(_parse_range(header, 100))
+
+
+class ColumnPickerTests(SimpleTestCase):
+    def test_only_numeric_columns_offered(self):
+        for template in ('correlation.html', 'column_chart.html'):
+            with self.subTest(template=template):
+                html = render_to_string(template, {'columns': ['name', 'x'], 'numeric_columns': ['x']})
+                self.assertIn('value="x"', html)
+                self.assertNotIn('value="name"', html)
+
+    def test_no_numeric_columns(self):
+        # пустой список числовых колонок не подменяется всеми колонками файла
+        for template in ('correlation.html', 'column_chart.html'):
+            with self.subTest(template=template):
+                html = render_to_string(template, {'columns': ['name'], 'numeric_columns': []})
+                self.assertNotIn('value="name"', html)
+                self.assertIn('В файле нет числовых колонок', html)
+
+
+class ReportChartViewTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user('charts@example.com')
+        self.client.force_login(self.user)
+        self.name = save_artifact(DATA, 'png')
+        self.report = ReportMeta.objects.create(owner=self.user, kind='column_chart',
+                                                status=ReportMeta.STATUS_DONE, result={'plot': self.name})
+        self.url = reverse('analysis_report_chart', args=[self.report.id, self.name])
+        self.etag = f'"{self.name}"'
+
+    def test_full_response(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b''.join(resp.streaming_content), DATA)
+        self.assertEqual(resp['Content-Type'], 'image/png')
+        self.assertEqual(resp['ETag'], self.etag)
+        self.assertEqual(resp['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', resp['Cache-Control'])
+
+    def test_range(self):
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.content, DATA[10:20])
+        self.assertEqual(resp['Content-Range'], f'bytes 10-19/{len(DATA)}')
+
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.content, DATA[-4:])
+
+    def test_range_not_satisfiable(self):
+        resp = self.client.get(self.url, HTTP_RANGE=f'bytes={len(DATA)}-')
+        self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp['Content-Range'], f'bytes */{len(DATA)}')
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(resp.status_code, 200)
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=self.etag)
+        self.assertEqual(resp.status_code, 206)
+
+    def test_not_modified(self):
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], self.etag)
+        self.assertEqual(resp.content, b'')
+
+    def test_only_own_report_charts(self):
+        other = ReportMeta.objects.create(owner=self.user, kind='column_chart',
+                                          status=ReportMeta.STATUS_DONE, result={'plot': '0' * 64 + '.png'})
+        self.assertEqual(self.client.get(reverse('analysis_report_chart', args=[other.id, self.name])).status_code, 404)
+        stranger = get_user_model().objects.create_user('stranger@example.com')
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
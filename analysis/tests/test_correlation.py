@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from analysis.correlation import _count_inversions, correlation_matrix, kendall_tau
+
+
+def _brute_tau_b(x, y):
+    # tau-b по определению: все пары, O(n^2)
+    concordant = discordant = ties_x = ties_y = 0
+    for i in range(len(x)):
+        for j in range(i + 1, len(x)):
+            dx, dy = np.sign(x[i] - x[j]), np.sign(y[i] - y[j])
+            if dx == 0 and dy == 0:
+                continue
+            if dx == 0:
+                ties_x += 1
+            elif dy == 0:
+                ties_y += 1
+            elif dx == dy:
+                concordant += 1
+            else:
+                discordant += 1
+    denom = np.sqrt((concordant + discordant + ties_x) * (concordant + discordant + ties_y))
+    return (concordant - discordant) / denom if denom else np.nan
+
+
+class KendallTauTests(SimpleTestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(5)
+        for trial in range(40):
+            n = int(rng.integers(2, 60))
+            # мало различных значений — много связок, в том числе совместных
+            x = rng.integers(0, int(rng.integers(1, 8)), n).astype('float64')
+            y = (x * rng.choice([-1, 1]) + rng.integers(0, 4, n)).astype('float64')
+            with self.subTest(trial=trial):
+                expected = _brute_tau_b(x, y)
+                if np.isnan(expected):
+                    self.assertTrue(np.isnan(kendall_tau(x, y)))
+                else:
+                    self.assertAlmostEqual(kendall_tau(x, y), expected, places=12)
+
+    def test_continuous_and_degenerate(self):
+        rng = np.random.default_rng(6)
+        x = rng.normal(size=200)
+        y = x + rng.normal(size=200)
+        self.assertAlmostEqual(kendall_tau(x, y), _brute_tau_b(x, y), places=12)
+        self.assertEqual(kendall_tau(x, x), 1.0)
+        self.assertEqual(kendall_tau(x, -x), -1.0)
+        self.assertTrue(np.isnan(kendall_tau(x[:1], y[:1])))
+        self.assertTrue(np.isnan(kendall_tau(np.ones(5), y[:5])))
+
+    def test_count_inversions(self):
+        rng = np.random.default_rng(7)
+        for n in (0, 1, 2, 3, 17, 64, 100):
+            a = rng.integers(0, 10, n)
+            expected = sum(1 for i in range(n) for j in range(i + 1, n) if a[i] > a[j])
+            self.assertEqual(_count_inversions(a), expected, n)
+
+
+class CorrelationMatrixTests(SimpleTestCase):
+    def test_matches_pandas_pairwise(self):
+        rng = np.random.default_rng(8)
+        df = pd.DataFrame(rng.normal(size=(120, 4)), columns=list('abcd'))
+        df['b'] += df['a']
+        df['d'] = df['c'].round()
+        df.loc[rng.random(120) < 0.15, 'a'] = np.nan
+        df.loc[rng.random(120) < 0.15, 'c'] = np.nan
+        for method in ('pearson', 'spearman'):
+            with self.subTest(method=method):
+                r, n = correlation_matrix(df, method)
+                np.testing.assert_allclose(r.to_numpy(), df.corr(method=method).to_numpy(), atol=1e-12)
+                self.assertEqual(n.loc['a', 'c'], (df['a'].notna() & df['c'].notna()).sum())
+        # pandas считает Кендалла через scipy — сверяем с переборным tau-b по парно-полным строкам
+        r, _ = correlation_matrix(df, 'kendall')
+        for i in df.columns:
+            for j in df.columns:
+                if i != j:
+                    both = df[[i, j]].dropna()
+                    self.assertAlmostEqual(r.loc[i, j], _brute_tau_b(both[i].to_numpy(), both[j].to_numpy()),
+                                           places=12)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            correlation_matrix(pd.DataFrame({'a': [1.0, 2.0]}), 'cosine')
@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from analysis.dataset_files import DATASET_VERSION, META_NAME, dataset_path_for
+from analysis.models import FileMeta
+from analysis.utils import create_filemeta, release_upload, reuse_upload
+
+SHA = 'ab' * 32
+UPLOAD_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'uploads': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-uploads'},
+}
+
+
+class UploadDedupTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name, CACHES=UPLOAD_CACHES)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user('dedup@example.com')
+        self.source = self._upload('tmp/1/abc_weather.csv')
+
+    def _upload(self, rel_path):
+        # CSV и его колоночный кэш, как после разбора загрузки
+        default_storage.save(rel_path, ContentFile(b'a,b\n1,2\n'))
+        dataset = default_storage.path(dataset_path_for(rel_path))
+        os.makedirs(dataset)
+        with open(os.path.join(dataset, META_NAME), 'w', encoding='utf-8') as fh:
+            json.dump({'version': DATASET_VERSION}, fh)
+        return create_filemeta(self.user, 'weather.csv', rel_path, size_bytes=0,
+                               dataset_path=dataset_path_for(rel_path), sha256=SHA, profile={'columns': {}})
+
+    def _files_exist(self, file_meta):
+        return (default_storage.exists(file_meta.storage_path)
+                and os.path.isdir(default_storage.path(file_meta.dataset_path)))
+
+    def test_reuse_shares_files(self):
+        copy = reuse_upload(self.user, SHA, 'copy.csv', size_bytes=0)
+        self.assertIsNotNone(copy)
+        self.assertNotEqual(copy.id, self.source.id)
+        self.assertEqual(copy.storage_path, self.source.storage_path)
+        self.assertEqual(copy.dataset_path, self.source.dataset_path)
+        self.assertEqual(copy.original_name, 'copy.csv')
+
+    def test_files_kept_until_last_reference_released(self):
+        first = reuse_upload(self.user, SHA, 'a.csv')
+        second = reuse_upload(self.user, SHA, 'b.csv')
+        self.assertFalse(release_upload(self.source))
+        self.assertFalse(release_upload(first))
+        self.assertTrue(self._files_exist(second))
+        self.assertTrue(release_upload(second))
+        self.assertFalse(self._files_exist(second))
+        self.assertFalse(FileMeta.objects.filter(released_at__isnull=True).exists())
+
+    def test_release_twice_is_harmless(self):
+        copy = reuse_upload(self.user, SHA, 'copy.csv')
+        self.assertFalse(release_upload(copy))
+        self.assertFalse(release_upload(copy))
+        self.assertTrue(self._files_exist(self.source))
+
+    def test_no_reuse_across_users_or_after_release(self):
+        stranger = get_user_model().objects.create_user('stranger@example.com')
+        self.assertIsNone(reuse_upload(stranger, SHA, 'weather.csv'))
+        self.assertIsNone(reuse_upload(self.user, 'cd' * 32, 'weather.csv'))
+        release_upload(self.source)
+        self.assertIsNone(reuse_upload(self.user, SHA, 'weather.csv'))
+
+    def test_no_reuse_when_dataset_missing(self):
+        os.remove(os.path.join(default_storage.path(self.source.dataset_path), META_NAME))
+        self.assertIsNone(reuse_upload(self.user, SHA, 'weather.csv'))
@@ -0,0 +1,44 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from analysis.downsample import density_grid, lttb
+
+
+class LttbTests(SimpleTestCase):
+    def test_keeps_endpoints_and_returns_n_points(self):
+        rng = np.random.default_rng(0)
+        x = np.arange(10_000, dtype='float64')
+        y = np.cumsum(rng.normal(size=len(x)))
+        for n_out in (3, 10, 999, 1200):
+            with self.subTest(n_out=n_out):
+                xs, ys = lttb(x, y, n_out)
+                self.assertEqual(len(xs), n_out)
+                self.assertEqual(len(ys), n_out)
+                self.assertEqual((xs[0], ys[0]), (x[0], y[0]))
+                self.assertEqual((xs[-1], ys[-1]), (x[-1], y[-1]))
+                # точки исходные и идут по порядку
+                self.assertTrue(np.all(np.diff(xs) > 0))
+                np.testing.assert_array_equal(ys, y[xs.astype(int)])
+
+    def test_keeps_spike(self):
+        x = np.arange(1000, dtype='float64')
+        y = np.zeros(1000)
+        y[537] = 50.0
+        xs, ys = lttb(x, y, 20)
+        self.assertIn(537.0, xs)
+        self.assertEqual(ys.max(), 50.0)
+
+    def test_short_input_unchanged(self):
+        x, y = np.arange(5.0), np.arange(5.0) ** 2
+        for n_out in (5, 50, 2):
+            xs, ys = lttb(x, y, n_out)
+            np.testing.assert_array_equal(xs, x)
+            np.testing.assert_array_equal(ys, y)
+
+
+class DensityGridTests(SimpleTestCase):
+    def test_counts_every_point(self):
+        rng = np.random.default_rng(1)
+        grid = density_grid(rng.normal(size=5000), rng.normal(size=5000), bins=40)
+        self.assertEqual(grid['counts'].shape, (40, 40))
+        self.assertEqual(grid['counts'].sum(), 5000)
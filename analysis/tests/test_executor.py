@@ -0,0 +1,42 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from analysis import executor
+from analysis.jobs import crash_job
+from analysis.models import ReportMeta
+
+
+def _render_workers():
+    return settings.ANALYSIS_RENDER_WORKERS
+
+
+@override_settings(ANALYSIS_COMPUTE_WORKERS=1)
+class ComputePoolTests(SimpleTestCase):
+    def tearDown(self):
+        executor._reset_pool()
+
+    def test_crashed_worker_fails_task_and_pool_recovers(self):
+        with self.assertRaises(BrokenProcessPool):
+            async_to_sync(executor.run_in_pool)(os._exit, 1)
+        self.assertEqual(async_to_sync(executor.run_in_pool)(abs, -3), 3)
+
+    def test_pool_renders_in_process(self):
+        # вложенный пул рендера в процессе пула не поднимается
+        self.assertEqual(async_to_sync(executor.run_in_pool)(_render_workers), 0)
+
+
+class CrashedJobTests(TestCase):
+    def test_crashed_job_fails_with_clear_error(self):
+        user = get_user_model().objects.create_user('crash@example.com')
+        job = ReportMeta.objects.create(owner=user, kind='describe', status=ReportMeta.STATUS_RUNNING,
+                                        started_at=timezone.now())
+        crash_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportMeta.STATUS_FAILED)
+        self.assertIn('аварийно', job.result['error'])
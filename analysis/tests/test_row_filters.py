@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from analysis.row_filters import FilterError, filter_columns, row_mask
+
+PROFILE = {'columns': {
+    'temp': {'type': 'numeric'},
+    'code': {'type': 'numeric'},
+    'day': {'type': 'datetime', 'format': '%d.%m.%Y'},
+    'city': {'type': 'text'},
+}}
+
+
+def _frame():
+    return pd.DataFrame({
+        'temp': [-5.0, 0.0, 12.5, np.nan, 30.0],
+        # числа, которые при загрузке остались строками
+        'code': ['10', '9', 'x', '100', None],
+        'day': ['01.02.2024', '15.01.2024', '31.12.2023', None, '02.02.2024'],
+        'city': ['Москва', 'Казань', None, 'Москва', 'Сочи'],
+    })
+
+
+class RowMaskTests(SimpleTestCase):
+    def _rows(self, filters):
+        return np.flatnonzero(row_mask(_frame(), filters, PROFILE)).tolist()
+
+    def test_numeric(self):
+        self.assertEqual(self._rows([('temp', '>', 0)]), [2, 4])
+        self.assertEqual(self._rows([('temp', '<=', '0')]), [0, 1])
+        # строки сравниваются как числа: '9' < '10', а не наоборот
+        self.assertEqual(self._rows([('code', '<', 50)]), [0, 1])
+
+    def test_datetime_by_profile_format(self):
+        self.assertEqual(self._rows([('day', '>=', '2024-01-15')]), [0, 1, 4])
+
+    def test_text_and_in(self):
+        self.assertEqual(self._rows([('city', '==', 'Москва')]), [0, 3])
+        self.assertEqual(self._rows([('city', 'in', ['Казань', 'Сочи'])]), [1, 4])
+
+    def test_missing_values_never_match_comparisons(self):
+        self.assertEqual(self._rows([('temp', '!=', 0)]), [0, 2, 4])
+        self.assertEqual(self._rows([('city', '!=', 'Москва')]), [1, 4])
+
+    def test_null_checks(self):
+        self.assertEqual(self._rows([('city', 'isnull')]), [2])
+        self.assertEqual(self._rows([('code', 'notnull')]), [0, 1, 2, 3])
+
+    def test_filters_combined_with_and(self):
+        self.assertEqual(self._rows([('city', '==', 'Москва'), ('temp', 'notnull')]), [0])
+        self.assertEqual(self._rows([]), [0, 1, 2, 3, 4])
+
+    def test_without_profile_uses_dtype(self):
+        mask = row_mask(_frame(), [('temp', '>=', 12.5), ('code', '==', '100')])
+        self.assertEqual(np.flatnonzero(mask).tolist(), [])
+        mask = row_mask(_frame(), [('code', '==', '100')])
+        self.assertEqual(np.flatnonzero(mask).tolist(), [3])
+
+    def test_errors(self):
+        with self.assertRaises(FilterError):
+            self._rows([('temp', '~', 1)])
+        with self.assertRaises(FilterError):
+            self._rows([('temp', '>', 'warm')])
+        with self.assertRaises(FilterError):
+            self._rows([('day', '<', 'not a date')])
+
+    def test_filter_columns(self):
+        self.assertEqual(filter_columns([('a', '>', 1), ('b', 'isnull'), ('a', '<', 5)]), ['a', 'b'])
+        self.assertEqual(filter_columns(None), [])
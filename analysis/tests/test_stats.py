@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from analysis.stats import coerce_numeric, describe_table, numeric_moments
+
+# числовые строки describe и как их считал прежний движок: pandas по каждой колонке отдельно
+PANDAS_STATS = {
+    'Среднее': lambda s: s.mean(),
+    'Медиана': lambda s: s.median(),
+    'Стд': lambda s: s.std(),
+    'Дисперсия': lambda s: s.var(),
+    'Мин': lambda s: s.min(),
+    '25%': lambda s: s.quantile(0.25),
+    '50%': lambda s: s.quantile(0.5),
+    '75%': lambda s: s.quantile(0.75),
+    'Макс': lambda s: s.max(),
+    'IQR': lambda s: s.quantile(0.75) - s.quantile(0.25),
+    'Асимметрия': lambda s: s.skew(),
+    'Куртозис': lambda s: s.kurtosis(),
+}
+
+
+def _frame(n=500, seed=3):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'temp': rng.normal(10, 5, n),
+        'count': rng.integers(-5, 50, n),
+        'text_numbers': [f'{v:.4f}' if i % 7 else 'n/a' for i, v in enumerate(rng.uniform(0, 1, n))],
+        'label': rng.choice(['a', 'b', None], n),
+        'const': np.full(n, 2.5),
+    })
+    df.loc[rng.random(n) < 0.1, 'temp'] = np.nan
+    return df
+
+
+class DescribeTableTests(SimpleTestCase):
+    def test_matches_pandas_per_column(self):
+        df = _frame()
+        columns = list(df.columns)
+        table = describe_table(df, columns)
+        for col in columns:
+            series = df[col]
+            numbers = pd.to_numeric(series, errors='coerce').dropna()
+            self.assertEqual(table.loc['N', col], len(series))
+            self.assertEqual(table.loc['Пропуски', col], series.isna().sum())
+            self.assertEqual(table.loc['Уникальных', col], series.nunique(dropna=True))
+            self.assertEqual(table.loc['Тип', col], str(series.dtype))
+            if numbers.empty:
+                self.assertTrue(pd.isna(table.loc['Среднее', col]), col)
+                continue
+            for label, stat in PANDAS_STATS.items():
+                with self.subTest(column=col, stat=label):
+                    self.assertAlmostEqual(table.loc[label, col], round(float(stat(numbers)), 3), places=9)
+            self.assertEqual(table.loc['Нулей', col], (numbers == 0).sum())
+            self.assertEqual(table.loc['Отрицательных', col], (numbers < 0).sum())
+
+    def test_interpretation_and_cv(self):
+        df = pd.DataFrame({'wide': [1.0, 100.0, 2.0, 300.0], 'gaps': [1.0, None, None, 2.0]})
+        table = describe_table(df, ['wide', 'gaps'])
+        series = df['wide']
+        self.assertEqual(table.loc['CV', 'wide'], round(series.std() / series.mean(), 3))
+        self.assertIn('Высокая дисперсия (CV>1)', table.loc['Интерпретация', 'wide'])
+        self.assertIn('Много пропусков', table.loc['Интерпретация', 'gaps'])
+
+    def test_signed_zero_printed_as_pandas(self):
+        # -0.0 в данных (погода: «-0.0» градусов): знак нуля в таблице — как у прежнего движка
+        df = pd.DataFrame({
+            'neg_zeros': [-0.0, -0.0, -0.0, -0.0, None],
+            'mixed': [-0.0, 0.0, -0.0, 1.0, 0.0],
+            'single': [-0.0, None, None, None, None],
+        })
+        table = describe_table(df, list(df.columns))
+        for col in df.columns:
+            numbers = df[col].dropna()
+            for label, stat in PANDAS_STATS.items():
+                with self.subTest(column=col, stat=label):
+                    self.assertEqual(str(table.loc[label, col]), str(round(float(stat(numbers)), 3)))
+
+    def test_empty_frame(self):
+        table = describe_table(pd.DataFrame({'a': pd.Series([], dtype='float64')}), ['a'])
+        self.assertEqual(table.loc['N', 'a'], 0)
+        self.assertIsNone(table.loc['Доля пропусков', 'a'])
+
+
+class NumericMomentsTests(SimpleTestCase):
+    def test_quantiles_match_numpy(self):
+        x = np.random.default_rng(0).normal(size=(101, 3))
+        x[::5, 1] = np.nan
+        stats = numeric_moments(x)
+        for i in range(3):
+            values = x[:, i][~np.isnan(x[:, i])]
+            np.testing.assert_allclose([stats['25%'][i], stats['median'][i], stats['75%'][i]],
+                                       np.quantile(values, [0.25, 0.5, 0.75]))
+            self.assertEqual(stats['count'][i], len(values))
+
+    def test_coerce_numeric_parses_strings(self):
+        df = pd.DataFrame({'s': ['1.5', 'x', None], 'i': [1, 2, 3]})
+        out = coerce_numeric(df, ['s', 'i'])
+        np.testing.assert_array_equal(out['s'].to_numpy(), [1.5, np.nan, np.nan])
+        self.assertEqual(out['i'].dtype, np.float64)
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from analysis.stats import numeric_moments
+from analysis.streaming import DescribeAccumulator, DistinctSketch, KLLSketch
+
+MOMENTS = ('mean', 'std', 'var', 'min', 'max', 'skew', 'kurtosis')
+
+
+def _frame(n=3000, seed=1):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'a': rng.lognormal(1, 0.7, n),
+        'b': rng.integers(-20, 20, n).astype('float64'),
+        'c': rng.normal(1e6, 3, n),
+    })
+    df.loc[rng.random(n) < 0.05, 'a'] = np.nan
+    return df
+
+
+class DescribeAccumulatorTests(SimpleTestCase):
+    def test_merged_chunks_match_single_pass(self):
+        df = _frame()
+        columns = list(df.columns)
+        dtypes = [str(t) for t in df.dtypes]
+        single = numeric_moments(df.to_numpy())
+
+        # части разного размера, в том числе пустая; слияние в другом порядке
+        total = DescribeAccumulator(columns, dtypes)
+        bounds = [0, 1, 700, 700, 1900, len(df)]
+        parts = []
+        for i, (lo, hi) in enumerate(zip(bounds, bounds[1:])):
+            acc = DescribeAccumulator(columns, dtypes, seed=i)
+            acc.update(df.iloc[lo:hi])
+            parts.append(acc)
+        for acc in reversed(parts):
+            total.merge(acc)
+
+        stats = total.stats()
+        for key in MOMENTS:
+            with self.subTest(stat=key):
+                np.testing.assert_allclose(stats[key], single[key], rtol=1e-9)
+        np.testing.assert_array_equal(stats['count'], single['count'])
+        np.testing.assert_array_equal(stats['zeros'], single['zeros'])
+        np.testing.assert_array_equal(stats['negatives'], single['negatives'])
+        self.assertEqual(total.rows, len(df))
+        np.testing.assert_array_equal(total.missing, df.isna().sum().to_numpy())
+
+    def test_empty_column(self):
+        df = pd.DataFrame({'x': [np.nan, np.nan]})
+        acc = DescribeAccumulator(['x'], ['float64'])
+        acc.update(df)
+        stats = acc.stats()
+        self.assertEqual(stats['count'][0], 0)
+        self.assertTrue(np.isnan(stats['mean'][0]))
+        self.assertTrue(np.isnan(stats['median'][0]))
+
+
+class KLLSketchTests(SimpleTestCase):
+    def test_exact_below_capacity(self):
+        values = np.random.default_rng(2).normal(size=500)
+        sketch = KLLSketch(k=1024)
+        sketch.update(values[:200])
+        sketch.update(values[200:])
+        np.testing.assert_allclose(sketch.quantiles([0.25, 0.5, 0.75]), np.quantile(values, [0.25, 0.5, 0.75]))
+
+    def test_merged_sketch_rank_error(self):
+        values = np.random.default_rng(3).normal(size=200_000)
+        total = KLLSketch(k=256, seed=0)
+        for i, part in enumerate(np.array_split(values, 8)):
+            sketch = KLLSketch(k=256, seed=i + 1)
+            for chunk in np.array_split(part, 5):
+                sketch.update(chunk)
+            total.merge(sketch)
+        self.assertEqual(total.n, len(values))
+        self.assertLess(sum(len(level) for level in total.levels), 3 * 256)
+        ordered = np.sort(values)
+        for q, estimate in zip((0.1, 0.25, 0.5, 0.75, 0.9), total.quantiles([0.1, 0.25, 0.5, 0.75, 0.9])):
+            rank = np.searchsorted(ordered, estimate) / len(values)
+            self.assertLess(abs(rank - q), 0.02, q)
+
+    def test_empty(self):
+        self.assertTrue(np.isnan(KLLSketch().quantiles([0.5])).all())
+
+
+class DistinctSketchTests(SimpleTestCase):
+    def test_exact_below_capacity_and_merge(self):
+        first, second = DistinctSketch(k=1024), DistinctSketch(k=1024)
+        first.update(np.arange(300, dtype='float64'))
+        second.update(np.arange(200, 600, dtype='float64'))
+        first.merge(second)
+        self.assertEqual(first.estimate(), 600)
+
+    def test_estimate_above_capacity(self):
+        sketch = DistinctSketch(k=512)
+        sketch.update(np.arange(50_000, dtype='float64'))
+        self.assertLess(abs(sketch.estimate() - 50_000) / 50_000, 0.15)
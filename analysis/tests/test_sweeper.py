@@ -0,0 +1,71 @@
+import os
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from analysis.artifacts import artifact_path, save_artifact
+from analysis.models import ReportMeta
+from analysis.sweeper import referenced_artifacts, sweep_artifacts
+
+
+class SweepArtifactsTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user('sweep@example.com')
+
+    def _chart(self, data, fmt='png'):
+        name = save_artifact(data, fmt)
+        old = time.time() - 7200
+        os.utime(artifact_path(name), (old, old))
+        return name
+
+    def test_keeps_referenced_charts(self):
+        plot, heatmap, hist, img, orphan = (self._chart(bytes([i]) * 10) for i in range(5))
+        svg = self._chart(b'<svg/>', 'svg')
+        ReportMeta.objects.create(owner=self.user, result={
+            'plot': plot, 'heatmap': heatmap, 'html': '<table>...</table>', 'csv': 'a,b',
+            'plots': {'temp': hist, 'wind': svg},
+        })
+        ReportMeta.objects.create(owner=self.user, result={'plot_img': img})
+        ReportMeta.objects.create(owner=self.user, result={'error': 'boom'})
+        ReportMeta.objects.create(owner=self.user)
+        self.assertEqual(len(referenced_artifacts()), 5)
+
+        stats = sweep_artifacts(grace_seconds=3600, batch_size=2)
+        self.assertEqual(stats.deleted, 1)
+        self.assertFalse(os.path.exists(artifact_path(orphan)))
+        for name in (plot, heatmap, hist, img, svg):
+            self.assertTrue(os.path.exists(artifact_path(name)), name)
+
+    def test_grace_and_dry_run(self):
+        fresh = save_artifact(b'fresh')
+        orphan = self._chart(b'orphan')
+        stats = sweep_artifacts(grace_seconds=3600, dry_run=True)
+        self.assertEqual(stats.deleted, 1)
+        self.assertTrue(os.path.exists(artifact_path(orphan)))
+        sweep_artifacts(grace_seconds=3600)
+        self.assertFalse(os.path.exists(artifact_path(orphan)))
+        self.assertTrue(os.path.exists(artifact_path(fresh)))
+
+    def test_referenced_by_shard_prefix(self):
+        names = [self._chart(bytes([i]) * 10) for i in range(20)]
+        ReportMeta.objects.create(owner=self.user, result={'plot': names[0], 'plots': {'a': names[1], 'b': names[2]}})
+        for name in names[:3]:
+            shard = name[:2]
+            expected = {bytes.fromhex(n[:64]) for n in names[:3] if n.startswith(shard)}
+            self.assertEqual(referenced_artifacts(shard), expected)
+        unused = next(n[:2] for n in names[3:] if all(not m.startswith(n[:2]) for m in names[:3]))
+        self.assertEqual(referenced_artifacts(unused), set())
+
+    def test_reused_chart_is_not_swept(self):
+        # тот же график отрисован заново, а отчёт со ссылкой на него ещё не сохранён
+        name = self._chart(b'reused')
+        self.assertEqual(save_artifact(b'reused'), name)
+        self.assertEqual(sweep_artifacts(grace_seconds=3600).deleted, 0)
+        self.assertTrue(os.path.exists(artifact_path(name)))
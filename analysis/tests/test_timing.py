@@ -0,0 +1,58 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from analysis import timing
+from analysis.timing import add_stage, span, timing_context
+
+
+class TimingContextTests(SimpleTestCase):
+    def test_spans_add_up(self):
+        with timing_context({'upload.save': 0.5}) as timings:
+            with span('load'):
+                time.sleep(0.01)
+            with span('load'):
+                pass
+            add_stage('render', 0.25)
+        self.assertEqual(timings.stages['upload.save'], 0.5)
+        self.assertGreaterEqual(timings.stages['load'], 0.01)
+        self.assertEqual(timings.stages['render'], 0.25)
+        # вне замера span ничего не делает
+        with span('load'):
+            pass
+        self.assertEqual(set(timings.as_dict()), {'stages', 'peak_memory_mb'})
+
+    def test_peak_measured_when_alone(self):
+        with mock.patch.object(timing, '_reset_peak_rss') as reset, \
+                mock.patch.object(timing, '_peak_rss_mb', return_value=42.0):
+            with timing_context() as timings:
+                pass
+        reset.assert_called_once()
+        self.assertEqual(timings.peak_memory_mb, 42.0)
+
+    def test_overlapping_contexts_do_not_reset_or_report_peak(self):
+        with mock.patch.object(timing, '_reset_peak_rss') as reset, \
+                mock.patch.object(timing, '_peak_rss_mb', return_value=42.0):
+            first = timing_context()
+            first_timings = first.__enter__()
+            with timing_context() as second_timings:
+                pass
+            first.__exit__(None, None, None)
+            # следующий замер снова один в процессе
+            with timing_context() as third_timings:
+                pass
+        self.assertEqual(reset.call_count, 2)
+        self.assertIsNone(first_timings.peak_memory_mb)
+        self.assertIsNone(second_timings.peak_memory_mb)
+        self.assertEqual(third_timings.peak_memory_mb, 42.0)
+
+    def test_without_memory(self):
+        with mock.patch.object(timing, '_reset_peak_rss') as reset, \
+                mock.patch.object(timing, '_peak_rss_mb', return_value=42.0):
+            with timing_context(memory=False) as timings:
+                with timing_context() as inner:
+                    pass
+        self.assertIsNone(timings.peak_memory_mb)
+        self.assertEqual(inner.peak_memory_mb, 42.0)
+        self.assertEqual(reset.call_count, 1)
@@ -0,0 +1,109 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Замер времени по этапам анализа: span('load') и т.п. в любом месте кода добавляет время
+# к текущему Timings; вне timing_context() span ничего не делает.
+# Пик памяти — пик RSS всего процесса, поэтому он мерится там, где идёт работа (воркер, процесс пула),
+# и только пока в процессе нет других замеров: при одновременных задачах (потоки веб-процесса) пик
+# не сбрасывается под чужим замером и не записывается ни одной из них.
+
+_current: ContextVar[Optional['Timings']] = ContextVar('analysis_timings', default=None)
+_memory_lock = threading.Lock()
+_measuring = set()      # Timings с идущим замером памяти в этом процессе
+
+
+def _reset_peak_rss() -> None:
+    # Linux: "5" в clear_refs сбрасывает пик RSS процесса (VmHWM), чтобы мерить пик одной задачи
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is not None:
+        # без /proc — пик за всё время жизни процесса (на Linux в КБ)
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return None
+
+
+class Timings:
+    def __init__(self, stages: Optional[dict] = None):
+        self.stages = dict(stages or {})
+        self.peak_memory_mb = None
+        self.memory_shared = False
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = round(self.stages.get(name, 0.0) + seconds, 6)
+
+    def as_dict(self) -> dict:
+        return {'stages': self.stages, 'peak_memory_mb': self.peak_memory_mb}
+
+
+def _start_memory(timings: Timings) -> None:
+    with _memory_lock:
+        if _measuring:
+            # процесс уже занят другим замером: пик общий на всех, сбрасывать его нельзя
+            timings.memory_shared = True
+            for other in _measuring:
+                other.memory_shared = True
+        else:
+            _reset_peak_rss()
+        _measuring.add(timings)
+
+
+def _stop_memory(timings: Timings) -> Optional[float]:
+    with _memory_lock:
+        _measuring.discard(timings)
+        return None if timings.memory_shared else _peak_rss_mb()
+
+
+@contextmanager
+def timing_context(stages: Optional[dict] = None, memory: bool = True):
+    # memory=False — без пика памяти: процесс не выполняет работу сам (ждёт пул) или обслуживает других
+    timings = Timings(stages)
+    token = _current.set(timings)
+    if memory:
+        _start_memory(timings)
+    try:
+        yield timings
+    finally:
+        if memory:
+            timings.peak_memory_mb = _stop_memory(timings)
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def add_stage(name: str, seconds: float) -> None:
+    # для этапов, измеренных в другом процессе (пул рендера)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
@@ -0,0 +1,91 @@
+from typing import Optional
+
+from django.core.cache import caches
+
+from .dataset_files import read_dataset_meta
+from .models import FileMeta
+
+# Состояние загрузки (колонки, строки предпросмотра, выбор колонок, замеры загрузки) хранится
+# в кэше Django по id FileMeta, а не в сессии: в сессии остаётся только id. Каждая часть лежит
+# под своим ключом и читается только теми представлениями, которым нужна; при промахе кэша
+# колонки и предпросмотр восстанавливаются из колоночного кэша набора данных.
+
+CACHE_ALIAS = 'uploads'
+PREVIEW_SIZE = 10
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _key(file_meta_id: int, part: str) -> str:
+    return f'analysis:upload:{file_meta_id}:{part}'
+
+
+def save_upload_state(file_meta_id: int, columns: list, preview_rows: list, timings: Optional[dict] = None) -> None:
+    _cache().set_many({
+        _key(file_meta_id, 'columns'): columns,
+        _key(file_meta_id, 'preview'): preview_rows,
+        _key(file_meta_id, 'timings'): timings or {},
+    })
+
+
+def upload_columns(file_meta: Optional[FileMeta]) -> list:
+    if file_meta is None:
+        return []
+    columns = _cache().get(_key(file_meta.id, 'columns'))
+    if columns is None:
+        meta = read_dataset_meta(file_meta.dataset_path) if file_meta.dataset_path else None
+        columns = meta['columns'] if meta else []
+        _cache().set(_key(file_meta.id, 'columns'), columns)
+    return columns
+
+
+def upload_preview(file_meta: Optional[FileMeta]) -> list:
+    if file_meta is None:
+        return []
+    rows = _cache().get(_key(file_meta.id, 'preview'))
+    if rows is None:
+        meta = read_dataset_meta(file_meta.dataset_path) if file_meta.dataset_path else None
+        rows = []
+        if meta and meta['parts']:
+            # pandas нужен только здесь — при промахе кэша состояния
+            from .datasets import read_dataset_part
+            rows = read_dataset_part(file_meta.dataset_path, meta, 0).head(PREVIEW_SIZE).values.tolist()
+        _cache().set(_key(file_meta.id, 'preview'), rows)
+    return rows
+
+
+def upload_timings(file_meta: Optional[FileMeta]) -> dict:
+    if file_meta is None:
+        return {}
+    return _cache().get(_key(file_meta.id, 'timings')) or {}
+
+
+def pop_upload_timings(file_meta: Optional[FileMeta]) -> dict:
+    # замеры загрузки достаются только первому анализу по ней: дальше загрузка уже готова
+    timings = upload_timings(file_meta)
+    if timings:
+        _cache().delete(_key(file_meta.id, 'timings'))
+    return timings
+
+
+def get_selected_columns(file_meta: Optional[FileMeta], view: str) -> list:
+    # последний выбор колонок на странице view ('describe', 'correlation')
+    if file_meta is None:
+        return []
+    return _cache().get(_key(file_meta.id, f'selected:{view}')) or []
+
+
+def set_selected_columns(file_meta: Optional[FileMeta], view: str, columns: list) -> None:
+    if file_meta is not None:
+        _cache().set(_key(file_meta.id, f'selected:{view}'), list(columns))
+
+
+def delete_upload_state(file_meta_id: Optional[int]) -> None:
+    if not file_meta_id:
+        return
+    _cache().delete_many([
+        _key(file_meta_id, part)
+        for part in ('columns', 'preview', 'timings', 'selected:describe', 'selected:correlation')
+    ])
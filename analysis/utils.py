@@ -1,36 +1,98 @@
-import io
+import hashlib
 import time
 import traceback
 from typing import Optional, Tuple
 
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-from django.conf import settings
+from django.core.files.base import File
+from django.db import transaction
+from django.utils import timezone
 
 from .models import FileMeta, ReportMeta, ReportLog
+from .dataset_files import dataset_path_for, delete_dataset, read_dataset_meta
+from .timing import timing_context
+from .upload_state import delete_upload_state
 
 
-def create_filemeta(owner, original_name: str, storage_path: str, size_bytes: Optional[int] = None) -> FileMeta:
+def create_filemeta(owner, original_name: str, storage_path: str, size_bytes: Optional[int] = None,
+                    dataset_path: Optional[str] = None, sha256: Optional[str] = None,
+                    profile: Optional[dict] = None) -> FileMeta:
    
     return FileMeta.objects.create(
         owner=owner,
         original_name=original_name,
         storage_path=storage_path,
-        size_bytes=size_bytes
+        size_bytes=size_bytes,
+        dataset_path=dataset_path,
+        sha256=sha256,
+        profile=profile,
     )
 
 
+class HashingFile(File):
+    # хранилище пишет файл по chunks() — хеш считается в том же проходе, без повторного чтения с диска.
+    # temporary_file_path намеренно не пробрасывается: иначе FileSystemStorage переместит файл, не читая его
+    def __init__(self, file, name=None):
+        super().__init__(file, name)
+        self.hasher = hashlib.sha256()
+
+    def chunks(self, chunk_size=None):
+        for chunk in super().chunks(chunk_size):
+            self.hasher.update(chunk)
+            yield chunk
+
+
+def save_upload(rel_path: str, uploaded) -> Tuple[str, str]:
+    # сохраняет загруженный файл и возвращает (фактический путь, sha256 содержимого)
+    content = HashingFile(uploaded, name=uploaded.name)
+    saved_rel_path = default_storage.save(rel_path, content)
+    return saved_rel_path, content.hasher.hexdigest()
+
+
+def reuse_upload(owner, sha256: str, original_name: str, size_bytes: Optional[int] = None) -> Optional[FileMeta]:
+    # тот же файл у этого пользователя уже загружен и разобран: новая загрузка ссылается на его файлы
+    with transaction.atomic():
+        source = (
+            FileMeta.objects.select_for_update()
+            .filter(owner=owner, sha256=sha256, released_at__isnull=True, dataset_path__isnull=False)
+            .order_by('-uploaded_at')
+            .first()
+        )
+        if source is None:
+            return None
+        if not default_storage.exists(source.storage_path) or read_dataset_meta(source.dataset_path) is None:
+            return None
+        return create_filemeta(
+            owner=owner,
+            original_name=original_name,
+            storage_path=source.storage_path,
+            size_bytes=size_bytes,
+            dataset_path=source.dataset_path,
+            sha256=sha256,
+            profile=source.profile,
+        )
+
+
 def get_filemeta_from_session(request) -> Optional[FileMeta]:
     
     fm_id = request.session.get('uploaded_file_meta_id')
     if not fm_id:
         return None
-    return FileMeta.objects.filter(id=fm_id).first()
+    # освобождённая загрузка (истекла, вытеснена квотой) — как будто файла нет
+    return FileMeta.objects.filter(id=fm_id, owner_id=request.user.id, released_at__isnull=True).first()
 
 
-def create_report(owner, file_meta: Optional[FileMeta] = None) -> ReportMeta:
+async def aget_filemeta_from_session(request, user) -> Optional[FileMeta]:
+    # то же для асинхронных представлений: сессия и ORM через async-API
+    fm_id = await request.session.aget('uploaded_file_meta_id')
+    if not fm_id:
+        return None
+    return await FileMeta.objects.filter(id=fm_id, owner_id=user.id, released_at__isnull=True).afirst()
+
+
+def create_report(owner, file_meta: Optional[FileMeta] = None, **fields) -> ReportMeta:
     
-    return ReportMeta.objects.create(owner=owner, file=file_meta)
+    return ReportMeta.objects.create(owner=owner, file=file_meta, **fields)
 
 
 def add_report_log(report: ReportMeta, owner, message: str) -> ReportLog:
@@ -39,32 +101,113 @@ def add_report_log(report: ReportMeta, owner, message: str) -> ReportLog:
     return ReportLog.objects.create(report=report, owner=owner, message=message)
 
 
-def safe_run_analysis(report: ReportMeta, owner, func, *args, **kwargs) -> Tuple[Optional[str], Optional[bytes], Optional[str]]:
-    
+class ReportLogBuffer:
+    # строки лога копятся в памяти (время — момент события) и пишутся одним bulk_create
+    # в одной транзакции с финальным сохранением отчёта
+    def __init__(self, report: ReportMeta, owner):
+        self.report = report
+        self.owner = owner
+        self.entries = []
+
+    def add(self, message: str) -> None:
+        self.entries.append(ReportLog(report=self.report, owner=self.owner, message=message))
+
+    def flush(self, report_fields=(), expect: Optional[dict] = None) -> bool:
+        # expect — условие на строку отчёта: если её уже изменил другой процесс (задачу освободил
+        # контроль допуска), поля не пишутся и возвращается False; лог пишется в любом случае
+        saved = True
+        with transaction.atomic():
+            if report_fields and expect is None:
+                self.report.save(update_fields=list(report_fields))
+            elif report_fields:
+                saved = bool(ReportMeta.objects.filter(id=self.report.id, **expect).update(
+                    **{field: getattr(self.report, field) for field in report_fields}))
+            if self.entries:
+                ReportLog.objects.bulk_create(self.entries)
+        self.entries = []
+        return saved
+
+
+def safe_run_analysis(report: ReportMeta, owner, func, *args, log: Optional[ReportLogBuffer] = None,
+                      **kwargs) -> Tuple[Optional[str], Optional[bytes], Optional[str]]:
+    # с log строки лога и поля отчёта не пишутся сразу — их сохраняет log.flush() вызывающего
+    def write_log(message):
+        if log is None:
+            add_report_log(report, owner, message)
+        else:
+            log.add(message)
+
     start = time.time()
-    add_report_log(report, owner, "analysis started")
+    write_log("analysis started")
+    timings = None
     try:
-        summary, result_bytes, result_filename = func(*args, **kwargs)
+        # этапы, замеренные при загрузке файла, продолжаются этапами самого анализа
+        with timing_context((report.timings or {}).get('stages')) as timings:
+            summary, result_bytes, result_filename = func(*args, **kwargs)
+        report.timings = timings.as_dict()
         duration = time.time() - start
         report.summary = summary
         report.duration_seconds = duration
-        report.save(update_fields=['summary', 'duration_seconds'])
-        add_report_log(report, owner, "analysis finished")
+        if log is None:
+            report.save(update_fields=['summary', 'duration_seconds', 'timings'])
+        write_log("analysis finished")
         return summary, result_bytes, result_filename
     except Exception as exc:
         tb = traceback.format_exc()
         report.error = tb
-        report.save(update_fields=['error'])
-        add_report_log(report, owner, f"analysis failed: {str(exc)}")
+        if timings is not None:
+            report.timings = timings.as_dict()
+        if log is None:
+            report.save(update_fields=['error', 'timings'])
+        write_log(f"analysis failed: {str(exc)}")
         raise
 
 
-def cleanup_uploaded_file_and_session(request):
-    rel_path = request.session.get('uploaded_file_path')
-    if rel_path:
-        try:
-            default_storage.delete(rel_path)
-        except Exception:
-            pass
-    for k in ('uploaded_file_path','uploaded_file_meta_id','uploaded_columns','uploaded_preview_rows','describe_selected_cols'):
+# в сессии хранится только id загрузки; остальные ключи — из старых сессий, где лежало всё состояние
+UPLOAD_SESSION_KEYS = ('uploaded_file_meta_id', 'uploaded_file_path', 'uploaded_columns', 'uploaded_preview_rows',
+                       'uploaded_timings', 'describe_selected_cols', 'correlation_selected_cols')
+
+
+def record_stage(report: ReportMeta, name: str, seconds: float) -> None:
+    # этап вне задачи (например, рендер шаблона отчёта) — пишется один раз, при первом замере
+    timings = report.timings or {'stages': {}}
+    stages = timings.setdefault('stages', {})
+    if name in stages:
+        return
+    stages[name] = round(seconds, 6)
+    report.timings = timings
+    report.save(update_fields=['timings'])
+
+
+def delete_upload_files(rel_path: str) -> None:
+    # CSV и его колоночный кэш
+    try:
+        default_storage.delete(rel_path)
+    except Exception:
+        pass
+    delete_dataset(dataset_path_for(rel_path))
+
+
+def release_upload(file_meta: FileMeta) -> bool:
+    # снимает ссылку загрузки на файлы; сами файлы удаляются, когда ссылок не осталось.
+    # Возвращает True, если файлы удалены
+    with transaction.atomic():
+        # блокировка строк с тем же путём ждёт незавершённый reuse_upload, а проверка ниже —
+        # отдельный запрос, который уже видит созданную им загрузку
+        list(FileMeta.objects.select_for_update().filter(storage_path=file_meta.storage_path).values_list('id', flat=True))
+        if file_meta.released_at is None:
+            file_meta.released_at = timezone.now()
+            FileMeta.objects.filter(id=file_meta.id).update(released_at=file_meta.released_at)
+        held = FileMeta.objects.filter(storage_path=file_meta.storage_path, released_at__isnull=True).exists()
+    delete_upload_state(file_meta.id)
+    if held:
+        return False
+    delete_upload_files(file_meta.storage_path)
+    return True
+
+
+def detach_upload_from_session(request):
+    # файл остаётся в рабочем пространстве, из сессии убираем только ссылки
+    for k in UPLOAD_SESSION_KEYS:
         request.session.pop(k, None)
+
@@ -1,28 +1,48 @@
 import os
+import time
 import uuid
-import io
-import base64
+from concurrent.futures.process import BrokenProcessPool
+from functools import wraps
 
-from django.shortcuts import render, redirect
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.core.files.storage import default_storage
 from django.conf import settings
-from django.http import HttpResponseBadRequest, HttpResponseForbidden, FileResponse, Http404, HttpResponse
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, FileResponse, Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from analysis.models import FileMeta, ReportMeta
 from analysis.utils import (
+    aget_filemeta_from_session,
     create_filemeta,
     get_filemeta_from_session,
-    create_report,
-    add_report_log,
-    safe_run_analysis,
-    cleanup_uploaded_file_and_session
+    detach_upload_from_session,
+    record_stage,
+    save_upload,
+    reuse_upload,
+    release_upload,
+)
+from analysis.admission import AdmissionRejected, admission_lock, await_slot, check_admission, estimate_cost
+from analysis.dataset_files import dataset_path_for, IngestError
+from analysis.executor import run_in_pool
+from analysis.jobs import crash_job, enqueue_analysis, give_up_job, run_job_by_id
+from analysis.artifacts import CONTENT_TYPES, artifact_format, find_artifact, report_artifacts
+from analysis.profiling import columns_of_type
+from analysis.render_profiles import RENDER_PROFILES
+from analysis.timing import span, timing_context
+from analysis.workspace import enforce_quota, touch_upload
+from analysis.upload_state import (
+    save_upload_state,
+    upload_columns,
+    upload_preview,
+    upload_timings,
+    pop_upload_timings,
+    get_selected_columns,
+    set_selected_columns,
+    delete_upload_state,
 )
-
-MAX_ROWS = 1000
-MAX_BYTES = 10 * 1024 * 1024  # 10 MB
 
 def _user_tmp_dir(user):
     return os.path.join('tmp', str(user.id))
@@ -32,83 +52,165 @@ def _is_path_in_user_tmp(rel_path, user):
     norm = os.path.normpath(rel_path)
     return norm.startswith(os.path.normpath(os.path.join('tmp', str(user.id))))
 
+# Загрузка и запуск анализов — асинхронные представления: файл, сессия и ORM ожидаются,
+# разбор CSV и анализы без воркера считаются в пуле процессов (executor.py), шаблоны — в потоке.
+_arender = sync_to_async(render)
+
+
+def _load_user(request):
+    return request.user.is_authenticated
+
+
+def async_login_required(view):
+    # login_required для async-представлений берёт пользователя через request.auser(), а бэкенды
+    # social_django не умеют aget_user — пользователь загружается синхронно в потоке,
+    # дальше request.user уже готов и к БД не обращается
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not await sync_to_async(_load_user)(request):
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _parse_body(request):
+    return request.POST, request.FILES
+
+
+async def _aparse_body(request):
+    # тело POST (multipart до ANALYSIS_MAX_UPLOAD_MB) Django разбирает синхронно при первом обращении
+    # к request.POST/FILES — разбор и запись файла идут в потоке, а не в цикле событий
+    if request.method == 'POST':
+        await sync_to_async(_parse_body)(request)
+
+
+# partial, в который возвращаемся после загрузки или выбора набора данных
+UPLOAD_PARTIALS = {
+    'column_chart.html',
+    'descriptive_statistics.html',
+    'correlation.html',
+}
+
+# методы матрицы корреляций (DataFrame.corr)
+CORRELATION_METHODS = ('pearson', 'spearman', 'kendall')
+
+
+def _columns_context(file_meta, columns):
+    # графики и корреляция — только по колонкам, которые профиль загрузки считает числовыми
+    return {
+        'columns': columns,
+        'numeric_columns': columns_of_type(file_meta.profile if file_meta else None, columns),
+    }
+
+
+def _upload_context(request, file_meta=None):
+    # колонки и предпросмотр текущей загрузки — из хранилища состояния, не из сессии
+    if file_meta is None:
+        file_meta = get_filemeta_from_session(request)
+    preview_rows = upload_preview(file_meta)
+    columns = upload_columns(file_meta)
+    return {
+        **_columns_context(file_meta, columns),
+        'rows': preview_rows,
+        'show_preview': bool(preview_rows),
+    }
+
+
 @login_required
 def column_chart(request):
     # рендерим index с selected_partial 
-    columns = request.session.get('uploaded_columns', [])
-    preview_rows = request.session.get('uploaded_preview_rows', [])
     return render(request, 'index.html', {
         'selected_partial': 'column_chart.html',
-        'columns': columns,
-        'rows': preview_rows,
-        'show_preview': bool(preview_rows),
+        **_upload_context(request),
     })
 
-@login_required
-def open_file(request):
+@async_login_required
+async def open_file(request):
+    await _aparse_body(request)
     if request.method != 'POST' or 'file' not in request.FILES:
         return redirect('column_chart')
 
+    user = request.user
     f = request.FILES['file']
-    if f.size > MAX_BYTES:
-        return HttpResponseBadRequest(f"Файл слишком большой. Максимум {MAX_BYTES // (1024*1024)} MB.")
+    max_bytes = settings.ANALYSIS_MAX_UPLOAD_MB * 1024 * 1024
+    if f.size > max_bytes:
+        return HttpResponseBadRequest(f"Файл слишком большой. Максимум {settings.ANALYSIS_MAX_UPLOAD_MB} MB.")
 
-    tmp_dir = _user_tmp_dir(request.user)
+    tmp_dir = _user_tmp_dir(user)
     filename = f"{uuid.uuid4().hex}_{f.name}"
     rel_path = os.path.join(tmp_dir, filename)
 
-    saved_rel_path = default_storage.save(rel_path, f)
-    full_path = default_storage.path(saved_rel_path)
-
-    try:
-        df_head = pd.read_csv(full_path, nrows=MAX_ROWS + 1)
-    except Exception as e:
-        default_storage.delete(saved_rel_path)
-    
-        return HttpResponseBadRequest("Ошибка чтения CSV: " + str(e))
-
-    if len(df_head) > MAX_ROWS:
-        default_storage.delete(saved_rel_path)
-        return HttpResponseBadRequest(f"Файл слишком большой. Максимум {MAX_ROWS} строк.")
-
-    preview_rows = df_head.head(10).values.tolist()
-    columns = df_head.columns.tolist()
-
-    # log_filemeta
-    file_meta = create_filemeta(
-        owner=request.user,
-        original_name=f.name,
-        storage_path=saved_rel_path,
-        size_bytes=getattr(f, 'size', None)
-    )
-    request.session['uploaded_file_meta_id'] = file_meta.id
-    request.session['uploaded_file_path'] = saved_rel_path
-    request.session['uploaded_columns'] = columns
-    request.session['uploaded_preview_rows'] = preview_rows
-
-#  короткий лог о загрузке 
-
+    # только время этапов: разбор идёт в пуле, а пик памяти веб-процесса — общий для всех его запросов
+    with timing_context(memory=False) as upload_stages:
+        # sha256 считается во время записи на диск
+        with span('upload.save'):
+            saved_rel_path, digest = await sync_to_async(save_upload)(rel_path, f)
+
+        # тот же файл уже загружен этим пользователем — берём готовый разобранный набор данных
+        file_meta = await sync_to_async(reuse_upload)(user, digest, f.name, size_bytes=getattr(f, 'size', None))
+        if file_meta is not None:
+            await sync_to_async(default_storage.delete)(saved_rel_path)
+            columns = await sync_to_async(upload_columns)(file_meta)
+            preview_rows = await sync_to_async(upload_preview)(file_meta)
+        else:
+            # datasets тянет pandas — импорт только здесь, а не при загрузке urls
+            from analysis.datasets import ingest_csv
+            full_path = default_storage.path(saved_rel_path)
 
+            # CSV разбирается чанками и сразу пишется в колоночный кэш — память не растёт с размером файла;
+            # разбор идёт в пуле процессов
+            try:
+                with span('upload.ingest'):
+                    meta, preview_rows = await run_in_pool(
+                        ingest_csv,
+                        full_path,
+                        dataset_path_for(saved_rel_path),
+                        chunk_rows=settings.ANALYSIS_INGEST_CHUNK_ROWS,
+                        max_rows=settings.ANALYSIS_MAX_ROWS,
+                        content_hash=digest,
+                    )
+            except IngestError as e:
+                await sync_to_async(default_storage.delete)(saved_rel_path)
+                return HttpResponseBadRequest(str(e))
+            except BrokenProcessPool:
+                await sync_to_async(default_storage.delete)(saved_rel_path)
+                return HttpResponseBadRequest(
+                    "Ошибка чтения CSV: процесс разбора аварийно завершился (возможно, не хватило памяти)")
+            except Exception as e:
+                await sync_to_async(default_storage.delete)(saved_rel_path)
+
+                return HttpResponseBadRequest("Ошибка чтения CSV: " + str(e))
+
+            columns = meta['columns']
+
+            # log_filemeta
+            file_meta = await sync_to_async(create_filemeta)(
+                owner=user,
+                original_name=f.name,
+                storage_path=saved_rel_path,
+                size_bytes=getattr(f, 'size', None),
+                dataset_path=dataset_path_for(saved_rel_path),
+                sha256=digest,
+                profile=meta.get('profile'),
+            )
+
+    # в сессии только id; колонки, предпросмотр и замеры — в хранилище состояния загрузки
+    await sync_to_async(save_upload_state)(file_meta.id, columns, preview_rows, upload_stages.stages)
+    await request.session.aset('uploaded_file_meta_id', file_meta.id)
+    # новая загрузка вытесняет самые давно не использованные сверх квоты рабочего пространства
+    await sync_to_async(enforce_quota)(user, keep=file_meta)
 
-   
-  
     next_partial = request.POST.get('next_partial', '').strip()
 
     #  валидация  только конкретные имена partial, которые есть в проекте
-    allowed_partials = {
-        'column_chart.html',
-        'descriptive_statistics.html',
-        'correlation.html',
-    
-    }
-    if next_partial not in allowed_partials:
+    if next_partial not in UPLOAD_PARTIALS:
         
         next_partial = 'column_chart.html'
 
     
-    return render(request, 'index.html', {
+    return await _arender(request, 'index.html', {
         'selected_partial': next_partial,
-        'columns': columns,
+        **_columns_context(file_meta, columns),
         'rows': preview_rows,
         'show_preview': True,
     })
@@ -116,545 +218,469 @@ def open_file(request):
 
 
 @login_required
-def run_analysis(request):
+def switch_upload(request):
+    # сделать текущей одну из недавних загрузок рабочего пространства
+    if request.method != 'POST':
+        return redirect('index')
+    file_meta = FileMeta.objects.filter(
+        id=request.POST.get('file_id') or 0, owner=request.user, released_at__isnull=True
+    ).first()
+    next_partial = request.POST.get('next_partial', '').strip()
+    if next_partial not in UPLOAD_PARTIALS:
+        next_partial = 'column_chart.html'
+    if file_meta is None:
+        return render(request, 'index.html', {
+            'selected_partial': next_partial,
+            'error': 'Файл не найден или уже удалён. Загрузите его заново.',
+            'columns': [],
+        })
+    touch_upload(file_meta)
+    request.session['uploaded_file_meta_id'] = file_meta.id
+    return render(request, 'index.html', {
+        'selected_partial': next_partial,
+        **_upload_context(request, file_meta),
+    })
+
+
+def _create_upload_job(user, file_meta, kind, params):
+    # загрузка остаётся в рабочем пространстве и в сессии — следующий анализ не требует новой загрузки
+    params = dict(params, rel_path=file_meta.storage_path)
+    cost = estimate_cost(file_meta, kind, params)
+    upload_stages = upload_timings(file_meta)
+    # проверка лимитов очереди и постановка — под одной блокировкой; сверх лимита — AdmissionRejected
+    with admission_lock():
+        check_admission(user, cost)
+        report = enqueue_analysis(user, file_meta, kind, params,
+                                  timings={'stages': upload_stages} if upload_stages else None,
+                                  inline=False, cost=cost)
+    # замеры загрузки достаются только первому принятому анализу
+    pop_upload_timings(file_meta)
+    touch_upload(file_meta)
+    return report
+
+
+async def _enqueue_upload_analysis(user, file_meta, kind, params):
+    report = await sync_to_async(_create_upload_job)(user, file_meta, kind, params)
+    if settings.ANALYSIS_JOBS_INLINE:
+        # режим без воркера: задача выполняется до ответа, но в пуле процессов, а не в цикле событий;
+        # слот ждём здесь — в пул уходит только задача, которая уже может выполняться
+        started = await await_slot(report, settings.ANALYSIS_SLOT_WAIT)
+        if started:
+            try:
+                await run_in_pool(run_job_by_id, report.id)
+            except BrokenProcessPool:
+                await sync_to_async(crash_job)(report)
+        elif started is False:
+            await sync_to_async(give_up_job)(report)
+    return report
+
+
+async def _busy_response(request, exc, partial, file_meta, columns):
+    # очередь переполнена: сразу 429, клиент может повторить через Retry-After секунд
+    response = await _arender(request, 'index.html', {
+        'selected_partial': partial,
+        'error': f'{exc} Повторите через {exc.retry_after} с.',
+        **_columns_context(file_meta, columns),
+    }, status=429)
+    response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+async def _acurrent_upload(request, user):
+    # (file_meta, колонки, файл на диске) текущей загрузки для асинхронных представлений
+    file_meta = await aget_filemeta_from_session(request, user)
+    columns = await sync_to_async(upload_columns)(file_meta)
+    exists = file_meta is not None and await sync_to_async(default_storage.exists)(file_meta.storage_path)
+    return file_meta, columns, exists
+
+
+def _chart_output(request):
+    # png — картинка с сервера, json — данные для графика в браузере
+    output = request.POST.get('output', 'png')
+    return output if output in ('png', 'json') else 'png'
+
+
+def _with_render_profile(request, params):
+    # профиль картинок (формат, DPI, бюджет), выбранный в форме; без выбора — по умолчанию из настроек
+    profile = request.POST.get('render_profile', '')
+    if profile in RENDER_PROFILES:
+        params['render_profile'] = profile
+    return params
+
+
+@async_login_required
+async def run_analysis(request):
     if request.method != 'POST':
         return redirect('column_chart')
+    await _aparse_body(request)
 
     analysis_type = request.POST.get('analysis_type', 'column_chart')
-    rel_path = request.session.get('uploaded_file_path')
+    user = request.user
+    file_meta, columns, exists = await _acurrent_upload(request, user)
 
-    if not rel_path or not default_storage.exists(rel_path):
-        return render(request, 'index.html', {
+    if not exists:
+        return await _arender(request, 'index.html', {
             'selected_partial': 'column_chart.html',
             'error': 'CSV не загружен. Пожалуйста, загрузите файл.',
-            'columns': request.session.get('uploaded_columns', []),
+            **_columns_context(file_meta, columns),
         })
 
-    if not _is_path_in_user_tmp(rel_path, request.user):
+    if not _is_path_in_user_tmp(file_meta.storage_path, user):
         return HttpResponseForbidden("Недопустимый путь к файлу.")
 
-    full_path = default_storage.path(rel_path)
-
-    try:
-        df = pd.read_csv(full_path)
-    except Exception as e:
-        return render(request, 'index.html', {
-            'selected_partial': 'column_chart.html',
-            'error': 'Ошибка чтения CSV: ' + str(e),
-            'columns': request.session.get('uploaded_columns', []),
-        })
-
     if analysis_type in ('column_chart', 'plot'):
         selected = request.POST.getlist('columns')
         plot_type = request.POST.get('plot_type', 'hist')
+        output = _chart_output(request)
 
         if not selected:
-            return render(request, 'index.html', {
+            return await _arender(request, 'index.html', {
                 'selected_partial': 'column_chart.html',
                 'error': 'Выберите хотя бы одну колонку.',
-                'columns': list(df.columns),
+                **_columns_context(file_meta, columns),
             })
 
         for c in selected:
-            if c not in df.columns:
-                return render(request, 'index.html', {
+            if c not in columns:
+                return await _arender(request, 'index.html', {
                     'selected_partial': 'column_chart.html',
                     'error': f'Колонка {c} не найдена в файле.',
-                    'columns': list(df.columns),
+                    **_columns_context(file_meta, columns),
                 })
 
-        #файл мета
-        file_meta = get_filemeta_from_session(request)
-        report = create_report(request.user, file_meta)
-        add_report_log(report, request.user, "report created")
-
-        
-        def do_column_chart(df_local, selected_cols, plot_t):
-            n = len(selected_cols)
-            fig, axes = plt.subplots(nrows=n, ncols=1, figsize=(6, 3*n))
-            if n == 1:
-                axes = [axes]
-            for ax, col in zip(axes, selected_cols):
-                series = pd.to_numeric(df_local[col], errors='coerce').dropna()
-                if series.empty:
-                    ax.text(0.5, 0.5, 'Нет числовых данных', ha='center')
-                    continue
-                if plot_t == 'hist':
-                    ax.hist(series, bins=30, color='#2b8cbe', edgecolor='black')
-                    ax.set_title(col)
-                elif plot_t == 'line':
-                    ax.plot(series.index, series.values, color='#2b8cbe')
-                    ax.set_title(col)
-                elif plot_t == 'box':
-                    ax.boxplot(series.dropna())
-                    ax.set_title(col)
-                else:
-                    ax.hist(series, bins=30)
-                    ax.set_title(col)
-            plt.tight_layout()
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
-            return f"Chart for {len(selected_cols)} columns", buf.read(), 'chart.png'
-
+        # анализ ставится в очередь, страница отчёта сама опрашивает статус
         try:
-            
-            summary, result_bytes, filename = safe_run_analysis(report, request.user, do_column_chart, df, selected, plot_type)
-
-            #  байты результата отобразим их в шаблоне
-            img_b64 = None
-            if result_bytes:
-                img_b64 = base64.b64encode(result_bytes).decode('ascii')
-
-            return render(request, 'index.html', {
-                'selected_partial': 'column_chart.html',
-                'plot': img_b64,
-                'columns': list(df.columns),
-                'report_summary': summary,
-            })
-        except Exception as e:
-            
-            return render(request, 'index.html', {
-                'selected_partial': 'column_chart.html',
-                'error': 'Ошибка построения графика: ' + str(e),
-                'columns': list(df.columns),
-            })
-        finally:
-            
-            cleanup_uploaded_file_and_session(request)
+            params = _with_render_profile(request, {'columns': selected, 'plot_type': plot_type, 'output': output})
+            report = await _enqueue_upload_analysis(user, file_meta, 'column_chart', params)
+        except AdmissionRejected as exc:
+            return await _busy_response(request, exc, 'column_chart.html', file_meta, columns)
+        return redirect('analysis_report', report_id=report.id)
 
-    return render(request, 'index.html', {
+    return await _arender(request, 'index.html', {
         'selected_partial': 'column_chart.html',
         'error': 'Неизвестный тип анализа',
-        'columns': request.session.get('uploaded_columns', []),
+        **_columns_context(file_meta, columns),
     })
 
 
-
-
-def delete_uploaded_file_from_disk(request):
-    
-    rel_path = request.session.get('uploaded_file_path')
-    if not rel_path:
-        return False
-    if not _is_path_in_user_tmp(rel_path, request.user):
-        return False
-    try:
-        if default_storage.exists(rel_path):
-            default_storage.delete(rel_path)
-    except Exception:
-        
-        return False
-    # удалили файл с диска, но оставляем метаданные в сессии
-    request.session.pop('uploaded_file_path', None)
-    return True
-
-
 @login_required
 def clear_upload(request):
     if request.method != 'POST':
         
         return redirect('index')
 
-    # удаляем файл и очищаем все сессионные метаданные
-    rel_path = request.session.get('uploaded_file_path')
-    if rel_path and _is_path_in_user_tmp(rel_path, request.user) and default_storage.exists(rel_path):
-        try:
-            default_storage.delete(rel_path)
-        except Exception:
-            pass
+    # освобождаем загрузку и очищаем все сессионные метаданные
+    file_meta = get_filemeta_from_session(request)
+    if file_meta and _is_path_in_user_tmp(file_meta.storage_path, request.user):
+        release_upload(file_meta)
 
     # полная очистка сесси- заново
-    request.session.pop('uploaded_file_path', None)
-    request.session.pop('uploaded_columns', None)
-    request.session.pop('uploaded_preview_rows', None)
-    request.session.pop('uploaded_file_name', None)
-    request.session.pop('describe_selected_cols', None)
+    if file_meta:
+        delete_upload_state(file_meta.id)
+    detach_upload_from_session(request)
 
     return redirect('index')
 
 
-@login_required
-def describe(request):
-    
-    if request.method == 'GET':
-        return render(request, 'index.html', {
-            'selected_partial': 'descriptive_statistics.html',
-            'columns': request.session.get('uploaded_columns', []),
-            'rows': request.session.get('uploaded_preview_rows', []),
-            'show_preview': bool(request.session.get('uploaded_preview_rows')),
-            'selected_cols': request.session.get('describe_selected_cols', []),
-        })
+def _describe_form(request):
+    file_meta = get_filemeta_from_session(request)
+    return render(request, 'index.html', {
+        'selected_partial': 'descriptive_statistics.html',
+        **_upload_context(request, file_meta),
+        'selected_cols': get_selected_columns(file_meta, 'describe'),
+    })
 
+
+@async_login_required
+async def describe(request):
     
-    if bool(request.POST.get('download_csv')) and request.session.get('last_describe_csv'):
-        csv_text = request.session.pop('last_describe_csv')
-        csv_bytes = ('\ufeff' + csv_text).encode('utf-8')
-        resp = HttpResponse(csv_bytes, content_type='text/csv; charset=utf-8')
-        resp['Content-Disposition'] = 'attachment; filename="describe.csv"'
-        return resp
+    if request.method == 'GET':
+        return await sync_to_async(_describe_form)(request)
+    await _aparse_body(request)
 
     
-    rel_path = request.session.get('uploaded_file_path')
-    if not rel_path or not default_storage.exists(rel_path):
-        return render(request, 'index.html', {
+    user = request.user
+    file_meta, columns, exists = await _acurrent_upload(request, user)
+    if not exists:
+        return await _arender(request, 'index.html', {
             'selected_partial': 'descriptive_statistics.html',
             'error': 'CSV не загружен. Пожалуйста, загрузите файл.',
-            'columns': request.session.get('uploaded_columns', []),
+            'columns': columns,
         })
 
-    if not _is_path_in_user_tmp(rel_path, request.user):
+    if not _is_path_in_user_tmp(file_meta.storage_path, user):
         return HttpResponseForbidden("Недопустимый путь к файлу.")
 
-    full_path = default_storage.path(rel_path)
-    try:
-        df = pd.read_csv(full_path)
-    except Exception as e:
-        return render(request, 'index.html', {
-            'selected_partial': 'descriptive_statistics.html',
-            'error': 'Ошибка чтения CSV: ' + str(e),
-            'columns': request.session.get('uploaded_columns', []),
-        })
-
    
-    selected = request.POST.getlist('columns') or list(df.columns)
+    selected = request.POST.getlist('columns') or list(columns)
     include_plots = bool(request.POST.get('include_plots'))
-    download_csv = bool(request.POST.get('download_csv'))
 
     
-    request.session['describe_selected_cols'] = selected
+    await sync_to_async(set_selected_columns)(file_meta, 'describe', selected)
 
     # Валидация 
     for c in selected:
-        if c not in df.columns:
-            return render(request, 'index.html', {
+        if c not in columns:
+            return await _arender(request, 'index.html', {
                 'selected_partial': 'descriptive_statistics.html',
                 'error': f'Колонка {c} не найдена в файле.',
-                'columns': list(df.columns),
+                'columns': columns,
             })
 
-    # ReportMeta и лог о создании
-    file_meta = get_filemeta_from_session(request)
-    report = create_report(request.user, file_meta)
-    add_report_log(report, request.user, "report created for describe")
-
-    #  внешние переменные для результата HTML и графиков
-    result_html = None
-    plots = {}
-
-    
-    def do_describe(df_local, selected_cols, include_plots_flag):
-        nonlocal result_html, plots
-        metrics = []
-        plots = {}
-
-        for col in selected_cols:
-            series = df_local[col]
-            n = len(series)
-            missing = int(series.isna().sum())
-            unique = int(series.nunique(dropna=True))
-            dtype = str(series.dtype)
-            row = {
-                'column': col,
-                'dtype': dtype,
-                'n': n,
-                'missing': missing,
-                'missing_pct': round(missing / n, 4) if n else None,
-                'unique': unique,
-            }
-
-            s_num = pd.to_numeric(series, errors='coerce')
-            if s_num.dropna().size > 0:
-                s = s_num.dropna()
-                mean = s.mean() if not s.empty else None
-                std = s.std() if not s.empty else None
-                row.update({
-                    'mean': float(mean) if mean is not None else None,
-                    'median': float(s.median()) if not s.empty else None,
-                    'std': float(std) if not s.empty else None,
-                    'var': float(s.var()) if not s.empty else None,
-                    'min': float(s.min()) if not s.empty else None,
-                    '25%': float(s.quantile(0.25)) if not s.empty else None,
-                    '50%': float(s.quantile(0.5)) if not s.empty else None,
-                    '75%': float(s.quantile(0.75)) if not s.empty else None,
-                    'max': float(s.max()) if not s.empty else None,
-                    'iqr': float(s.quantile(0.75) - s.quantile(0.25)) if not s.empty else None,
-                    'skew': float(s.skew()) if not s.empty else None,
-                    'kurtosis': float(s.kurtosis()) if not s.empty else None,
-                    'zeros': int((s == 0).sum()),
-                    'negatives': int((s < 0).sum()),
-                })
-                if include_plots_flag:
-                    try:
-                        fig, ax = plt.subplots(figsize=(6,3))
-                        ax.hist(s, bins=30, color='#2b8cbe', edgecolor='black')
-                        ax.set_title(f'{col} — histogram')
-                        plt.tight_layout()
-                        buf = io.BytesIO()
-                        plt.savefig(buf, format='png', bbox_inches='tight')
-                        plt.close(fig)
-                        buf.seek(0)
-                        plots[col] = base64.b64encode(buf.read()).decode('ascii')
-                    except Exception:
-                        # не ломаем из‑за одного графика
-                        pass
-
-            metrics.append(row)
-
-        
-        df_metrics = pd.DataFrame(metrics).set_index('column')
-
-       
-        rename_map = {
-            'dtype': 'Тип', 'n': 'N', 'missing': 'Пропуски', 'missing_pct': 'Доля пропусков',
-            'unique': 'Уникальных', 'mean': 'Среднее', 'median': 'Медиана', 'std': 'Стд',
-            'var': 'Дисперсия', 'min': 'Мин', '25%': '25%', '50%': '50%', '75%': '75%',
-            'max': 'Макс', 'iqr': 'IQR', 'skew': 'Асимметрия', 'kurtosis': 'Куртозис',
-            'zeros': 'Нулей', 'negatives': 'Отрицательных'
-        }
-        df_metrics = df_metrics.rename(columns=rename_map)
-
-       
-        def safe_div(a, b):
-            try:
-                if a is None or b is None:
-                    return None
-                if b == 0:
-                    return None
-                return a / b
-            except Exception:
-                return None
-
-        if 'Среднее' in df_metrics.columns and 'Стд' in df_metrics.columns:
-            def compute_cv_row(r):
-                std = r.get('Стд')
-                mean = r.get('Среднее')
-                if pd.isna(std) or pd.isna(mean) or mean == 0:
-                    return None
-                val = safe_div(std, mean)
-                return round(val, 3) if val is not None else None
-            df_metrics['CV'] = df_metrics.apply(compute_cv_row, axis=1)
-        else:
-            if 'mean' in df_metrics.columns and 'std' in df_metrics.columns:
-                def compute_cv_row_alt(r):
-                    std = r.get('std')
-                    mean = r.get('mean')
-                    if pd.isna(std) or pd.isna(mean) or mean == 0:
-                        return None
-                    val = safe_div(std, mean)
-                    return round(val, 3) if val is not None else None
-                df_metrics['CV'] = df_metrics.apply(compute_cv_row_alt, axis=1)
-
-        # Интерпретация
-        def interpret(row):
-            notes = []
-            mp = row.get('Доля пропусков') or row.get('missing_pct')
-            if mp is not None and mp > 0.2:
-                notes.append('Много пропусков')
-            cv = row.get('CV')
-            if cv is not None:
-                if abs(cv) > 1:
-                    notes.append('Высокая дисперсия (CV>1)')
-                elif abs(cv) > 0.5:
-                    notes.append('Умеренная дисперсия (CV>0.5)')
-            skew = row.get('Асимметрия') or row.get('skew')
-            if skew is not None and abs(skew) > 1:
-                notes.append('Сильная асимметрия')
-            uniq = row.get('Уникальных') or row.get('unique')
-            if uniq is not None and isinstance(uniq, (int, float)) and uniq > 0 and row.get('N') and uniq / row.get('N') > 0.5:
-                notes.append('Много уникальных значений')
-            return '; '.join(notes)
-
-        df_metrics['Интерпретация'] = df_metrics.apply(interpret, axis=1)
-
-    
-        for c in df_metrics.columns:
-            if pd.api.types.is_float_dtype(df_metrics[c]) or pd.api.types.is_integer_dtype(df_metrics[c]):
-                df_metrics[c] = df_metrics[c].apply(lambda v: round(v, 3) if pd.notna(v) else v)
-
-        # Транспонируем таблицу
-        df_out = df_metrics.T
-        df_out.index.name = None
-
-        # HTML результат
-        table_html = df_out.to_html(classes='table table-sm table-bordered', na_rep='', escape=False)
-        result_html = f'<div class="table-responsive" style="max-height:420px; overflow:auto;">{table_html}</div>'
-
-        # CSV для скачивания
-        csv_text = df_out.to_csv()
-        csv_bytes = ('\ufeff' + csv_text).encode('utf-8')
-
-        summary_text = f"Describe: {len(selected_cols)} columns"
-        return summary_text, csv_bytes, 'describe.csv'
-
-    
     try:
-        summary, result_bytes, filename = safe_run_analysis(report, request.user, do_describe, df, selected, include_plots)
-
-        
-        if download_csv and result_bytes:
-            resp = HttpResponse(result_bytes, content_type='text/csv; charset=utf-8')
-            resp['Content-Disposition'] = 'attachment; filename="describe.csv"'
-            return resp
-
-        
-        if result_bytes:
-            try:
-                csv_text = result_bytes.decode('utf-8')
-                request.session['last_describe_csv'] = csv_text
-            except Exception:
-                request.session.pop('last_describe_csv', None)
-
-        # Рендерим страницу с HTML таблицей и графиками
-        return render(request, 'index.html', {
-            'selected_partial': 'descriptive_statistics.html',
-            'result': result_html,
-            'plots': plots,
-            'columns': list(df.columns),
-            'rows': request.session.get('uploaded_preview_rows', []),
-            'show_preview': bool(request.session.get('uploaded_preview_rows')),
-            'selected_cols': selected,
-            'report_summary': summary,
-        })
-
-    except Exception as e:
-        # safe_run_analysis уже записал report.error и лог
-        return render(request, 'index.html', {
-            'selected_partial': 'descriptive_statistics.html',
-            'error': 'Ошибка анализа: ' + str(e),
-            'columns': list(df.columns),
-        })
-
-    finally:
-        cleanup_uploaded_file_and_session(request)
+        params = _with_render_profile(request, {'columns': selected, 'include_plots': include_plots})
+        report = await _enqueue_upload_analysis(user, file_meta, 'describe', params)
+    except AdmissionRejected as exc:
+        return await _busy_response(request, exc, 'descriptive_statistics.html', file_meta, columns)
+    return redirect('analysis_report', report_id=report.id)
 
 
 
 @login_required
 def descriptive_statistics(request):
    
-    columns = request.session.get('uploaded_columns', [])
-    preview_rows = request.session.get('uploaded_preview_rows', [])
+    file_meta = get_filemeta_from_session(request)
     return render(request, 'index.html', {
         'selected_partial': 'descriptive_statistics.html',
-        'columns': columns,
-        'rows': preview_rows,
-        'show_preview': bool(preview_rows),
-        'uploaded_file_name': request.session.get('uploaded_file_name'),
-        'selected_cols': request.session.get('describe_selected_cols', []),
+        **_upload_context(request, file_meta),
+        'uploaded_file_name': file_meta.original_name if file_meta else None,
+        'selected_cols': get_selected_columns(file_meta, 'describe'),
     })
 
 
 @login_required
 def correlation(request):
     
-    columns = request.session.get('uploaded_columns', [])
-    preview_rows = request.session.get('uploaded_preview_rows', [])
+    file_meta = get_filemeta_from_session(request)
     return render(request, 'index.html', {
         'selected_partial': 'correlation.html',
-        'columns': columns,
-        'rows': preview_rows,
-        'show_preview': bool(preview_rows),
-        'uploaded_file_name': request.session.get('uploaded_file_name'),
-        'selected_cols': request.session.get('correlation_selected_cols', []),
+        **_upload_context(request, file_meta),
+        'uploaded_file_name': file_meta.original_name if file_meta else None,
+        'selected_cols': get_selected_columns(file_meta, 'correlation'),
     })
 
-@login_required
-def run_correlation(request):
+def _correlation_form(request):
+    file_meta = get_filemeta_from_session(request)
+    return render(request, 'index.html', {
+        'selected_partial': 'correlation.html',
+        **_upload_context(request, file_meta),
+        'selected_cols': get_selected_columns(file_meta, 'correlation'),
+        'button_label': 'Анализировать',
+    })
+
+
+@async_login_required
+async def run_correlation(request):
     if request.method == 'GET':
-        return render(request, 'index.html', {
-            'selected_partial': 'correlation.html',
-            'columns': request.session.get('uploaded_columns', []),
-            'rows': request.session.get('uploaded_preview_rows', []),
-            'show_preview': bool(request.session.get('uploaded_preview_rows')),
-            'selected_cols': request.session.get('correlation_selected_cols', []),
-            'button_label': 'Анализировать',
-        })
+        return await sync_to_async(_correlation_form)(request)
+    await _aparse_body(request)
 
     # наличие файла
-    rel_path = request.session.get('uploaded_file_path')
-    if not rel_path or not default_storage.exists(rel_path):
-        return render(request, 'index.html', {
+    user = request.user
+    file_meta, columns, exists = await _acurrent_upload(request, user)
+    if not exists:
+        return await _arender(request, 'index.html', {
             'selected_partial': 'correlation.html',
             'error': 'CSV не загружен.',
-            'columns': request.session.get('uploaded_columns', []),
+            **_columns_context(file_meta, columns),
         })
 
-    if not _is_path_in_user_tmp(rel_path, request.user):
+    if not _is_path_in_user_tmp(file_meta.storage_path, user):
         return HttpResponseForbidden("Недопустимый путь к файлу.")
 
-    try:
-        df = pd.read_csv(default_storage.path(rel_path))
-    except Exception as e:
-        return render(request, 'index.html', {
+    selected = request.POST.getlist('columns') or []
+    await sync_to_async(set_selected_columns)(file_meta, 'correlation', selected)
+    mode = request.POST.get('mode', 'pair')
+    method = request.POST.get('method', 'pearson')
+
+    if mode == 'matrix':
+        # матрица корреляций: любое число колонок от двух
+        if len(selected) < 2 or method not in CORRELATION_METHODS:
+            return await _arender(request, 'index.html', {
+                'selected_partial': 'correlation.html',
+                'error': 'Выберите хотя бы две колонки.' if len(selected) < 2 else 'Неизвестный метод корреляции.',
+                **_columns_context(file_meta, columns),
+            })
+    elif len(selected) != 2:
+        return await _arender(request, 'index.html', {
             'selected_partial': 'correlation.html',
-            'error': 'Ошибка чтения CSV: ' + str(e),
-            'columns': request.session.get('uploaded_columns', []),
+            'error': 'Выберите ровно две колонки.',
+            **_columns_context(file_meta, columns),
         })
 
-    selected = request.POST.getlist('columns') or []
-    request.session['correlation_selected_cols'] = selected
+    for c in selected:
+        if c not in columns:
+            return await _arender(request, 'index.html', {
+                'selected_partial': 'correlation.html',
+                'error': f'Колонка {c} не найдена в файле.',
+                **_columns_context(file_meta, columns),
+            })
 
-    if len(selected) != 2:
-        return render(request, 'index.html', {
-            'selected_partial': 'correlation.html',
-            'error': 'Выберите ровно две колонки.',
-            'columns': list(df.columns),
+    if mode == 'matrix':
+        kind, params = 'correlation_matrix', {'columns': selected, 'method': method}
+    else:
+        kind, params = 'correlation', {'columns': selected, 'output': _chart_output(request)}
+    try:
+        report = await _enqueue_upload_analysis(user, file_meta, kind, _with_render_profile(request, params))
+    except AdmissionRejected as exc:
+        return await _busy_response(request, exc, 'correlation.html', file_meta, columns)
+    return redirect('analysis_report', report_id=report.id)
+
+
+REPORT_PARTIALS = {
+    'column_chart': 'column_chart.html',
+    'describe': 'descriptive_statistics.html',
+    'correlation': 'correlation.html',
+    'correlation_matrix': 'correlation.html',
+}
+
+
+def _report_context(report):
+    params = report.params or {}
+    result = report.result or {}
+    context = {
+        'selected_partial': REPORT_PARTIALS.get(report.kind, 'column_chart.html'),
+        'report': report,
+        'columns': [],
+        'selected_cols': params.get('columns', []),
+    }
+    if report.kind in ('correlation', 'correlation_matrix'):
+        context['button_label'] = 'Анализировать'
+
+    if report.status == ReportMeta.STATUS_FAILED:
+        prefix = 'Ошибка построения графика: ' if report.kind == 'column_chart' else 'Ошибка анализа: '
+        context['error'] = prefix + result.get('error', '')
+    elif report.status == ReportMeta.STATUS_DONE:
+        # формат один на все графики отчёта — для имени скачиваемого файла
+        charts = report_artifacts(result)
+        context['chart_ext'] = artifact_format(min(charts)) if charts else 'png'
+        context.update({
+            'plot': result.get('plot'),
+            'plot_img': result.get('plot_img'),
+            'heatmap': result.get('heatmap'),
+            'result': result.get('html'),
+            'plots': result.get('plots', {}),
+            'chart_data': 'chart_data' in result,
+            'report_summary': report.summary,
         })
+    return context
 
+
+@login_required
+def analysis_report(request, report_id):
+    report = get_object_or_404(ReportMeta, id=report_id, owner=request.user)
+    start = time.perf_counter()
+    context = _report_context(report)
     file_meta = get_filemeta_from_session(request)
-    report = create_report(request.user, file_meta)
-    add_report_log(report, request.user, "report created for correlation")
-
-    plot_img = None
-
-    def do_correlation(df_local, selected_cols):
-        nonlocal plot_img
-        xcol, ycol = selected_cols
-        x = pd.to_numeric(df_local[xcol], errors='coerce')
-        y = pd.to_numeric(df_local[ycol], errors='coerce')
-        df_clean = pd.DataFrame({xcol: x, ycol: y}).dropna()
-        if df_clean.shape[0] < 2:
-            raise ValueError("Недостаточно данных для корреляции.")
-
-        corr = df_clean[xcol].corr(df_clean[ycol], method='pearson')
-
-        fig, ax = plt.subplots(figsize=(6,4))
-        ax.scatter(df_clean[xcol], df_clean[ycol], alpha=0.7, color='#2b8cbe')
-        ax.set_xlabel(xcol)
-        ax.set_ylabel(ycol)
-        ax.set_title(f'Диаграмма рассеяния ({xcol} vs {ycol}), r={corr:.3f}')
-        plt.tight_layout()
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png')
-        plt.close(fig)
-        buf.seek(0)
-        plot_img = base64.b64encode(buf.read()).decode('ascii')
-
-        summary_text = f"Correlation (Pearson) between {xcol} and {ycol}: r={corr:.3f}, n={df_clean.shape[0]}"
-        return summary_text, None, None  # нет CSV
+    if file_meta is not None and file_meta.id == report.file_id:
+        # загрузка отчёта всё ещё текущая — форма под ним сразу готова к следующему анализу
+        context['columns'] = upload_columns(file_meta)
+        context['numeric_columns'] = columns_of_type(file_meta.profile, context['columns'])
+    response = render(request, 'index.html', context)
+    if report.is_finished:
+        record_stage(report, 'template', time.perf_counter() - start)
+    return response
 
-    try:
-        summary, _, _ = safe_run_analysis(report, request.user, do_correlation, df, selected)
 
-        return render(request, 'index.html', {
-            'selected_partial': 'correlation.html',
-            'plot_img': plot_img,
-            'columns': list(df.columns),
-            'rows': request.session.get('uploaded_preview_rows', []),
-            'show_preview': bool(request.session.get('uploaded_preview_rows')),
-            'selected_cols': selected,
-            'report_summary': summary,
-            'button_label': 'Анализировать',
-        })
+@login_required
+def analysis_report_status(request, report_id):
+    # опрос статуса задачи; когда она завершена — вместе с результатом
+    report = get_object_or_404(ReportMeta, id=report_id, owner=request.user)
+    data = {
+        'id': report.id,
+        'status': report.status,
+        'summary': report.summary,
+        'url': reverse('analysis_report', args=[report.id]),
+    }
+    if report.is_finished:
+        data['result'] = report.result
+    return JsonResponse(data)
 
-    except Exception as exc:
-        return render(request, 'index.html', {
-            'selected_partial': 'correlation.html',
-            'error': 'Ошибка анализа: ' + str(exc),
-            'columns': list(df.columns),
-        })
 
-    finally:
-        cleanup_uploaded_file_and_session(request)
+@login_required
+def analysis_report_chart_data(request, report_id):
+    # агрегированные данные графика для отрисовки в браузере
+    report = get_object_or_404(ReportMeta, id=report_id, owner=request.user)
+    chart_data = (report.result or {}).get('chart_data')
+    if chart_data is None:
+        raise Http404("Нет данных графика.")
+    return JsonResponse(chart_data)
+
+
+@login_required
+def analysis_report_download(request, report_id):
+    report = get_object_or_404(ReportMeta, id=report_id, owner=request.user)
+    csv_text = (report.result or {}).get('csv')
+    if not csv_text:
+        raise Http404("Нет данных для скачивания.")
+    csv_bytes = ('\ufeff' + csv_text).encode('utf-8')
+    resp = HttpResponse(csv_bytes, content_type='text/csv; charset=utf-8')
+    filename = (report.result or {}).get('csv_name', 'describe.csv')
+    resp['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return resp
+
+
+def _parse_range(header, size):
+    # поддерживается один диапазон bytes=start-end / start- / -suffix; иначе None (отдаём весь файл)
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start, sep, end = header[len('bytes='):].strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if start:
+            first = int(start)
+            last = int(end) if end else size - 1
+        else:
+            first, last = max(size - int(end), 0), size - 1
+    except ValueError:
+        return None
+    if start and end and first > last:
+        return None
+    return first, min(last, size - 1)
+
+
+@login_required
+def analysis_report_chart(request, report_id, name):
+    # график отчёта по URL: имя — sha256 содержимого, поэтому ETag сильный, а кэш браузера бессрочный
+    report = get_object_or_404(ReportMeta, id=report_id, owner=request.user)
+    if name not in report_artifacts(report.result):
+        raise Http404("График не найден.")
+    path = find_artifact(name)
+    if path is None:
+        raise Http404("График не найден.")
+    content_type = CONTENT_TYPES[artifact_format(name)]
+
+    etag = f'"{name}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        patch_cache_control(not_modified, private=True, max_age=31536000, immutable=True)
+        return not_modified
+
+    size = os.path.getsize(path)
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range == etag:
+        byte_range = _parse_range(request.headers.get('Range'), size)
+
+    if byte_range is not None:
+        first, last = byte_range
+        if first >= size:
+            resp = HttpResponse(status=416)
+            resp['Content-Range'] = f'bytes */{size}'
+            return resp
+        with open(path, 'rb') as fh:
+            fh.seek(first)
+            data = fh.read(last - first + 1)
+        resp = HttpResponse(data, status=206, content_type=content_type)
+        resp['Content-Range'] = f'bytes {first}-{last}/{size}'
+    else:
+        resp = FileResponse(open(path, 'rb'), content_type=content_type)
+    if content_type == CONTENT_TYPES['svg']:
+        # SVG открывается и как документ: скрипты и внешние ресурсы запрещены, стили matplotlib встроенные
+        resp['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'"
+    resp['Accept-Ranges'] = 'bytes'
+    resp['ETag'] = etag
+    patch_cache_control(resp, private=True, max_age=31536000, immutable=True)
+    return resp
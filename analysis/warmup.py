@@ -0,0 +1,36 @@
+import gc
+import time
+
+from django.conf import settings
+
+# Прогрев процесса: pandas/numpy/matplotlib и модули анализов, кэш шрифтов, первый рендер.
+# Представления и urls численный стек не импортируют — он грузится на первом анализе. Здесь тот же
+# импорт делается заранее: в главном процессе до fork (gunicorn --preload через wsgi.py/asgi.py,
+# воркеры analysis_worker), и копии процесса получают всё готовым; в процессах пулов — при старте.
+# Включается ANALYSIS_PRELOAD; пулы процессов и соединения с БД до fork не создаются.
+
+
+def warm_up(freeze: bool = False) -> dict:
+    # длительность шагов, сек; freeze — перед fork: прогретые объекты уходят из-под сборщика мусора,
+    # и он не трогает их страницы памяти, общие с дочерними процессами
+    stages = {}
+    start = time.perf_counter()
+    import analysis.analyses  # noqa: F401 — pandas, numpy, matplotlib и модули анализов
+    stages['imports'] = time.perf_counter() - start
+
+    from .charts import _render_task, _warm_worker
+    start = time.perf_counter()
+    # список шрифтов matplotlib: при пустом кэше (MPLCONFIGDIR) он строится заново — секунды
+    _warm_worker()
+    stages['fonts'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # маленький график прямо в процессе, не через пул: подписи, глифы, кодирование картинки
+    _render_task(('histogram', {'title': 'warm-up', 'values': [0.0, 1.0, 2.0], 'bins': 3},
+                  settings.ANALYSIS_RENDER_PROFILE))
+    stages['render'] = time.perf_counter() - start
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return stages
@@ -0,0 +1,66 @@
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import FileMeta, ReportMeta
+from .utils import release_upload
+
+# Рабочее пространство пользователя: загрузка не удаляется после анализа, а живёт
+# ANALYSIS_WORKSPACE_TTL_HOURS после последнего использования; между недавними загрузками
+# можно переключаться. Истёкшие освобождает expire_uploads (manage.py analysis_sweep),
+# а не запросы; при новой загрузке сверх квоты освобождаются самые давно не использованные.
+
+BUSY_STATUSES = (ReportMeta.STATUS_QUEUED, ReportMeta.STATUS_RUNNING)
+
+
+def active_uploads(owner):
+    return FileMeta.objects.filter(owner=owner, released_at__isnull=True)
+
+
+def recent_uploads(owner) -> list:
+    return list(active_uploads(owner).order_by('-last_used_at', '-id')[:settings.ANALYSIS_WORKSPACE_MAX_UPLOADS])
+
+
+def touch_upload(file_meta: FileMeta) -> None:
+    file_meta.last_used_at = timezone.now()
+    FileMeta.objects.filter(id=file_meta.id).update(last_used_at=file_meta.last_used_at)
+
+
+def _busy_file_ids():
+    # по этим загрузкам есть задачи в очереди или в работе — их файлы трогать нельзя
+    return ReportMeta.objects.filter(status__in=BUSY_STATUSES, file__isnull=False).values('file_id')
+
+
+def enforce_quota(owner, keep: Optional[FileMeta] = None) -> int:
+    # объём считается по размеру CSV, общий файл одинаковых загрузок — один раз
+    max_bytes = settings.ANALYSIS_WORKSPACE_QUOTA_MB * 1024 * 1024
+    busy = set(_busy_file_ids().filter(owner=owner).values_list('file_id', flat=True))
+    kept, used, paths = 0, 0, set()
+    released = 0
+    for file_meta in active_uploads(owner).order_by('-last_used_at', '-id'):
+        size = 0 if file_meta.storage_path in paths else (file_meta.size_bytes or 0)
+        fits = kept < settings.ANALYSIS_WORKSPACE_MAX_UPLOADS and used + size <= max_bytes
+        if fits or file_meta.id in busy or (keep is not None and file_meta.id == keep.id):
+            kept += 1
+            used += size
+            paths.add(file_meta.storage_path)
+            continue
+        release_upload(file_meta)
+        released += 1
+    return released
+
+
+def expire_uploads(now=None) -> Tuple[int, int]:
+    # (освобождено загрузок, удалено наборов файлов)
+    deadline = (now or timezone.now()) - timedelta(hours=settings.ANALYSIS_WORKSPACE_TTL_HOURS)
+    stale = (
+        FileMeta.objects.filter(released_at__isnull=True, last_used_at__lt=deadline)
+        .exclude(id__in=_busy_file_ids())
+    )
+    released = deleted = 0
+    for file_meta in stale.iterator():
+        released += 1
+        deleted += release_upload(file_meta)
+    return released, deleted
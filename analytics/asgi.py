@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'analytics.settings')
 
 application = get_asgi_application()
+
+# с gunicorn --preload модуль грузится в главном процессе: прогретые импорты и шрифты
+# достаются воркерам после fork
+from django.conf import settings  # noqa: E402
+
+if settings.ANALYSIS_PRELOAD:
+    from analysis.warmup import warm_up
+    warm_up(freeze=True)
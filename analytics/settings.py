@@ -74,6 +74,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'social_django.context_processors.backends',
                 'social_django.context_processors.login_redirect',
+                'analysis.context_processors.workspace',
             ],
         },
     },
@@ -171,6 +172,91 @@ SOCIAL_AUTH_PIPELINE = (
 
 
 
+# Квоты на загрузку CSV для анализа (0 — без ограничения по строкам)
+ANALYSIS_MAX_UPLOAD_MB = config('ANALYSIS_MAX_UPLOAD_MB', default=512, cast=int)
+ANALYSIS_MAX_ROWS = config('ANALYSIS_MAX_ROWS', default=5_000_000, cast=int)
+# Размер чанка при потоковом разборе загрузки, строк
+ANALYSIS_INGEST_CHUNK_ROWS = config('ANALYSIS_INGEST_CHUNK_ROWS', default=100_000, cast=int)
+# Описательная статистика: с какого числа строк считать потоково, размер скетчей и число процессов (0 — в текущем)
+ANALYSIS_DESCRIBE_STREAMING_ROWS = config('ANALYSIS_DESCRIBE_STREAMING_ROWS', default=1_000_000, cast=int)
+ANALYSIS_SKETCH_SIZE = config('ANALYSIS_SKETCH_SIZE', default=1024, cast=int)
+ANALYSIS_STREAMING_WORKERS = config('ANALYSIS_STREAMING_WORKERS', default=0, cast=int)
+# Очередь анализов: число воркеров manage.py analysis_worker; выполняющаяся задача раз в ANALYSIS_JOB_HEARTBEAT
+# секунд отмечается в БД, без отметки дольше ANALYSIS_JOB_TIMEOUT секунд её процесс считается умершим —
+# слоты освобождаются, задача возвращается в очередь или, без воркера, завершается ошибкой;
+# режим без воркера — задача выполняется прямо в запросе (для разработки)
+ANALYSIS_WORKERS = config('ANALYSIS_WORKERS', default=2, cast=int)
+ANALYSIS_JOB_HEARTBEAT = config('ANALYSIS_JOB_HEARTBEAT', default=30, cast=int)
+ANALYSIS_JOB_TIMEOUT = config('ANALYSIS_JOB_TIMEOUT', default=600, cast=int)
+ANALYSIS_JOBS_INLINE = config('ANALYSIS_JOBS_INLINE', default=False, cast=bool)
+# Контроль допуска (analysis/admission.py): стоимость задачи — 1 + МБ читаемых данных / ANALYSIS_COST_MB;
+# одновременно у пользователя — не больше ANALYSIS_USER_MAX_RUNNING задач, всего — на ANALYSIS_MAX_RUNNING_COST единиц;
+# в очереди у пользователя — до ANALYSIS_USER_MAX_PENDING задач, всего — до ANALYSIS_MAX_QUEUED_COST единиц (иначе 429);
+# в режиме без воркера задача ждёт слота не дольше ANALYSIS_SLOT_WAIT секунд
+ANALYSIS_COST_MB = config('ANALYSIS_COST_MB', default=50, cast=int)
+ANALYSIS_USER_MAX_RUNNING = config('ANALYSIS_USER_MAX_RUNNING', default=1, cast=int)
+ANALYSIS_MAX_RUNNING_COST = config('ANALYSIS_MAX_RUNNING_COST', default=8, cast=int)
+ANALYSIS_USER_MAX_PENDING = config('ANALYSIS_USER_MAX_PENDING', default=5, cast=int)
+ANALYSIS_MAX_QUEUED_COST = config('ANALYSIS_MAX_QUEUED_COST', default=200, cast=int)
+ANALYSIS_SLOT_WAIT = config('ANALYSIS_SLOT_WAIT', default=30, cast=int)
+# Пул процессов для отрисовки графиков (0 — рисовать в текущем процессе)
+ANALYSIS_RENDER_WORKERS = config('ANALYSIS_RENDER_WORKERS', default=2, cast=int)
+# Пул процессов асинхронных представлений: разбор CSV и анализы без воркера (0 — в потоке)
+ANALYSIS_COMPUTE_WORKERS = config('ANALYSIS_COMPUTE_WORKERS', default=2, cast=int)
+# Профиль картинок графиков по умолчанию (full, thumbnail, webp, svg — analysis/render_profiles.py);
+# describe с большим числом гистограмм без явного выбора рисует миниатюры
+ANALYSIS_RENDER_PROFILE = config('ANALYSIS_RENDER_PROFILE', default='full')
+ANALYSIS_THUMBNAILS_FROM = config('ANALYSIS_THUMBNAILS_FROM', default=6, cast=int)
+# Прогрев pandas/matplotlib и шрифтов в главном процессе до fork (gunicorn --preload, analysis_worker);
+# без него численный стек грузится на первом анализе в каждом процессе
+ANALYSIS_PRELOAD = config('ANALYSIS_PRELOAD', default=False, cast=bool)
+# Прореживание графиков: линия — не больше стольких точек (LTTB), облако точек выше порога — карта плотности
+ANALYSIS_LINE_MAX_POINTS = config('ANALYSIS_LINE_MAX_POINTS', default=1200, cast=int)
+ANALYSIS_SCATTER_MAX_POINTS = config('ANALYSIS_SCATTER_MAX_POINTS', default=20000, cast=int)
+ANALYSIS_SCATTER_DENSITY_BINS = config('ANALYSIS_SCATTER_DENSITY_BINS', default=200, cast=int)
+# JSON для графиков в браузере: сколько точек отдавать и размер сетки плотности
+ANALYSIS_CHART_JSON_POINTS = config('ANALYSIS_CHART_JSON_POINTS', default=1000, cast=int)
+ANALYSIS_CHART_JSON_DENSITY_BINS = config('ANALYSIS_CHART_JSON_DENSITY_BINS', default=50, cast=int)
+# Состояние загрузок (колонки, предпросмотр, выбор колонок, замеры) — в кэше по id FileMeta, в сессии только id;
+# на загрузку 5 ключей (analysis/upload_state.py). По умолчанию — файловый кэш в BASE_DIR/cache/uploads:
+# общий для процессов одной машины и не требует ничего, кроме migrate. Для нескольких машин —
+# таблица в БД (ANALYSIS_UPLOAD_CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache, таблицу создаёт
+# manage.py createcachetable) или Redis (django.core.cache.backends.redis.RedisCache и LOCATION=redis://...,
+# нужен пакет redis): без обхода ключей при записи, вытеснение — политикой maxmemory.
+# Файловый кэш и БД при MAX_ENTRIES записей вытесняют каждую CULL_FREQUENCY-ю (по умолчанию Django — 300
+# записей, то есть уже около 60 загрузок), поэтому лимит — с запасом на число активных загрузок
+# (пользователи × ANALYSIS_WORKSPACE_MAX_UPLOADS × 5); файловый кэш при каждой записи перечисляет каталог,
+# так что держать в нём сотни тысяч записей не стоит. locmem подходит для одного процесса (разработка)
+ANALYSIS_UPLOAD_CACHE_BACKEND = config('ANALYSIS_UPLOAD_CACHE_BACKEND',
+                                       default='django.core.cache.backends.filebased.FileBasedCache')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'uploads': {
+        'BACKEND': ANALYSIS_UPLOAD_CACHE_BACKEND,
+        'LOCATION': config('ANALYSIS_UPLOAD_CACHE_LOCATION', default=(
+            'analysis_upload_cache' if ANALYSIS_UPLOAD_CACHE_BACKEND.endswith('DatabaseCache')
+            else str(BASE_DIR / 'cache' / 'uploads')
+        )),
+        'TIMEOUT': config('ANALYSIS_UPLOAD_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int),
+    },
+}
+if not ANALYSIS_UPLOAD_CACHE_BACKEND.endswith('RedisCache'):
+    # у Redis OPTIONS — параметры клиента, лимита записей там нет
+    CACHES['uploads']['OPTIONS'] = {
+        'MAX_ENTRIES': config('ANALYSIS_UPLOAD_CACHE_MAX_ENTRIES', default=20_000, cast=int),
+        'CULL_FREQUENCY': 10,
+    }
+# Лимит дискового кэша готовых графиков (MEDIA_ROOT/chart_cache), МБ
+ANALYSIS_CHART_CACHE_MB = config('ANALYSIS_CHART_CACHE_MB', default=256, cast=int)
+# Рабочее пространство: загрузка хранится столько часов после последнего использования
+# (удаляет manage.py analysis_sweep), у пользователя не больше стольких загрузок и МБ
+ANALYSIS_WORKSPACE_TTL_HOURS = config('ANALYSIS_WORKSPACE_TTL_HOURS', default=72, cast=int)
+ANALYSIS_WORKSPACE_MAX_UPLOADS = config('ANALYSIS_WORKSPACE_MAX_UPLOADS', default=10, cast=int)
+ANALYSIS_WORKSPACE_QUOTA_MB = config('ANALYSIS_WORKSPACE_QUOTA_MB', default=1024, cast=int)
+
+
 LOGIN_URL = '/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
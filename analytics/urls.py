@@ -43,6 +43,12 @@ urlpatterns = [
     path('analysis/correlation/', analysis_views.correlation, name='correlation'),
     path('analysis/correlation/run/', analysis_views.run_correlation, name='run_correlation'),
     path('analysis/clear_upload/', analysis_views.clear_upload, name='clear_upload'),
+    path('analysis/switch_upload/', analysis_views.switch_upload, name='switch_upload'),
+    path('analysis/report/<int:report_id>/', analysis_views.analysis_report, name='analysis_report'),
+    path('analysis/report/<int:report_id>/status/', analysis_views.analysis_report_status, name='analysis_report_status'),
+    path('analysis/report/<int:report_id>/download/', analysis_views.analysis_report_download, name='analysis_report_download'),
+    path('analysis/report/<int:report_id>/chart-data/', analysis_views.analysis_report_chart_data, name='analysis_report_chart_data'),
+    path('analysis/report/<int:report_id>/chart/<str:name>', analysis_views.analysis_report_chart, name='analysis_report_chart'),
 ]
 
 if settings.DEBUG: